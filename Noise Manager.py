@@ -1,6 +1,7 @@
 import numpy as np
 from scipy.io import wavfile
 import os
+import sys
 
 # 設定輸出目錄
 NOISE_DIR = "./noises"
@@ -72,14 +73,17 @@ def convert_mp3_to_wav(mp3_path):
         print(f"❌ 轉換失敗 {filename}: {e}")
         return None
 
-def check_downloaded_files():
-    """檢查使用者是否已經放入了 MP3 或 WAV，並轉換 MP3 為 WAV"""
-    # 修改：同時偵測 .mp3 和 .wav (不分大小寫)
-    files = [f for f in os.listdir(NOISE_DIR) if f.lower().endswith(('.mp3', '.wav'))]
+def check_downloaded_files(to_wav=False):
+    """檢查使用者是否已經放入了 MP3 / FLAC / WAV
     
-    # 轉換 MP3 為 WAV
+    播放器的噪音引擎可以直接解碼 MP3 與 FLAC，不再需要預先轉成 WAV；
+    加上 --to-wav 參數時才轉換 (給舊版播放器使用)。
+    """
+    files = [f for f in os.listdir(NOISE_DIR) if f.lower().endswith(('.mp3', '.wav', '.flac'))]
+    
+    # 轉換 MP3 為 WAV (選用)
     mp3_files = [f for f in files if f.lower().endswith('.mp3')]
-    if mp3_files:
+    if mp3_files and to_wav:
         print(f"\n🎵 偵測到 {len(mp3_files)} 個 MP3 檔案，正在轉換為 WAV...")
         for mp3_file in mp3_files:
             mp3_path = os.path.join(NOISE_DIR, mp3_file)
@@ -87,7 +91,7 @@ def check_downloaded_files():
     
     if not files:
         print(f"\n⚠️ 提示: {NOISE_DIR} 資料夾是空的！")
-        print("請去 https://mixkit.co/free-sound-effects/ 下載一些 mp3 或 wav 放進來。")
+        print("請去 https://mixkit.co/free-sound-effects/ 下載一些 mp3、flac 或 wav 放進來。")
         print("推薦命名: airport.wav, cafe.mp3, traffic.wav")
     else:
         print(f"\n✅ 偵測到以下背景噪音檔 ({len(files)} 個):")
@@ -100,4 +104,4 @@ if __name__ == "__main__":
     generate_noise('pink', duration_sec=60)  # 聽起來像下雨
     
     # 2. 檢查下載檔案
-    check_downloaded_files()
\ No newline at end of file
+    check_downloaded_files(to_wav="--to-wav" in sys.argv)
\ No newline at end of file
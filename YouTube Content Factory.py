@@ -1,11 +1,20 @@
 import os
 import json
+import numpy as np
 import whisper
 import ffmpeg
 import yt_dlp
 import google.generativeai as genai
-import shutil
+import threading
 from datetime import timedelta
+from ingest_pipeline import Stage, StagedPipeline
+from gemini_translator import GeminiBatchTranslator, BatchCheckpoint, PROMPT_VERSION, translator_limits
+from translation_cache import TranslationCache, CACHE_FILENAME
+from asset_store import finalize_file, write_json_atomic, gc_temp_files, gc_completed_lessons
+from media_cache import MediaCache
+from lesson_binary import write_binary_lesson, binary_path_for
+from lesson_search import LessonSearchIndex
+from lesson_vocab import VocabularyStore
 
 # --- 全域設定 ---
 # ⚠️⚠️⚠️ 請在此填入您的 Google Gemini API Key ⚠️⚠️⚠️
@@ -14,6 +23,27 @@ GEMINI_API_KEY = "您的_GOOGLE_GEMINI_API_KEY"
 OUTPUT_DIR = "./app_assets"
 TEMP_DIR = "./temp_downloads"
 
+# 多個網址的管線處理：每個階段同時處理幾支影片
+# (Whisper 固定一個工作執行緒，模型只載入一份；佇列上限控制暫存影片最多累積幾支)
+PIPELINE_WORKERS = {
+    "probe": 4,       # 取得影片 ID、檢查是否已存在
+    "download": 2,    # yt-dlp 下載
+    "ffmpeg": 2,      # 同時執行的 ffmpeg 工作 (一次解碼：MP3 + 給 Whisper 的 PCM)
+    "translate": 2,   # Gemini 翻譯 + 存檔
+}
+PIPELINE_QUEUE_SIZE = 2  # 等待 Whisper 的影片 PCM 在記憶體中 (16 kHz float32，每小時約 230 MB)
+
+# Gemini 翻譯：同時送出的批次數與每分鐘請求上限 (所有影片共用)
+# None 時使用環境變數 GEMINI_CONCURRENCY (預設 4) / GEMINI_REQUESTS_PER_MINUTE (預設 10)
+# 翻譯速度的上限是每分鐘請求數：10 rpm 時最多每分鐘 10 批，提高並行數不會更快
+GEMINI_CONCURRENCY = None
+GEMINI_REQUESTS_PER_MINUTE = None
+UNTRANSLATED_ZH = "[無中文翻譯]"  # 翻譯失敗的片段，重新執行時只會重送這些批次
+TRANSLATION_CACHE_MB = 64  # 翻譯快取 (app_assets/.translation_cache.db) 的容量上限
+# 課程影片的磁碟配額 (GB)：超過時刪除最久沒播放的 MP4，JSON 與 MP3 一律保留
+# None 時使用環境變數 LESSON_VIDEO_QUOTA_GB (預設 20 GB)
+LESSON_VIDEO_QUOTA_GB = None
+
 # 建立必要的資料夾
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.makedirs(TEMP_DIR, exist_ok=True)
@@ -23,7 +53,10 @@ if "您的_GOOGLE" not in GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
 
 class YouTubeContentFactory:
-    def __init__(self, model_size="base", batch_size=15):
+    def __init__(self, model_size="base", batch_size=15, translate_concurrency=GEMINI_CONCURRENCY,
+                 requests_per_minute=GEMINI_REQUESTS_PER_MINUTE):
+        self._index_lock = threading.Lock()  # 管線中多個翻譯工作同時存檔時，依序更新索引
+        self._media_lock = threading.Lock()  # 依序執行影片配額
         print(f"📡 正在載入 Whisper 模型 ({model_size})...")
         self.model = whisper.load_model(model_size)
         
@@ -35,6 +68,12 @@ class YouTubeContentFactory:
         # 批次處理大小（避免單次請求過長）
         self.batch_size = batch_size
         print(f"   批次處理大小: {batch_size} 個片段/次")
+        translate_concurrency, requests_per_minute = translator_limits(translate_concurrency, requests_per_minute)
+        self.translator = GeminiBatchTranslator(self.gemini_model, translate_concurrency, requests_per_minute)
+        print(f"   同時翻譯: {translate_concurrency} 批，速率上限 {requests_per_minute} 次/分鐘")
+        # 翻譯快取：相同 (或只差大小寫/空白) 的英文句子直接沿用，只把沒看過的句子送給 Gemini
+        self.translation_cache = TranslationCache(os.path.join(OUTPUT_DIR, CACHE_FILENAME), self.model_name,
+                                                  PROMPT_VERSION, max_mb=TRANSLATION_CACHE_MB)
         print(f"   💡 策略: Gemini 翻譯 + Whisper words 陣列（用於英文逐字高亮）")
 
     # --- 🆕 新增方法：只取得 ID 不下載影片 ---
@@ -56,6 +95,55 @@ class YouTubeContentFactory:
             return None
 
     def process_url(self, youtube_url):
+        """依序處理單一網址 (與管線使用相同的步驟)"""
+        job = self._probe_url(youtube_url)
+        for step in (self._download_step, self._extract_step, self._transcribe_step, self._translate_step):
+            if job is None:
+                return
+            job = step(job)
+
+    def process_urls(self, youtube_urls, workers=None, queue_size=PIPELINE_QUEUE_SIZE):
+        """以管線處理多個網址：下載、ffmpeg、Whisper、Gemini 同時處理不同影片"""
+        workers = dict(PIPELINE_WORKERS, **(workers or {}))
+        seen_ids = set()
+        seen_lock = threading.Lock()
+
+        def probe(url):
+            job = self._probe_url(url)
+            if job is None:
+                return None
+            with seen_lock:
+                # 清單中重複的影片 (不同網址參數) 只處理一次
+                if job["video_id"] in seen_ids:
+                    print(f"⏭️  {job['video_id']} 已在處理中，跳過重複的網址。")
+                    return None
+                seen_ids.add(job["video_id"])
+            return job
+
+        pipeline = StagedPipeline([
+            Stage("probe", probe, workers["probe"], queue_size),
+            Stage("download", self._download_step, workers["download"], queue_size),
+            Stage("ffmpeg", self._extract_step, workers["ffmpeg"], queue_size),
+            Stage("whisper", self._transcribe_step, 1, queue_size),
+            Stage("translate", self._translate_step, workers["translate"], queue_size),
+        ], label=self._job_label)
+        self._gc_temp_dir()
+        print(f"\n🚀 管線處理 {len(youtube_urls)} 個網址 (每階段工作數: {workers})")
+        return pipeline.run(youtube_urls)
+
+    def _gc_temp_dir(self):
+        """清掉已完成課程留在暫存資料夾的檔案 (先前版本保留的影片、WAV、下載分段)"""
+        lessons, freed = gc_completed_lessons(TEMP_DIR, OUTPUT_DIR)
+        if lessons:
+            print(f"🧹 已清除 {lessons} 個已完成課程的暫存檔 ({freed / (1024 * 1024):.1f} MB)")
+
+    @staticmethod
+    def _job_label(job):
+        return job if isinstance(job, str) else job.get("video_id") or job.get("url")
+
+    # --- 處理步驟 (每一步回傳下一步的工作 dict，None 表示結束) ---
+    def _probe_url(self, youtube_url):
+        """取得影片 ID 並檢查檔案是否已存在 (已存在但缺翻譯時只重新翻譯)"""
         print(f"\n🚀 準備處理: {youtube_url}")
         
         # --- 1. 優先檢查：檔案是否已存在？ ---
@@ -64,7 +152,9 @@ class YouTubeContentFactory:
         
         if not video_id:
             print("❌ 無法取得影片 ID，跳過此連結。")
-            return
+            return None
+
+        job = {"url": youtube_url, "video_id": video_id}
 
         # 檢查目標 JSON 是否已經在資料夾中
         expected_json_path = os.path.join(OUTPUT_DIR, f"{video_id}.json")
@@ -78,83 +168,108 @@ class YouTubeContentFactory:
                 # 檢查 segments 中是否有 "[無中文翻譯]"
                 segments = existing_data.get("segments", [])
                 needs_translation = any(
-                    seg.get("text_zh") == "[無中文翻譯]" for seg in segments
+                    seg.get("text_zh") == UNTRANSLATED_ZH for seg in segments
                 )
                 
                 if needs_translation:
-                    print(f"🔄 檔案已存在但缺少中文翻譯，開始重新翻譯...")
-                    # 提取原始 segments 進行 Gemini 翻譯
-                    self._retranslate_existing_json(expected_json_path, existing_data)
-                    return
+                    print(f"🔄 檔案已存在但缺少中文翻譯，將重新翻譯 ({video_id}.json)")
+                    # 不必下載與辨識：直接交給翻譯步驟
+                    job["existing"] = (expected_json_path, existing_data)
+                    return job
                 else:
                     print(f"⏭️  檔案已存在且已完成翻譯 ({video_id}.json)，跳過處理。")
-                    return
+                    return None
             except Exception as e:
                 print(f"⚠️ 讀取現有檔案時發生錯誤: {e}")
                 print(f"   將跳過此檔案，繼續下一個。")
-                return
+                return None
         # -------------------------------------
+        return job
 
-        print(f"📥 檔案不存在，開始下載影片...")
+    def _download_step(self, job):
+        if "existing" in job:
+            return job
+        print(f"📥 [{job['video_id']}] 檔案不存在，開始下載影片...")
 
         # 2. 下載影片
-        video_info = self._download_youtube_video(youtube_url)
+        video_info = self._download_youtube_video(job["url"])
         if not video_info: 
-            print("❌ 影片下載失敗，中止處理。")
-            return
+            print(f"❌ [{job['video_id']}] 影片下載失敗，中止處理。")
+            return None
+        job["video_info"] = video_info
+        return job
 
-        video_path = video_info['path']
-        video_title = video_info['title']
-        
-        # 3. 轉錄 (Whisper)
-        audio_path = os.path.join(TEMP_DIR, f"{video_id}.wav")
-        self._extract_audio(video_path, audio_path)
-        
-        if not os.path.exists(audio_path):
-            print("❌ 音訊提取失敗，請檢查電腦是否已安裝 FFmpeg。")
-            return
+    def _extract_step(self, job):
+        """ffmpeg 一次解碼：MP3 (純音訊模式) 寫入輸出資料夾，16 kHz PCM 直接進記憶體給 Whisper"""
+        if "existing" in job:
+            return job
+        video_id = job["video_id"]
+        mp3_path = os.path.join(TEMP_DIR, f"{video_id}.mp3")  # 存檔時才移到課程資料夾
 
-        print("🤖 正在進行 Whisper 語音辨識 (將音訊轉為文字)...")
-        result = self.model.transcribe(audio_path, fp16=False, word_timestamps=True)
-        raw_segments = result["segments"]
+        print(f"🎵 [{video_id}] 正在提取 MP3 與 Whisper 音訊 (單次解碼)...")
+        audio = self._decode_audio(job["video_info"]["path"], mp3_path)
+        if audio is None:
+            print(f"❌ [{video_id}] 音訊提取失敗，請檢查電腦是否已安裝 FFmpeg。")
+            return None
+        job["audio"] = audio
+        job["mp3_path"] = mp3_path
+        return job
 
-        # 4. Gemini 語意處理（支援批次處理）
-        print("🧠 正在呼叫 Gemini 進行語意合併與翻譯...")
-        processed_segments = self._process_segments_in_batches(raw_segments)
+    def _transcribe_step(self, job):
+        """Whisper 語音辨識 (管線中只有一個工作執行緒使用模型)"""
+        if "existing" in job:
+            return job
+        print(f"🤖 [{job['video_id']}] 正在進行 Whisper 語音辨識 (將音訊轉為文字)...")
+        result = self.model.transcribe(job.pop("audio"), fp16=False, word_timestamps=True)
+        job["raw_segments"] = result["segments"]  # PCM 用完即釋放
+        return job
 
-        if not processed_segments:
-            print("⚠️ Gemini 處理失敗，儲存 Whisper 原始結果以便稍後重新翻譯。")
-            # 將 Whisper 原始格式轉換為播放器可讀取的格式
-            processed_segments = [
-                {
-                    "id": seg.get("id", i),
-                    "start_time": seg["start"],
-                    "end_time": seg["end"],
-                    "text_en": seg["text"].strip(),
-                    "text_zh": "[無中文翻譯]",  # 無翻譯時顯示提示
-                    "keywords": [],
-                    "words": seg.get("words", [])  # 保留 word-level timestamps 以便未來重新處理
-                }
-                for i, seg in enumerate(raw_segments)
-            ]
-            self._list_available_models()
-            
-            # 直接儲存 JSON 並結束處理
-            self._save_json_and_files(video_id, video_title, youtube_url, video_path, 
-                                     video_info, processed_segments)
-            return
+    def _translate_step(self, job):
+        """Gemini 翻譯並存檔"""
+        if "existing" in job:
+            json_path, existing_data = job["existing"]
+            self._retranslate_existing_json(json_path, existing_data)
+            return job
+
+        video_id = job["video_id"]
+        video_info = job["video_info"]
+        video_path = video_info['path']
+        video_title = video_info['title']
+        raw_segments = job["raw_segments"]
+
+        # 4. Gemini 語意處理（分批並行；每批成功就寫入檢查點，失敗的批次先以 [無中文翻譯] 儲存）
+        print(f"🧠 [{video_id}] 正在呼叫 Gemini 進行語意合併與翻譯...")
+        checkpoint = self._translation_checkpoint(OUTPUT_DIR, video_id)
+        processed_segments, failed = self._process_segments_in_batches(raw_segments, checkpoint)
 
-        # 5. Gemini 成功，繼續正常處理
-        self._save_json_and_files(video_id, video_title, youtube_url, video_path, 
+        # 5. 儲存 JSON 與相關檔案 (MP3 已在 ffmpeg 步驟提取)
+        self._save_json_and_files(video_id, video_title, job["url"], video_path, 
                                  video_info, processed_segments)
+        if not failed:
+            checkpoint.discard()
+        return job
 
     def _save_json_and_files(self, video_id, video_title, youtube_url, video_path, 
                             video_info, processed_segments):
-        """儲存 JSON 和相關檔案的共用方法"""
-        print("🎵 正在提取 MP3 音訊檔...")
+        """儲存 JSON 和相關檔案的共用方法 (MP3 已在 _extract_step 提取到暫存資料夾)
+
+        先把影片與 MP3 移到課程資料夾，最後才以換名寫入 JSON：
+        播放器看到 JSON 時媒體一定已經就位。
+        """
         mp3_filename = f"{video_id}.mp3"
         mp3_path = os.path.join(OUTPUT_DIR, mp3_filename)
-        self._extract_audio_mp3(video_path, mp3_path)
+        temp_mp3_path = os.path.join(TEMP_DIR, mp3_filename)
+
+        # 影片 / MP3 移入輸出資料夾 (同一個磁碟直接換名，不複製)
+        final_video_path = os.path.join(OUTPUT_DIR, os.path.basename(video_path))
+        for name, src, dst in (("影片檔", video_path, final_video_path), ("音訊檔", temp_mp3_path, mp3_path)):
+            if not os.path.exists(src):
+                continue
+            try:
+                method = finalize_file(src, dst)
+                print(f"   📁 {name}已移入課程資料夾 ({method})")
+            except OSError as e:
+                print(f"   ⚠️ {name}無法移入課程資料夾: {e}")
         
         # 計算檔案大小（可選）
         audio_size_mb = 0
@@ -173,137 +288,180 @@ class YouTubeContentFactory:
             "segments": processed_segments
         }
 
-        # 存檔 JSON
+        # 存檔 JSON (暫存檔 + 換名)
         json_path = os.path.join(OUTPUT_DIR, f"{video_id}.json")
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(app_data, f, ensure_ascii=False, indent=2)
-            
-        # 複製影片檔到輸出資料夾
-        final_video_path = os.path.join(OUTPUT_DIR, os.path.basename(video_path))
-        if os.path.exists(video_path):
-             shutil.copy2(video_path, final_video_path)
-             print(f"   (原始影片已保留在: {video_path})")
+        write_json_atomic(json_path, app_data)
+        self._save_binary_lesson(app_data, json_path)
+        self._update_library_index(app_data, json_path)
+        self._enforce_video_quota(app_data["video_filename"])
+
+        # 課程已完成：清掉暫存資料夾中這支影片的其他檔案 (下載分段等)
+        freed = gc_temp_files(TEMP_DIR, video_id)
+        if freed:
+            print(f"   🧹 已清除暫存檔 ({freed / (1024 * 1024):.1f} MB)")
         
         print(f"✅ 處理完成！\n   📄 JSON 檔: {json_path}\n   🎥 影片檔: {final_video_path}\n   🎵 音訊檔: {mp3_path} ({audio_size_mb} MB)")
 
-    def _process_segments_in_batches(self, raw_segments):
-        """將片段分批處理，避免單次請求過長導致回應被截斷"""
-        total_segments = len(raw_segments)
-        
-        # 如果片段數量少於批次大小，直接處理
-        if total_segments <= self.batch_size:
-            return self._process_with_gemini(raw_segments)
-        
-        # 分批處理
-        print(f"   總共 {total_segments} 個片段，將分 {(total_segments + self.batch_size - 1) // self.batch_size} 批次處理")
-        all_processed = []
-        
-        for i in range(0, total_segments, self.batch_size):
-            batch_num = i // self.batch_size + 1
-            batch = raw_segments[i:i + self.batch_size]
-            print(f"   📦 處理第 {batch_num} 批 ({len(batch)} 個片段)...")
-            
-            processed_batch = self._process_with_gemini(batch)
-            
-            if not processed_batch:
-                print(f"   ❌ 第 {batch_num} 批處理失敗")
-                return None
-            
-            all_processed.extend(processed_batch)
-        
-        print(f"   ✅ 所有批次處理完成，共 {len(all_processed)} 個片段")
-        return all_processed
+    def _save_binary_lesson(self, app_data, json_path):
+        """在 JSON 旁輸出二進位課程檔 (.lesson)，播放器會優先讀取"""
+        bin_path = binary_path_for(json_path)
+        try:
+            write_binary_lesson(app_data, bin_path)
+            print(f"   📦 二進位課程檔: {bin_path}")
+        except Exception as e:
+            print(f"   ⚠️ 二進位課程檔輸出失敗 (播放器會改讀 JSON): {e}")
 
-    def _process_with_gemini(self, raw_segments):
-        # 不包含 words 陣列發送給 Gemini，避免回應過長被截斷
-        simplified_input = [
+    def _update_library_index(self, app_data, json_path):
+        """把剛寫入的課程加入搜尋索引與單字資料庫 (只處理這一課)"""
+        for name, store_class in (("搜尋索引", LessonSearchIndex), ("單字資料庫", VocabularyStore)):
+            try:
+                with self._index_lock:
+                    store = store_class(OUTPUT_DIR)
+                    store.index_lesson(json_path, app_data)
+                    store.close()
+                print(f"   ✅ 已加入{name}")
+            except Exception as e:
+                print(f"   ⚠️ {name}更新失敗 (播放器啟動時會補上): {e}")
+
+    def _enforce_video_quota(self, video_filename):
+        """記錄新影片的加入時間，超過配額時清除最久沒播放的影片 (不含剛加入的這支)"""
+        try:
+            with self._media_lock:
+                cache = MediaCache(OUTPUT_DIR, LESSON_VIDEO_QUOTA_GB)
+                cache.touch(video_filename)
+                evicted = cache.enforce_quota(protect={video_filename})
+                cache.close()
+            if evicted:
+                freed = sum(size for _, size in evicted)
+                print(f"   🧹 影片超過配額：已清除 {len(evicted)} 支最久沒播放的影片 ({freed / (1024 ** 3):.2f} GB)")
+        except Exception as e:
+            print(f"   ⚠️ 影片配額執行失敗: {e}")
+
+    def _translation_checkpoint(self, output_dir, video_id):
+        """課程旁的批次翻譯檢查點 (. 開頭，播放器與索引會略過)"""
+        return BatchCheckpoint(os.path.join(output_dir, f".{video_id}.checkpoint.json"), self.model_name)
+
+    def _untranslated_segments(self, raw_segments, offset=0):
+        """將 Whisper 原始格式轉換為播放器可讀取的格式 (沒有翻譯)"""
+        return [
             {
-                "id": i, 
-                "start": seg["start"], 
-                "end": seg["end"], 
-                "text": seg["text"].strip()
-            } 
+                "id": seg.get("id", offset + i),
+                "start_time": seg["start"],
+                "end_time": seg["end"],
+                "text_en": seg["text"].strip(),
+                "text_zh": UNTRANSLATED_ZH,  # 無翻譯時顯示提示
+                "keywords": [],
+                "words": seg.get("words", [])  # 保留 word-level timestamps 以便未來重新處理
+            }
             for i, seg in enumerate(raw_segments)
         ]
 
-        prompt = f"""
-        Translate to Traditional Chinese (Taiwan). Keep exact structure.
-        
-        Input ({len(simplified_input)} segments):
-        {json.dumps(simplified_input, ensure_ascii=False)}
-
-        Output ({len(simplified_input)} segments with translations):
-        [
-          {{
-            "id": <same>,
-            "start_time": <same start>,
-            "end_time": <same end>,
-            "text_en": "<same text>",
-            "text_zh": "中文翻譯",
-            "keywords": ["important_word"]
-          }}
-        ]
-        
-        Rules:
-        - Output EXACTLY {len(simplified_input)} items
-        - keywords: choose difficult, important, meaning and name words (min 1,max 5), in English
-        - don't translate keywords.
-        - Keep all IDs, timestamps, text_en unchanged
+    def _process_segments_in_batches(self, raw_segments, checkpoint=None, existing=None):
+        """將片段分批並行翻譯 (結果依原本順序組回)，回傳 (片段, 失敗的批次數)
+
+        - checkpoint：檢查點中已有的批次直接沿用，新成功的批次立刻寫入
+        - existing：重新翻譯時的現有片段，已完整翻譯的批次不再送出
+        - 失敗的批次以 [無中文翻譯] 填入 (重新翻譯時保留現有片段)，成功的批次照常保留
         """
+        size = self.batch_size
+        batches = [raw_segments[i:i + size] for i in range(0, len(raw_segments), size)]
+        results = [None] * len(batches)
+        pending = []
+        reused = 0
+        for n, batch in enumerate(batches):
+            if existing is not None and not any(
+                    seg.get("text_zh") == UNTRANSLATED_ZH for seg in existing[n * size:(n + 1) * size]):
+                results[n] = existing[n * size:(n + 1) * size]
+                continue
+            cached = checkpoint.get(batch) if checkpoint is not None else None
+            if cached is not None:
+                results[n] = cached
+                reused += 1
+            else:
+                pending.append(n)
 
-        response = None
-        try:
-            response = self.gemini_model.generate_content(prompt)
-            response_text = response.text
-            
-            # 檢查回應是否被截斷
-            if len(response_text) > 100000:
-                print(f"   ⚠️ Gemini 回應過長 ({len(response_text)} 字元)，可能被截斷")
-            
-            clean_text = response_text.replace("```json", "").replace("```", "").strip()
-            
-            # 嘗試解析 JSON
-            parsed_data = json.loads(clean_text)
-            
-            # 驗證輸出片段數量
-            if len(parsed_data) != len(simplified_input):
-                print(f"   ⚠️ 警告: Gemini 合併了片段！輸入 {len(simplified_input)} 個，輸出 {len(parsed_data)} 個")
-                print(f"   片段數量不符，放棄此批次")
+        if len(batches) > 1:
+            print(f"   總共 {len(raw_segments)} 個片段，分 {len(batches)} 批次，需送出 {len(pending)} 批 "
+                  f"(同時 {self.translator.concurrency} 批)")
+        if reused:
+            print(f"   ♻️ 沿用檢查點中已完成的 {reused} 批")
+
+        def translate(batch, num):
+            n = pending[num - 1]
+            processed = self._process_with_gemini(batch, f" (第 {n + 1} 批)" if len(batches) > 1 else "")
+            if processed and checkpoint is not None:
+                checkpoint.put(batch, processed)
+            return processed
+
+        sent = self.translator.map_batches([batches[n] for n in pending], translate)
+        for n, processed in zip(pending, sent):
+            results[n] = processed
+
+        all_processed = []
+        failed = 0
+        for n, processed in enumerate(results):
+            if processed:
+                all_processed.extend(processed)
+                continue
+            failed += 1
+            print(f"   ❌ 第 {n + 1} 批處理失敗")
+            if existing is not None:
+                all_processed.extend(existing[n * size:(n + 1) * size])
+            else:
+                all_processed.extend(self._untranslated_segments(batches[n], n * size))
+
+        if self.translation_cache is not None:
+            print(f"   {self.translation_cache.format_stats()}")
+        if not failed:
+            print(f"   ✅ 所有批次處理完成，共 {len(all_processed)} 個片段")
+        elif failed == len(batches):
+            print("⚠️ Gemini 處理失敗，儲存 Whisper 原始結果以便稍後重新翻譯。")
+            self._list_available_models()
+        else:
+            print(f"   ⚠️ {failed}/{len(batches)} 批翻譯失敗，已先保留其餘翻譯；重新執行時只會送出失敗的批次")
+        return all_processed, failed
+
+    def _process_with_gemini(self, raw_segments, label=""):
+        """翻譯一個批次 (速率限制、暫時性錯誤重試)；失敗時回傳 None
+
+        先查翻譯快取，只把沒有快取的片段送給 Gemini。
+        """
+        cache = self.translation_cache
+        if cache is None:
+            return self.translator.translate_batch(raw_segments, label)
+
+        texts = [seg["text"].strip() for seg in raw_segments]
+        cached = cache.lookup(texts)
+        misses = [i for i, c in enumerate(cached) if c is None]
+        translated = {}
+        if misses:
+            processed = self.translator.translate_batch([raw_segments[i] for i in misses], label)
+            if not processed:
                 return None
-            
-            # ✨ 關鍵步驟：將原始 Whisper 的 words 陣列加回去
-            for i, item in enumerate(parsed_data):
-                item["words"] = raw_segments[i].get("words", [])
-            
-            print(f"✅ Gemini 成功處理 {len(parsed_data)} 個片段")
-            return parsed_data
-            
-        except json.JSONDecodeError as e:
-            print(f"\n❌ Gemini 回應格式錯誤 (無法解析 JSON)")
-            print(f"   錯誤詳情: {e}")
-            if response and hasattr(response, 'text'):
-                print(f"   回應長度: {len(response.text)} 字元")
-            print(f"   跳過此批次，繼續處理下一批")
-            return None
-                
-        except Exception as e:
-            print(f"\n❌ Gemini API 呼叫失敗")
-            print(f"   錯誤類型: {type(e).__name__}")
-            print(f"   錯誤訊息: {str(e)}")
-            
-            # 檢查常見錯誤
-            error_msg = str(e).lower()
-            if 'quota' in error_msg or 'limit' in error_msg:
-                print(f"   💡 可能原因: API 配額用完或達到速率限制")
-                print(f"   建議: 檢查 https://aistudio.google.com/app/apikey")
-            elif 'api_key' in error_msg or 'authentication' in error_msg:
-                print(f"   💡 可能原因: API Key 無效或過期")
-            elif 'permission' in error_msg:
-                print(f"   💡 可能原因: API Key 權限不足")
-            elif 'timeout' in error_msg or 'connection' in error_msg:
-                print(f"   💡 可能原因: 網路連線問題")
-            
-            return None
+            cache.store([(texts[i], item.get("text_zh", ""), item.get("keywords", []))
+                         for i, item in zip(misses, processed)])
+            translated = dict(zip(misses, processed))
+        else:
+            print(f"💾 整批命中翻譯快取 ({len(raw_segments)} 個片段){label}")
+
+        results = []
+        for i, seg in enumerate(raw_segments):
+            item = translated.get(i)
+            if item is None:
+                text_zh, keywords = cached[i]
+                item = {
+                    "id": i,  # 與 Gemini 輸出相同：批次內的編號
+                    "start_time": seg["start"],
+                    "end_time": seg["end"],
+                    "text_en": texts[i],
+                    "text_zh": text_zh,
+                    "keywords": keywords,
+                    "words": seg.get("words", []),
+                }
+            else:
+                item["id"] = i  # 只送出未命中的片段時，Gemini 的編號是子批次內的編號
+            results.append(item)
+        return results
 
     def _retranslate_existing_json(self, json_path, existing_data):
         """重新翻譯已存在但缺少中文翻譯的 JSON 檔案"""
@@ -322,20 +480,29 @@ class YouTubeContentFactory:
             for seg in segments
         ]
         
-        # 使用批次處理方法進行翻譯
-        processed_segments = self._process_segments_in_batches(raw_segments_format)
+        # 只送出還有 [無中文翻譯] 的批次 (檢查點中已完成的也不再送出)
+        video_id = existing_data.get("lesson_id") or os.path.basename(json_path)[:-len(".json")]
+        checkpoint = self._translation_checkpoint(os.path.dirname(json_path), video_id)
+        processed_segments, failed = self._process_segments_in_batches(
+            raw_segments_format, checkpoint, existing=segments)
         
-        if processed_segments:
-            # 更新 JSON 資料
+        if processed_segments != segments:
+            # 更新 JSON 資料 (部分成功也立即寫入)
             existing_data["segments"] = processed_segments
             
-            # 存檔
-            with open(json_path, "w", encoding="utf-8") as f:
-                json.dump(existing_data, f, ensure_ascii=False, indent=2)
+            # 存檔 (暫存檔 + 換名)
+            write_json_atomic(json_path, existing_data)
+            self._save_binary_lesson(existing_data, json_path)
+            self._update_library_index(existing_data, json_path)
             
-            print(f"✅ 重新翻譯完成！已更新檔案: {json_path}")
+            if failed:
+                print(f"⚠️ 部分批次重新翻譯完成，已更新檔案: {json_path}")
+            else:
+                print(f"✅ 重新翻譯完成！已更新檔案: {json_path}")
         else:
             print(f"❌ Gemini 翻譯失敗，保持原檔案不變。")
+        if not failed:
+            checkpoint.discard()
 
     def _list_available_models(self):
         print("\n🔍 正在查詢您帳號可用的模型列表...")
@@ -367,32 +534,40 @@ class YouTubeContentFactory:
             print(f"下載模組錯誤: {e}")
             return None
 
-    def _extract_audio(self, video_path, audio_output_path):
-        try:
-            (
-                ffmpeg
-                .input(video_path)
-                .output(audio_output_path, acodec='pcm_s16le', ac=1, ar='16k')
-                .run(quiet=True, overwrite_output=True)
-            )
-        except ffmpeg.Error:
-            pass
+    def _decode_audio(self, video_path, mp3_output_path):
+        """單一 ffmpeg 行程：輸出 MP3 檔，同時以 pipe 輸出 16 kHz 單聲道 float32 PCM
 
-    def _extract_audio_mp3(self, video_path, audio_output_path):
-        """提取 MP3 格式音訊（用於手機版純音訊模式）"""
+        回傳 Whisper 可直接使用的 numpy 陣列 (不寫暫存 WAV)；失敗時回傳 None。
+        """
+        audio = ffmpeg.input(video_path).audio
+        mp3 = audio.output(mp3_output_path,
+                           acodec='libmp3lame',
+                           audio_bitrate='128k',
+                           ac=2)  # 立體聲
+        pcm = audio.output('pipe:', format='f32le', acodec='pcm_f32le', ac=1, ar=whisper.audio.SAMPLE_RATE)
         try:
-            (
-                ffmpeg
-                .input(video_path)
-                .output(audio_output_path, 
-                       acodec='libmp3lame', 
-                       audio_bitrate='128k',
-                       ac=2)  # 立體聲
-                .run(quiet=True, overwrite_output=True)
+            process = (
+                ffmpeg.merge_outputs(mp3, pcm)
+                .global_args('-nostdin', '-loglevel', 'error')  # 錯誤訊息直接顯示，不必另外讀取 stderr
+                .run_async(pipe_stdout=True, overwrite_output=True)
             )
-            print(f"   ✅ MP3 音訊檔已生成")
-        except ffmpeg.Error as e:
-            print(f"   ⚠️ MP3 提取失敗: {e}")
+        except OSError as e:
+            print(f"   ⚠️ 無法執行 FFmpeg: {e}")
+            return None
+
+        # 讀進可寫入的 bytearray (Whisper 轉成 tensor 時不必再複製)
+        data = bytearray()
+        while True:
+            chunk = process.stdout.read(1 << 20)
+            if not chunk:
+                break
+            data += chunk
+        process.stdout.close()
+        if process.wait() != 0 or not data:
+            return None
+        del data[len(data) - len(data) % 4:]  # 原地去掉不完整的取樣 (切片會複製整個緩衝區)
+        print(f"   ✅ MP3 音訊檔已生成，Whisper 音訊 {len(data) // 4 / whisper.audio.SAMPLE_RATE:.0f} 秒")
+        return np.frombuffer(data, dtype=np.float32)
 
 # --- 執行區 ---
 if __name__ == "__main__":
@@ -401,7 +576,7 @@ if __name__ == "__main__":
     else:
         factory = YouTubeContentFactory(model_size="base")
         
-        # 您可以在這裡放入大量的網址，已下載過的會自動跳過
+        # 您可以在這裡放入大量的網址，已下載過的會自動跳過 (以管線同時下載/辨識/翻譯不同影片)
         video_urls = [
             "https://www.youtube.com/watch?v=X0W6CX-uHhk",
             "https://www.youtube.com/watch?v=UF8uR6Z6KLc",
@@ -413,5 +588,4 @@ if __name__ == "__main__":
             "https://www.youtube.com/watch?v=xjycSL8JJUI",
         ]
         
-        for url in video_urls:
-            factory.process_url(url)
\ No newline at end of file
+        factory.process_urls(video_urls)
\ No newline at end of file
@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import errno
+import shutil
+
+# --- 課程素材的最後步驟 (工廠) ---
+# - finalize_file：暫存資料夾 -> 課程資料夾。同一個檔案系統直接換名 (不複製)；
+#   要保留來源時依序嘗試 hardlink、reflink (Linux FICLONE)，跨檔案系統才串流複製
+# - 目的地已有內容相同的檔案時不再寫一份 (重複執行同一支影片)
+# - write_json_atomic：先寫暫存檔再換名，播放器的資料夾監看不會讀到寫到一半的 JSON
+# - gc_temp_files：刪除已完成課程在暫存資料夾留下的檔案 (下載分段、舊版的 WAV ...)
+
+COPY_CHUNK = 8 * 1024 * 1024
+FICLONE = 0x40049409  # linux/fs.h：_IOW(0x94, 9, int)
+
+
+def write_json_atomic(path, data):
+    """寫入 JSON (暫存檔 + fsync + 換名)"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def same_content(a, b):
+    """兩個檔案內容是否相同 (大小不同時不必讀檔)"""
+    try:
+        if os.path.samefile(a, b):
+            return True
+        if os.path.getsize(a) != os.path.getsize(b):
+            return False
+    except OSError:
+        return False
+    with open(a, "rb") as fa, open(b, "rb") as fb:
+        while True:
+            chunk_a = fa.read(COPY_CHUNK)
+            if chunk_a != fb.read(COPY_CHUNK):
+                return False
+            if not chunk_a:
+                return True
+
+
+def _reflink(src, dst):
+    """Copy-on-write 複製 (Btrfs / XFS)；不支援時拋出 OSError"""
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "reflink not supported on this platform")
+    import fcntl
+    with open(src, "rb") as fs, open(dst, "wb") as fd:
+        try:
+            fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+        except OSError:
+            fd.close()
+            os.remove(dst)
+            raise
+
+
+def _stream_copy(src, dst):
+    """串流複製 (固定大小的緩衝區) 並 fsync"""
+    with open(src, "rb") as fs, open(dst, "wb") as fd:
+        shutil.copyfileobj(fs, fd, COPY_CHUNK)
+        fd.flush()
+        os.fsync(fd.fileno())
+    shutil.copystat(src, dst)
+
+
+def finalize_file(src, dst, keep_source=False):
+    """把完成的檔案放到最終位置，回傳使用的方式 ("rename" / "hardlink" / "reflink" / "copy" / "exists")
+
+    目的地只會以換名出現 (先寫 dst + ".tmp")，不會被讀到一半。
+    """
+    if os.path.exists(dst) and same_content(src, dst):
+        if not keep_source and not os.path.samefile(src, dst):
+            os.remove(src)
+        return "exists"
+
+    if not keep_source:
+        try:
+            os.replace(src, dst)
+            return "rename"
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        # 跨檔案系統：只能複製
+        method = "copy"
+    else:
+        method = None
+
+    tmp_path = dst + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    if method is None:
+        for method, link in (("hardlink", os.link), ("reflink", _reflink)):
+            try:
+                link(src, tmp_path)
+                break
+            except OSError:
+                continue
+        else:
+            method = "copy"
+    if method == "copy":
+        _stream_copy(src, tmp_path)
+    os.replace(tmp_path, dst)
+    if not keep_source:
+        os.remove(src)
+    return method
+
+
+def gc_temp_files(temp_dir, video_id):
+    """刪除暫存資料夾中屬於這支影片的檔案 (<id>.*)，回傳釋放的位元組數"""
+    freed = 0
+    try:
+        names = os.listdir(temp_dir)
+    except FileNotFoundError:
+        return 0
+    prefix = f"{video_id}."
+    for name in names:
+        if not name.startswith(prefix):
+            continue
+        path = os.path.join(temp_dir, name)
+        try:
+            if os.path.isfile(path):
+                size = os.path.getsize(path)
+                os.remove(path)
+                freed += size
+        except OSError as e:
+            print(f"   ⚠️ 無法刪除暫存檔 {name}: {e}")
+    return freed
+
+
+def gc_completed_lessons(temp_dir, output_dir):
+    """清掉所有已完成課程 (課程資料夾中有 <id>.json) 的暫存檔，回傳 (課程數, 釋放的位元組數)"""
+    try:
+        names = os.listdir(temp_dir)
+    except FileNotFoundError:
+        return 0, 0
+    video_ids = {name.split(".", 1)[0] for name in names if "." in name and not name.startswith(".")}
+    lessons = 0
+    freed = 0
+    for video_id in sorted(video_ids):
+        if os.path.exists(os.path.join(output_dir, f"{video_id}.json")):
+            size = gc_temp_files(temp_dir, video_id)
+            if size:
+                lessons += 1
+                freed += size
+    return lessons, freed
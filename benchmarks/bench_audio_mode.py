@@ -0,0 +1,83 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+# 量測影片模式 vs 純音訊 (MP3) 模式的解碼 CPU 用量
+# 用法: python benchmarks/bench_audio_mode.py app_assets/<id>.json [--seconds 20]
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+def run_child(mode, media_path, seconds):
+    """在子行程中播放 seconds 秒，回傳 CPU 秒數 (user + sys)"""
+    from PySide6.QtCore import QUrl, QTimer
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput, QVideoSink
+
+    app = QApplication([])
+    player = QMediaPlayer()
+    audio = QAudioOutput()
+    audio.setMuted(True)
+    player.setAudioOutput(audio)
+    if mode == "video":
+        # 與播放器相同：影像會被解碼並送到輸出 (此處用 QVideoSink 取代 QVideoWidget)
+        sink = QVideoSink()
+        player.setVideoOutput(sink)
+    player.setSource(QUrl.fromLocalFile(os.path.abspath(media_path)))
+
+    result = {}
+
+    def start():
+        player.play()
+        result["cpu0"] = time.process_time()
+        result["wall0"] = time.perf_counter()
+        QTimer.singleShot(int(seconds * 1000), finish)
+
+    def finish():
+        result["cpu"] = time.process_time() - result["cpu0"]
+        result["wall"] = time.perf_counter() - result["wall0"]
+        player.stop()
+        app.quit()
+
+    QTimer.singleShot(500, start)  # 先讓後端開啟檔案
+    app.exec()
+    return result["cpu"], result["wall"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="影片模式與純音訊模式的解碼 CPU 比較")
+    parser.add_argument("lesson_json", nargs="?")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        cpu, wall = run_child(args.child[0], args.child[1], args.seconds)
+        print(json.dumps({"cpu_s": cpu, "wall_s": wall}))
+        return
+
+    if not args.lesson_json:
+        parser.error("請指定課程 JSON (需要同資料夾中的 MP4 與 MP3)")
+    with open(args.lesson_json, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    base = os.path.dirname(args.lesson_json)
+    media = {
+        "video": os.path.join(base, data["video_filename"]),
+        "audio_only": os.path.join(base, data["audio_filename"]),
+    }
+
+    results = {"lesson": os.path.basename(args.lesson_json), "seconds": args.seconds}
+    for mode, path in media.items():
+        out = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), "--seconds", str(args.seconds), "--child", mode, path],
+            text=True)
+        measured = json.loads(out.strip().splitlines()[-1])
+        results[f"{mode}_cpu_percent"] = round(100 * measured["cpu_s"] / measured["wall_s"], 1)
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
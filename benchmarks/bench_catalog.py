@@ -0,0 +1,77 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lesson_catalog import LessonCatalog, is_lesson_file
+from synthetic_lessons import write_library
+
+
+def scan_full_parse(assets_dir):
+    """舊版 _refresh_lesson_list 的做法：每個 JSON 都完整 json.load 只為了取 title"""
+    titles = []
+    for f in sorted(x for x in os.listdir(assets_dir) if is_lesson_file(x)):
+        with open(os.path.join(assets_dir, f), 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        titles.append(data.get('title', f))
+    return titles
+
+
+def scan_catalog(assets_dir):
+    catalog = LessonCatalog(assets_dir)
+    catalog.refresh()
+    return [catalog.get(f)["title"] for f in catalog.filenames()]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="課程清單啟動時間比較 (完整解析 vs 課程索引)")
+    parser.add_argument("--lessons", type=int, default=500)
+    parser.add_argument("--segments", type=int, default=300)
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出結果")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as assets_dir:
+        write_library(assets_dir, args.lessons, args.segments)
+
+        t_full, titles_full = timed(scan_full_parse, assets_dir)
+        t_cold, titles_cold = timed(scan_catalog, assets_dir)   # 第一次：建立索引
+        t_warm, titles_warm = timed(scan_catalog, assets_dir)   # 之後的啟動：全部命中
+
+        # 只修改一個課程，模擬工廠新增/更新一課
+        changed = os.path.join(assets_dir, sorted(os.listdir(assets_dir))[1])
+        with open(changed, 'a', encoding='utf-8') as f:
+            f.write("\n")
+        t_incr, _ = timed(scan_catalog, assets_dir)
+
+        assert titles_full == titles_cold == titles_warm
+
+    results = {
+        "lessons": args.lessons,
+        "segments_per_lesson": args.segments,
+        "full_parse_s": round(t_full, 4),
+        "catalog_cold_s": round(t_cold, 4),
+        "catalog_warm_s": round(t_warm, 4),
+        "catalog_one_changed_s": round(t_incr, 4),
+    }
+    if args.json:
+        print(json.dumps(results))
+    else:
+        print(f"📚 {args.lessons} 個課程 x {args.segments} 片段")
+        print(f"   完整解析 (舊版):      {t_full * 1000:9.1f} ms")
+        print(f"   索引首次建立:         {t_cold * 1000:9.1f} ms")
+        print(f"   索引命中 (一般啟動):  {t_warm * 1000:9.1f} ms")
+        print(f"   索引 + 1 個變動檔案:  {t_incr * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
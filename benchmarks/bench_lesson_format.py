@@ -0,0 +1,105 @@
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lesson_binary import BinaryLesson, write_binary_lesson, binary_path_for
+from synthetic_lessons import make_lesson
+
+
+def load_json(json_path):
+    with open(json_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_binary_views(json_path):
+    """只建立 mmap + NumPy view (零複製)"""
+    lesson = BinaryLesson(binary_path_for(json_path))
+    return lesson, lesson.segment_times, lesson.word_times
+
+
+def load_binary_dict(json_path):
+    """二進位檔還原成 JSON 結構 (播放器目前的用法)"""
+    with BinaryLesson(binary_path_for(json_path)) as lesson:
+        return lesson.to_dict()
+
+
+METHODS = {
+    "json": load_json,
+    "binary_views": load_binary_views,
+    "binary_to_dict": load_binary_dict,
+}
+
+
+def current_rss_kb():
+    """目前的 RSS (KB)；Linux 讀 /proc，其他平台退回 ru_maxrss (峰值)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure_rss_child(method, json_path):
+    """在子行程中載入一次，回傳 RSS 增量 (KB)；子行程避免互相干擾"""
+    out = subprocess.check_output(
+        [sys.executable, os.path.abspath(__file__), "--child", method, json_path], text=True)
+    return int(out.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="課程格式解析時間與記憶體比較 (JSON vs 二進位)")
+    parser.add_argument("--segments", type=int, default=3000, help="片段數 (約 3 小時課程)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出結果")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        method, json_path = args.child
+        before = current_rss_kb()
+        keep = METHODS[method](json_path)
+        print(current_rss_kb() - before)
+        return
+
+    results = {"segments": args.segments}
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "lesson.json")
+        data = make_lesson("lesson", args.segments, with_words=True)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        write_binary_lesson(data, binary_path_for(json_path))
+
+        results["json_bytes"] = os.path.getsize(json_path)
+        results["binary_bytes"] = os.path.getsize(binary_path_for(json_path))
+
+        for name, func in METHODS.items():
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                func(json_path)
+                timings.append(time.perf_counter() - start)
+            results[f"{name}_ms"] = round(min(timings) * 1000, 2)
+            results[f"{name}_rss_kb"] = measure_rss_child(name, json_path)
+
+    if args.json:
+        print(json.dumps(results))
+        return
+    print(f"📦 {args.segments} 片段課程")
+    print(f"   檔案大小: JSON {results['json_bytes'] / 1024:.0f} KB, 二進位 {results['binary_bytes'] / 1024:.0f} KB")
+    for name in METHODS:
+        print(f"   {name:15s} {results[name + '_ms']:9.2f} ms   RSS +{results[name + '_rss_kb']} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import os
+import sys
+import gc
+import json
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lesson_model import Lesson
+from synthetic_lessons import make_lesson
+
+
+def retained_bytes(build):
+    """build() 回傳的物件在 GC 之後實際佔用的記憶體 (tracemalloc)"""
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="課程記憶體用量比較 (原始 dict vs Lesson 模型)")
+    parser.add_argument("--segments", type=int, default=2500, help="片段數 (預設約 3 小時)")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出結果")
+    args = parser.parse_args()
+
+    data = make_lesson("lesson", args.segments, with_words=True)
+    text = json.dumps(data, ensure_ascii=False)
+    duration_h = data["duration"] / 3600
+
+    dict_bytes = retained_bytes(lambda: json.loads(text))
+    model_bytes = retained_bytes(lambda: Lesson.from_dict(json.loads(text)))
+
+    results = {
+        "segments": args.segments,
+        "words": sum(len(seg["words"]) for seg in data["segments"]),
+        "duration_hours": round(duration_h, 2),
+        "dict_mb": round(dict_bytes / 2**20, 2),
+        "model_mb": round(model_bytes / 2**20, 2),
+    }
+    if args.json:
+        print(json.dumps(results))
+        return
+    print(f"🧠 {args.segments} 片段 / {results['words']} 單字 (約 {duration_h:.1f} 小時)")
+    print(f"   原始 JSON dict: {results['dict_mb']:8.2f} MB")
+    print(f"   Lesson 模型:    {results['model_mb']:8.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
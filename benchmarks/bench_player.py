@@ -0,0 +1,243 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+
+# 播放器熱路徑基準測試 (Qt offscreen，不需要螢幕與媒體檔)
+# 以合成課程驅動 LanguagePlayer.on_position_changed：各播放速度的線性播放 + 隨機跳轉，
+# 每個組態在獨立子行程中執行，輸出 tick 延遲百分位、課程載入時間、課程清單掃描時間與峰值記憶體。
+# 用法: python benchmarks/bench_player.py [--segments 100 1000 5000 20000] [--output result.json]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from synthetic_lessons import make_lesson, write_library
+
+TICK_INTERVAL_MS = 50   # 模擬 positionChanged 的間隔 (真實時間)
+TARGET_NAME = "a_bench_lesson.json"  # 排在課程清單第一個 (啟動時自動載入)
+
+
+def percentiles(samples_s):
+    """回傳 p50/p95/p99/max (ms)"""
+    if not samples_s:
+        return {}
+    ordered = sorted(samples_s)
+
+    def pick(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))] * 1000.0, 4)
+
+    return {"count": len(ordered), "p50_ms": pick(50), "p95_ms": pick(95), "p99_ms": pick(99),
+            "max_ms": round(ordered[-1] * 1000.0, 4)}
+
+
+def peak_rss_kb():
+    """峰值 RSS (KB)；Linux 讀 /proc 的 VmHWM (exec 後重新計算)，其他平台退回 ru_maxrss"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def wait_for_load(app, window, json_path):
+    """呼叫 load_lesson 並等待背景載入完成，回傳秒數"""
+    done = {}
+
+    def on_loaded(request_id, prepared):
+        done["t"] = time.perf_counter()
+
+    window.load_signals.loaded.connect(on_loaded)
+    start = time.perf_counter()
+    window.load_lesson(json_path)
+    while "t" not in done:
+        app.processEvents()
+        time.sleep(0.0005)
+    app.processEvents()  # 讓 _on_lesson_loaded 執行完
+    window.load_signals.loaded.disconnect(on_loaded)
+    return done["t"] - start
+
+
+def wait_idle(app, window):
+    """等待背景的課程清單同步與搜尋/單字索引完成 (避免量測 tick 時被背景工作干擾)"""
+    while True:
+        window.catalog_pool.waitForDone()
+        window.index_pool.waitForDone()
+        app.processEvents()
+        if not (window._catalog_running or window._index_running or window.assets_watch_timer.isActive()):
+            break
+        time.sleep(0.005)
+    from desktop_player import QThreadPool
+    QThreadPool.globalInstance().waitForDone()
+    app.processEvents()
+
+
+def drive(app, window, positions, repaint):
+    """依序送出位置，回傳每個 tick 的延遲 (秒)；repaint=True 時包含字幕重畫 (processEvents)"""
+    handler = window.on_position_changed
+    perf_counter = time.perf_counter
+    samples = []
+    for pos in positions:
+        start = perf_counter()
+        handler(pos)
+        if repaint:
+            app.processEvents()
+        samples.append(perf_counter() - start)
+    return samples
+
+
+def run_child(args):
+    """單一組態：在暫存資料夾中建立課程庫並啟動播放器"""
+    from PySide6.QtWidgets import QApplication
+    import desktop_player
+    from lesson_catalog import LessonCatalog, CATALOG_FILENAME
+
+    result = {"segments": args.segments, "with_words": args.with_words, "long_zh": args.long_zh}
+    app = QApplication([])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        assets_dir = os.path.join(tmp, "app_assets")
+        noise_dir = os.path.join(tmp, "noises")
+        os.makedirs(noise_dir)
+        write_library(assets_dir, args.library, n_segments=300)
+        data = make_lesson("bench", args.segments, args.with_words, args.long_zh)
+        json_path = os.path.join(assets_dir, TARGET_NAME)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+        # 課程清單掃描：冷 (第一次建立索引) 與熱 (一般啟動)
+        start = time.perf_counter()
+        LessonCatalog(assets_dir).refresh()
+        result["catalog_cold_ms"] = round((time.perf_counter() - start) * 1000.0, 2)
+        start = time.perf_counter()
+        LessonCatalog(assets_dir).refresh()
+        result["catalog_warm_ms"] = round((time.perf_counter() - start) * 1000.0, 2)
+        os.remove(os.path.join(assets_dir, CATALOG_FILENAME))  # 播放器本身也從冷啟動開始
+
+        desktop_player.ASSETS_DIR = assets_dir
+        desktop_player.NOISE_DIR = noise_dir
+        # 啟動：第一次繪製 (快取清單) 與多媒體初始化 + 第一課載入完成
+        # 沒有 .catalog.json 時清單在背景同步完成後才有課程，同步完成後才自動載入第一課
+        start = time.perf_counter()
+        window = desktop_player.LanguagePlayer()
+        window.show()
+        app.processEvents()
+        result["first_paint_ms"] = round((time.perf_counter() - start) * 1000.0, 2)
+        while (not window.ready or not window._catalog_synced or window._current_json_path is None
+               or window._load_task is not None):
+            app.processEvents()
+            time.sleep(0.0005)
+        result["startup_ms"] = round((time.perf_counter() - start) * 1000.0, 2)
+        # 啟動後的課程索引 (搜尋/單字) 在背景執行，完成後才開始量測
+        start = time.perf_counter()
+        wait_idle(app, window)
+        result["library_index_ms"] = round((time.perf_counter() - start) * 1000.0, 2)
+
+        # 課程載入 (背景執行緒 + UI 執行緒收尾)
+        result["lesson_load_json_ms"] = round(min(
+            wait_for_load(app, window, json_path) for _ in range(args.load_repeat)) * 1000.0, 2)
+        if desktop_player.BinaryLesson is not None:
+            from lesson_binary import write_binary_lesson, binary_path_for
+            write_binary_lesson(data, binary_path_for(json_path))
+            result["lesson_load_binary_ms"] = round(min(
+                wait_for_load(app, window, json_path) for _ in range(args.load_repeat)) * 1000.0, 2)
+
+        duration_ms = int(data["duration"] * 1000)
+        window.btn_subtitle_en.setChecked(True)
+        window.btn_subtitle_zh.setChecked(True)
+
+        # 線性播放：每個 combo_speed 速度
+        speeds = [window.combo_speed.itemText(i) for i in range(window.combo_speed.count())]
+        result["playback"] = {}
+        for text in speeds:
+            rate = float(text.replace("x", ""))
+            step = TICK_INTERVAL_MS * rate
+            positions = [int(i * step) % duration_ms for i in range(args.ticks)]
+            window.on_position_changed(0)
+            result["playback"][text] = {
+                "handler": percentiles(drive(app, window, positions, repaint=False)),
+                "tick": percentiles(drive(app, window, positions, repaint=True)),
+            }
+
+        # 隨機跳轉
+        rng = random.Random(0)
+        seeks = [rng.randrange(duration_ms) for _ in range(args.seeks)]
+        result["seek"] = {
+            "handler": percentiles(drive(app, window, seeks, repaint=False)),
+            "tick": percentiles(drive(app, window, seeks, repaint=True)),
+        }
+
+        window.close()
+        result["peak_rss_kb"] = peak_rss_kb()
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="播放器熱路徑基準測試 (offscreen)")
+    parser.add_argument("--segments", type=int, nargs="+", default=[100, 1000, 5000, 20000])
+    parser.add_argument("--ticks", type=int, default=2000, help="每個速度的線性播放 tick 數")
+    parser.add_argument("--seeks", type=int, default=500)
+    parser.add_argument("--library", type=int, default=50, help="課程清單中額外的課程數 (掃描時間)")
+    parser.add_argument("--load-repeat", type=int, default=3)
+    parser.add_argument("--output", help="結果 JSON 檔 (預設輸出到 stdout)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--with-words", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--long-zh", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.segments = args.segments[0]
+        print(json.dumps(run_child(args)))
+        return
+
+    runs = []
+    for n in args.segments:
+        for with_words in (True, False):
+            for long_zh in (False, True):
+                cmd = [sys.executable, os.path.abspath(__file__), "--child", "--segments", str(n),
+                       "--ticks", str(args.ticks), "--seeks", str(args.seeks),
+                       "--library", str(args.library), "--load-repeat", str(args.load_repeat)]
+                if with_words:
+                    cmd.append("--with-words")
+                if long_zh:
+                    cmd.append("--long-zh")
+                print(f"⏳ {n} 片段, words={with_words}, long_zh={long_zh}", file=sys.stderr)
+                out = subprocess.check_output(cmd, text=True)
+                runs.append(json.loads(out.strip().splitlines()[-1]))
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "tick_interval_ms": TICK_INTERVAL_MS,
+        "runs": runs,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"✅ 已輸出: {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
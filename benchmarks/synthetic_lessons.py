@@ -0,0 +1,74 @@
+import os
+import json
+import random
+
+# 合成課程產生器 (供 benchmarks 使用，格式與 YouTubeContentFactory 輸出相同)
+
+WORDS = ("the quick brown fox jumps over lazy dog language learning practice "
+         "listening speaking reading writing vocabulary grammar sentence example "
+         "important meaning difficult context pronunciation conversation").split()
+ZH_CHARS = "我們今天學習語言練習聽說讀寫詞彙文法句子例子重要意思困難上下文發音對話的是在有了"
+
+
+def make_segments(n_segments, with_words=True, long_zh=False, seed=0):
+    """產生 n_segments 個片段 (Gemini 處理後的格式)"""
+    rng = random.Random(seed)
+    segments = []
+    t = 0.0
+    for i in range(n_segments):
+        n_words = rng.randint(6, 18)
+        words = [rng.choice(WORDS) for _ in range(n_words)]
+        duration = n_words * rng.uniform(0.25, 0.45)
+        zh_len = rng.randint(60, 160) if long_zh else rng.randint(8, 30)
+
+        seg = {
+            "id": i,
+            "start_time": round(t, 2),
+            "end_time": round(t + duration, 2),
+            "text_en": " ".join(words),
+            "text_zh": "".join(rng.choice(ZH_CHARS) for _ in range(zh_len)),
+            "keywords": rng.sample(words, k=min(2, len(words))),
+        }
+        if with_words:
+            word_t = t
+            step = duration / n_words
+            seg["words"] = []
+            for w in words:
+                seg["words"].append({
+                    "word": f" {w}",
+                    "start": round(word_t, 2),
+                    "end": round(word_t + step * 0.9, 2),
+                    "probability": round(rng.uniform(0.6, 1.0), 3),
+                })
+                word_t += step
+        segments.append(seg)
+        t += duration + rng.choice((0.0, 0.0, 0.3))
+    return segments
+
+
+def make_lesson(lesson_id, n_segments, with_words=True, long_zh=False, seed=0):
+    segments = make_segments(n_segments, with_words, long_zh, seed)
+    return {
+        "lesson_id": lesson_id,
+        "title": f"Synthetic lesson {lesson_id}",
+        "source_url": f"https://www.youtube.com/watch?v={lesson_id}",
+        "video_filename": f"{lesson_id}.mp4",
+        "audio_filename": f"{lesson_id}.mp3",
+        "audio_only_size_mb": 0,
+        "duration": int(segments[-1]["end_time"]) + 1 if segments else 0,
+        "segments": segments,
+    }
+
+
+def write_library(assets_dir, count, n_segments=300, with_words=True, long_zh=False):
+    """在 assets_dir 寫入 count 個合成課程 JSON，回傳檔名清單"""
+    os.makedirs(assets_dir, exist_ok=True)
+    filenames = []
+    for i in range(count):
+        lesson_id = f"synthetic_{i:05d}"
+        data = make_lesson(lesson_id, n_segments, with_words, long_zh, seed=i)
+        path = os.path.join(assets_dir, f"{lesson_id}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        filenames.append(f"{lesson_id}.json")
+    return filenames
@@ -1,46 +1,936 @@
 import sys
 import os
 import json
+import time
+import threading
+from collections import OrderedDict
+from itertools import accumulate
+from bisect import bisect_left, bisect_right
+from lesson_catalog import LessonCatalog
+from lesson_model import Lesson
+from player_metrics import (PlayerMetrics, StartupTimer, metrics_requested, startup_measure_requested,
+                            create_overlay)
+from lesson_search import LessonSearchIndex
+from lesson_vocab import VocabularyStore, normalize_word, read_rare_words
+from media_cache import MediaCache, refetch_video
+try:
+    from lesson_binary import BinaryLesson, binary_path_for, is_binary_fresh
+except ImportError:
+    BinaryLesson = None  # 需要 numpy；沒有時只讀取 JSON
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLabel, QPushButton, QSlider, QComboBox, 
-                             QFrame, QSizePolicy, QListWidget)
-from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
-from PySide6.QtMultimediaWidgets import QVideoWidget
-from PySide6.QtCore import QUrl, Qt, QTime
+                             QFrame, QSizePolicy, QListWidget, QListWidgetItem, QLineEdit)
+from PySide6.QtGui import QPainter, QFont, QFontMetricsF, QColor, QStaticText, QTransform
+from PySide6.QtCore import (QUrl, Qt, QTime, QRectF, QPointF, QSize, QObject, Signal,
+                            QRunnable, QThreadPool, QTimer, QFileSystemWatcher)
 
 # --- 設定 ---
 ASSETS_DIR = "./app_assets"
 NOISE_DIR = "./noises"
+PREFETCH_CACHE_SIZE = 3   # 預先載入 (含目前) 的課程數上限
+HOVER_PREFETCH_MS = 300   # 滑鼠停在課程上多久才開始預先載入
+SEARCH_DELAY_MS = 250     # 輸入停頓多久才搜尋
+WATCH_DEBOUNCE_MS = 2000  # 資料夾變動後等待安靜這麼久才更新 (工廠一次寫入 JSON/MP3/MP4 只觸發一次)
+
+# --- 多媒體模組 (延後載入) ---
+# 匯入 QtMultimedia 會載入 FFmpeg 後端與音訊裝置，是冷啟動最慢的一段；
+# 視窗與課程清單先顯示，第一次繪製之後才由 load_multimedia() 匯入。
+QMediaPlayer = QAudioOutput = QVideoWidget = None
+NoiseEngine = is_noise_file = None
+
+
+def load_multimedia():
+    """匯入多媒體模組 (只有第一次呼叫需要時間)"""
+    global QMediaPlayer, QAudioOutput, QVideoWidget, NoiseEngine, is_noise_file
+    if QMediaPlayer is not None:
+        return
+    from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
+    from PySide6.QtMultimediaWidgets import QVideoWidget
+    from noise_engine import NoiseEngine, is_noise_file
+
+
+class SegmentTimeline:
+    """字幕片段時間軸索引 (載入課程時建立一次)
+
+    - starts / ends: 依開始時間排序的陣列，供 bisect 二分搜尋
+    - max_end: ends 的前綴最大值 (遞增)，找出第一個涵蓋某時間的片段 (較長的片段可能涵蓋之後不相鄰的短片段)
+    - 游標 (cursor): 正常播放時只往下一個片段遞增，跳轉 (seek) 時才回退到二分搜尋
+    """
+
+    def __init__(self, segments):
+        # segments 為 lesson_model.Segment (格式差異已在載入時正規化)
+        # 依開始時間排序 (相同開始時間時保留原始順序)
+        order = sorted(range(len(segments)), key=lambda i: (segments[i].start, i))
+        self.starts = [segments[i].start for i in order]
+        self.ends = [segments[i].end for i in order]
+        self.max_end = list(accumulate(self.ends, max))
+        self.order = order  # 排序位置 -> self.segments 的索引
+        self._cursor = -1
+
+    def __len__(self):
+        return len(self.order)
+
+    def locate(self, current_sec):
+        """回傳目前時間所在片段於 segments 中的索引，找不到時回傳 -1"""
+        n = len(self.order)
+        if n == 0:
+            return -1
+
+        cursor = self._cursor
+        if 0 <= cursor < n:
+            # 1. 仍在目前片段內 (且沒有更早開始的片段也涵蓋這個時間)
+            if self.starts[cursor] <= current_sec <= self.ends[cursor] and (
+                    cursor == 0 or self.max_end[cursor - 1] < current_sec):
+                return self.order[cursor]
+            # 2. 正常播放：目前為止的片段都已結束，前進到下一個片段或停留在兩片段之間的空白
+            if current_sec > self.max_end[cursor]:
+                nxt = cursor + 1
+                if nxt >= n or current_sec < self.starts[nxt]:
+                    return -1
+                if current_sec <= self.ends[nxt]:
+                    self._cursor = nxt
+                    return self.order[nxt]
+
+        # 3. 跳轉 (seek)：二分搜尋
+        pos = bisect_right(self.starts, current_sec) - 1
+        if pos < 0:
+            self._cursor = -1
+            return -1
+        # 片段重疊或首尾相接時，沿用原本「第一個符合的片段」規則：
+        # 前綴最大結束時間第一次 >= current_sec 的位置，就是第一個涵蓋目前時間的片段
+        first = bisect_left(self.max_end, current_sec, 0, pos + 1)
+        if first <= pos:
+            self._cursor = first
+            return self.order[first]
+        self._cursor = pos
+        return -1
+
+    def reset(self):
+        """清除游標 (切換課程或手動跳轉後使用)"""
+        self._cursor = -1
+
+    def next_start_after(self, current_sec):
+        """下一個片段的開始時間 (沒有則回傳 None)"""
+        pos = bisect_right(self.starts, current_sec)
+        return self.starts[pos] if pos < len(self.starts) else None
+
+
+class SubtitleRenderPlan:
+    """單一片段的字幕渲染計畫 (載入課程時預先編譯)
+
+    預先切好英文單字、keyword 標記與中文逐字 token；播放時只需計算高亮範圍，
+    再交給 SubtitleWidget 重繪有變動的字。
+    """
+
+    WINDOW = 2  # 進度估算時，前後各高亮幾個字
+    EPSILON = 0.001  # 1ms：時間區間包含結束點，狀態在結束點之後才改變
+
+    __slots__ = ("start_time", "end_time", "duration", "has_word_times", "words",
+                 "word_starts", "word_ends", "word_max_end", "keyword_flags", "chars",
+                 "en_keyword_scale", "en_hot_scale")
+
+    def __init__(self, seg):
+        self.start_time = seg.start
+        self.end_time = seg.end
+        self.duration = seg.end - seg.start
+
+        # A. 英文 (直接引用 Segment 的平行陣列，不另外複製)
+        self.has_word_times = seg.has_words
+        if self.has_word_times:
+            self.words = seg.words
+            self.word_starts = seg.word_starts
+            self.word_ends = seg.word_ends
+            # word_ends 的前綴最大值：Whisper/Gemini 的單字時間常有重疊，找出第一個仍在播放的字
+            self.word_max_end = tuple(accumulate(self.word_ends, max))
+            # 當前單字 1.2em 金色 (優先於 keyword)，keyword 1.1em 紅字
+            self.en_keyword_scale, self.en_hot_scale = 1.1, 1.2
+        else:
+            self.words = tuple(seg.text_en.split(' '))
+            self.word_starts = self.word_ends = self.word_max_end = ()
+            # 進度估算：keyword 1.2em 紅字優先，前後視窗 1.1em 金色
+            self.en_keyword_scale, self.en_hot_scale = 1.2, 1.1
+
+        # 移除標點符號來比對 keywords (keyword_set 已是小寫)
+        self.keyword_flags = tuple(w.strip('.,!?;:\'"').lower() in seg.keyword_set for w in self.words)
+
+        # B. 中文 (字串本身即可逐字索引，沒有 keyword)
+        self.chars = seg.text_zh
+
+    def _progress(self, current_sec):
+        if self.duration > 0:
+            return (current_sec - self.start_time) / self.duration
+        return 0.0
+
+    def _covering_words(self, current_sec):
+        """涵蓋 current_sec 的單字範圍 [lo, hi)：從第一個仍在播放的字到最後一個已開始的字
+
+        時間重疊的字會一起高亮；完全包在較長單字時間內、已經結束的短字也留在範圍內。
+        """
+        hi = bisect_right(self.word_starts, current_sec)
+        lo = bisect_left(self.word_max_end, current_sec, 0, hi)
+        return (lo, hi) if lo < hi else (0, 0)
+
+    def highlight_state(self, current_sec):
+        """回傳 (英文高亮範圍 (lo, hi), 中文高亮索引)；(0, 0) / -1 表示沒有高亮"""
+        progress = self._progress(current_sec)
+
+        if self.has_word_times:
+            # 使用精確的 word-level timestamps
+            en_range = self._covering_words(current_sec)
+        else:
+            # 回退到進度估算方式
+            word_count = len(self.words)
+            en_idx = max(0, min(int(progress * word_count), word_count - 1)) if word_count else -1
+            en_range = (en_idx, en_idx + 1) if en_idx >= 0 else (0, 0)
+
+        char_count = len(self.chars)
+        zh_idx = max(0, min(int(progress * char_count), char_count - 1)) if char_count else -1
+        return en_range, zh_idx
+
+    def _progress_time(self, index, count):
+        """進度估算中，第 index 個字開始高亮的時間 (加上極小值避免浮點誤差落在前一個字)"""
+        return self.start_time + self.duration * index / count + 1e-6
+
+    def next_change(self, current_sec):
+        """下一個可能改變高亮狀態的時間點 (秒，一定大於 current_sec)"""
+        (en_lo, en_hi), zh_idx = self.highlight_state(current_sec)
+        # 片段結束 (結束時間本身仍屬於此片段)
+        candidates = [self.end_time + self.EPSILON]
+
+        if self.has_word_times:
+            # 下一個字開始，或範圍內第一個字結束 (word_max_end[lo] 就是它的結束時間)
+            pos = bisect_right(self.word_starts, current_sec)
+            if pos < len(self.word_starts):
+                candidates.append(self.word_starts[pos])
+            if en_lo < en_hi:
+                candidates.append(self.word_max_end[en_lo] + self.EPSILON)
+        elif en_lo < en_hi:
+            candidates.append(self._progress_time(en_hi, len(self.words)))
+
+        if zh_idx >= 0:
+            candidates.append(self._progress_time(zh_idx + 1, len(self.chars)))
+
+        return max(min(candidates), current_sec + self.EPSILON)
+
+    def en_highlight(self, en_range):
+        """英文高亮範圍 [lo, hi) (進度估算時加上前後視窗)"""
+        lo, hi = en_range
+        if lo >= hi or self.has_word_times:
+            return lo, hi
+        return max(0, lo - self.WINDOW), hi + self.WINDOW
+
+    def zh_highlight(self, zh_idx):
+        """中文高亮範圍 [lo, hi)"""
+        if zh_idx < 0:
+            return 0, 0
+        return max(0, zh_idx - self.WINDOW), zh_idx + self.WINDOW + 1
+
+
+def build_render_plans(segments):
+    """為每個片段建立渲染計畫 (索引與 segments 相同)"""
+    return [SubtitleRenderPlan(seg) for seg in segments]
+
+
+class LessonLoadCancelled(Exception):
+    """背景載入被新的選取取消"""
+
+
+class PreparedLesson:
+    """已解析完成、可直接播放的課程 (Lesson 模型 + 時間軸索引 + 渲染計畫)"""
+
+    def __init__(self, json_path, lesson, timeline, render_plans, video_path, audio_path, stamp=None,
+                 rare_words=frozenset()):
+        self.json_path = json_path
+        self.stamp = stamp            # 解析前 JSON 的 (mtime_ns, size)，用來判斷快取是否過期
+        self.lesson = lesson
+        self.timeline = timeline
+        self.render_plans = render_plans
+        self.video_path = video_path  # 影片不存在時為 None
+        self.audio_path = audio_path  # 純音訊模式用的 MP3，不存在時為 None
+        self.rare_words = rare_words  # 在整個課程庫很少出現的單字 (單字資料庫)
+
+
+def prepare_lesson(json_path, cancel_event=None):
+    """解析課程 JSON 並建立索引 (可在背景執行緒中呼叫，不碰任何 Qt 元件)"""
+    def check_cancelled():
+        if cancel_event is not None and cancel_event.is_set():
+            raise LessonLoadCancelled()
+
+    stamp = lesson_file_stamp(json_path)
+    lesson = None
+    # 優先使用二進位課程檔 (.lesson)，直接從打包陣列建立模型
+    if BinaryLesson is not None and is_binary_fresh(json_path):
+        try:
+            # 轉換失敗時也要關閉 mmap，否則 Windows 上無法以 os.replace 覆寫 .lesson 檔
+            with BinaryLesson(binary_path_for(json_path)) as binary:
+                lesson = Lesson.from_binary(binary)
+        except Exception as e:
+            print(f"⚠️ 二進位課程檔讀取失敗，改讀 JSON: {e}")
+            lesson = None
+    if lesson is None:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            lesson = Lesson.from_dict(json.load(f))
+    check_cancelled()
+
+    timeline = SegmentTimeline(lesson.segments)
+    check_cancelled()
+    render_plans = build_render_plans(lesson.segments)
+    check_cancelled()
+
+    # 罕見字查詢 (三個資料表 JOIN) 也在背景執行，使用這個工作自己的唯讀連線
+    try:
+        rare_words = read_rare_words(os.path.dirname(json_path), os.path.basename(json_path))
+    except Exception as e:
+        print(f"⚠️ 無法讀取單字資料庫: {e}")
+        rare_words = frozenset()
+    check_cancelled()
+
+    def media_path(key):
+        filename = lesson.get(key)
+        path = os.path.join(os.path.dirname(json_path), filename or "")
+        return path if filename and os.path.exists(path) else None
+
+    return PreparedLesson(json_path, lesson, timeline, render_plans,
+                          media_path("video_filename"), media_path("audio_filename"), stamp, rare_words)
+
+
+def lesson_file_stamp(json_path):
+    try:
+        st = os.stat(json_path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class PreparedLessonCache:
+    """預先載入完成的課程 (LRU，數量有上限)；JSON 變動後自動失效"""
+
+    def __init__(self, max_size=PREFETCH_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()  # json_path -> PreparedLesson
+
+    def get(self, json_path):
+        prepared = self.entries.get(json_path)
+        if prepared is None:
+            return None
+        if prepared.stamp is None or prepared.stamp != lesson_file_stamp(json_path):
+            del self.entries[json_path]
+            return None
+        if prepared.video_path is not None and not os.path.exists(prepared.video_path):
+            del self.entries[json_path]  # 影片已被配額清除
+            return None
+        self.entries.move_to_end(json_path)
+        return prepared
+
+    def put(self, prepared):
+        self.entries[prepared.json_path] = prepared
+        self.entries.move_to_end(prepared.json_path)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def discard(self, json_path):
+        self.entries.pop(json_path, None)
+
+
+class LessonLoadSignals(QObject):
+    """背景載入結果 (跨執行緒送回 UI 執行緒)"""
+    loaded = Signal(int, object)     # (請求編號, PreparedLesson)
+    failed = Signal(int, str, str)   # (請求編號, json_path, 錯誤訊息)
+
+
+class LessonLoadTask(QRunnable):
+    """在 QThreadPool 中解析課程，避免大型 JSON 卡住視窗"""
+
+    def __init__(self, request_id, json_path, signals):
+        super().__init__()
+        self.request_id = request_id
+        self.json_path = json_path
+        self.signals = signals
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            prepared = prepare_lesson(self.json_path, self.cancel_event)
+        except LessonLoadCancelled:
+            return
+        except Exception as e:
+            if not self.cancel_event.is_set():
+                self.signals.failed.emit(self.request_id, self.json_path, str(e))
+            return
+        if not self.cancel_event.is_set():
+            self.signals.loaded.emit(self.request_id, prepared)
+
+
+class VideoRefetchSignals(QObject):
+    """背景重新下載影片的結果"""
+    finished = Signal(str, str)    # (json_path, 影片路徑)
+    failed = Signal(str, str, str)  # (json_path, 影片檔名, 錯誤訊息)
+
+
+class VideoRefetchTask(QRunnable):
+    """重新下載被配額清除的影片，完成後再執行一次配額 (不清除剛下載的影片)"""
+
+    def __init__(self, json_path, source_url, video_filename, signals):
+        super().__init__()
+        self.json_path = json_path
+        self.source_url = source_url
+        self.video_filename = video_filename
+        self.signals = signals
+
+    def run(self):
+        assets_dir = os.path.dirname(self.json_path)
+        try:
+            video_path = refetch_video(self.source_url, assets_dir, self.video_filename)
+        except Exception as e:
+            self.signals.failed.emit(self.json_path, self.video_filename, str(e))
+            return
+        try:
+            cache = MediaCache(assets_dir)
+            cache.touch(self.video_filename)
+            cache.enforce_quota(protect={self.video_filename})
+            cache.close()
+        except Exception as e:
+            print(f"⚠️ 影片配額執行失敗: {e}")
+        self.signals.finished.emit(self.json_path, video_path)
+
+
+class CatalogRefreshSignals(QObject):
+    finished = Signal(list, list)  # (新增或變動的檔名, 移除的檔名)
+
+
+class CatalogRefreshTask(QRunnable):
+    """在背景增量更新課程清單索引 (冷啟動或大量新增時要重新解析很多課程 JSON)
+
+    同一時間只會有一個工作修改 catalog；UI 執行緒只在完成訊號之後讀取。
+    """
+
+    def __init__(self, catalog, signals):
+        super().__init__()
+        self.catalog = catalog
+        self.signals = signals
+
+    def run(self):
+        try:
+            changed, removed = self.catalog.refresh()
+        except Exception as e:
+            print(f"⚠️ 課程清單更新失敗: {e}")
+            changed, removed = [], []
+        self.signals.finished.emit(changed, removed)
+
+
+class LibraryIndexSignals(QObject):
+    finished = Signal()
+
+
+class LibraryIndexTask(QRunnable):
+    """在背景增量更新搜尋索引與單字資料庫 (各自開自己的 SQLite 連線)"""
+
+    def __init__(self, assets_dir, signals):
+        super().__init__()
+        self.assets_dir = assets_dir
+        self.signals = signals
+
+    def run(self):
+        for name, store_class in (("🔎 搜尋索引", LessonSearchIndex), ("📊 單字資料庫", VocabularyStore)):
+            try:
+                store = store_class(self.assets_dir)
+                changed, removed = store.refresh()
+                store.close()
+            except Exception as e:
+                print(f"⚠️ {name}更新失敗: {e}")
+                continue
+            if changed or removed:
+                print(f"{name}已更新: {len(changed)} 個課程, {len(removed)} 個移除")
+        self.signals.finished.emit()
+
+
+class SubtitleWidget(QWidget):
+    """自繪字幕元件 (取代餵入大量 HTML 的 rich-text QLabel)
+
+    每個片段的字只排版一次 (QStaticText 快取字形)，高亮改變時只重繪
+    舊/新高亮字所在的矩形，不再觸發 rich-text 解析與整體重新排版。
+    """
+
+    wordActivated = Signal(int)  # 雙擊某個字 (字的索引)
+
+    COLOR_NORMAL = QColor("#DDDDDD")
+    COLOR_KEYWORD = QColor("#FF4444")  # keywords 紅字
+    COLOR_HOT = QColor("#FFD700")      # 目前播放位置 金色
+    COLOR_RARE = QColor("#66CCFF")     # 課程庫中很少出現的單字 淺藍
+    MESSAGE_FLAGS = int(Qt.AlignmentFlag.AlignCenter) | int(Qt.TextFlag.TextWordWrap)
+
+    def __init__(self, families, px, color, bold=False, separator=" ", message=""):
+        super().__init__()
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
+        self._families = families
+        self._separator = separator
+        self._base_px = px
+        self._base_color = QColor(color)
+        self._base_bold = bold
+
+        self._message = message
+        self._message_color = None  # None 表示沿用基本顏色
+        self._tokens = []
+        self._keyword_flags = []
+        self._rare_flags = None
+        self._keyword_scale = 1.0
+        self._hot_scale = 1.0
+        self._hot_over_keyword = True
+        self._hot = (0, 0)  # 高亮範圍 [lo, hi)
+
+        self._fonts = {}
+        self._ascents = {}
+        self._layouts = {}  # 寬度 -> (每個字的 QRectF, 總高度, 行 ascent)
+        self._static = {}   # (索引, 樣式) -> QStaticText
+        self._rebuild_fonts()
+
+    # --- 對外介面 ---
+    def set_base_font(self, px, color, bold=False):
+        """設定基本字型 (純音訊模式會放大字幕)"""
+        self._base_px = px
+        self._base_color = QColor(color)
+        self._base_bold = bold
+        self._rebuild_fonts()
+        self._invalidate()
+
+    def set_message(self, text, color=None):
+        """顯示一般提示文字 (標題、錯誤訊息等)"""
+        self._tokens = []
+        self._keyword_flags = []
+        self._rare_flags = None
+        self._hot = (0, 0)
+        self._message = text
+        self._message_color = QColor(color) if color else None
+        self._invalidate()
+
+    def clear(self):
+        self.set_message("")
+
+    def set_tokens(self, tokens, keyword_flags, keyword_scale=1.0, hot_scale=1.0, hot_over_keyword=True,
+                   rare_flags=None):
+        """換成新片段的字 (只有換片段時才重新排版)；keyword_flags / rare_flags 為 None 表示沒有"""
+        self._message = ""
+        self._tokens = tokens
+        self._keyword_flags = keyword_flags
+        self._rare_flags = rare_flags
+        self._hot = (0, 0)
+        if (keyword_scale, hot_scale) != (self._keyword_scale, self._hot_scale):
+            self._keyword_scale = keyword_scale
+            self._hot_scale = hot_scale
+            self._rebuild_fonts()
+        self._hot_over_keyword = hot_over_keyword
+        self._invalidate()
+
+    def set_highlight(self, lo, hi):
+        """更新高亮範圍，只重繪有變動的字"""
+        lo = max(0, min(lo, len(self._tokens)))
+        hi = max(lo, min(hi, len(self._tokens)))
+        old_lo, old_hi = self._hot
+        if (lo, hi) == (old_lo, old_hi):
+            return
+        self._hot = (lo, hi)
+
+        rects = self._layout_for(self.width())[0]
+        y_offset = self._y_offset()
+        dirty = set(range(old_lo, old_hi)) ^ set(range(lo, hi))
+        for i in dirty:
+            self.update(rects[i].translated(0, y_offset).toAlignedRect().adjusted(-1, -1, 1, 1))
+
+    # --- 排版 ---
+    def _rebuild_fonts(self):
+        def make_font(scale, bold):
+            font = QFont()
+            font.setFamilies(self._families)
+            font.setPixelSize(max(1, round(self._base_px * scale)))
+            font.setBold(bold)
+            return font
+
+        self._fonts = {
+            "normal": make_font(1.0, self._base_bold),
+            "keyword": make_font(self._keyword_scale, True),
+            "hot": make_font(self._hot_scale, True),
+        }
+        self._fonts["rare"] = self._fonts["normal"]  # 罕見字只換顏色，不影響排版
+        self._ascents = {name: QFontMetricsF(font).ascent() for name, font in self._fonts.items()}
+
+    def _invalidate(self):
+        self._layouts.clear()
+        self._static.clear()
+        self.updateGeometry()
+        self.update()
+
+    def _layout_for(self, width):
+        cached = self._layouts.get(width)
+        if cached is not None:
+            return cached
+
+        metrics = {name: QFontMetricsF(font) for name, font in self._fonts.items()}
+        sep_w = metrics["normal"].horizontalAdvance(self._separator) if self._separator else 0.0
+        line_height = max(m.height() for m in metrics.values())
+        line_ascent = max(m.ascent() for m in metrics.values())
+
+        # 每個字預留「一般/keyword」與「高亮」兩種字型中較寬者，高亮時不必重新排版
+        widths = []
+        flags = self._keyword_flags or [False] * len(self._tokens)
+        for token, is_kw in zip(self._tokens, flags):
+            base = metrics["keyword" if is_kw else "normal"].horizontalAdvance(token)
+            widths.append(max(base, metrics["hot"].horizontalAdvance(token)))
+
+        # 貪婪斷行
+        avail = max(1.0, width)
+        lines = []
+        current, current_w = [], 0.0
+        for i, w in enumerate(widths):
+            add = w if not current else sep_w + w
+            if current and current_w + add > avail:
+                lines.append((current, current_w))
+                current, current_w = [i], w
+            else:
+                current.append(i)
+                current_w += add
+        if current:
+            lines.append((current, current_w))
+
+        # 每行置中
+        rects = [None] * len(widths)
+        y = 0.0
+        for indices, line_w in lines:
+            x = (width - line_w) / 2
+            for i in indices:
+                rects[i] = QRectF(x, y, widths[i], line_height)
+                x += widths[i] + sep_w
+            y += line_height
+
+        layout = (rects, y, line_ascent)
+        self._layouts[width] = layout
+        return layout
+
+    def _y_offset(self):
+        height = self._layout_for(self.width())[1]
+        return max(0.0, (self.height() - height) / 2)
+
+    def _style_of(self, i):
+        lo, hi = self._hot
+        is_kw = self._keyword_flags[i] if self._keyword_flags else False
+        if lo <= i < hi and (self._hot_over_keyword or not is_kw):
+            return "hot"
+        if is_kw:
+            return "keyword"
+        return "rare" if self._rare_flags and self._rare_flags[i] else "normal"
+
+    def _static_text(self, i, style):
+        key = (i, style)
+        static = self._static.get(key)
+        if static is None:
+            static = QStaticText(self._tokens[i])
+            static.setTextFormat(Qt.TextFormat.PlainText)
+            static.prepare(QTransform(), self._fonts[style])
+            self._static[key] = static
+        return static
+
+    # --- Qt 覆寫 ---
+    def hasHeightForWidth(self):
+        return True
+
+    def heightForWidth(self, width):
+        if self._message:
+            metrics = QFontMetricsF(self._fonts["normal"])
+            bounds = metrics.boundingRect(QRectF(0, 0, width, 10000), self.MESSAGE_FLAGS, self._message)
+            return int(bounds.height()) + 1
+        return int(self._layout_for(width)[1]) + 1
+
+    def sizeHint(self):
+        return QSize(400, self.heightForWidth(400))
+
+    def minimumSizeHint(self):
+        return QSize(0, int(QFontMetricsF(self._fonts["normal"]).height()))
+
+    def resizeEvent(self, event):
+        self._layouts.clear()
+        super().resizeEvent(event)
+
+    def mouseDoubleClickEvent(self, event):
+        if not self._message and self._tokens:
+            rects = self._layout_for(self.width())[0]
+            pos = event.position()
+            y_offset = self._y_offset()
+            for i, rect in enumerate(rects):
+                if rect.translated(0, y_offset).contains(pos):
+                    self.wordActivated.emit(i)
+                    return
+        super().mouseDoubleClickEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+
+        if self._message:
+            painter.setFont(self._fonts["normal"])
+            painter.setPen(self._message_color or self._base_color)
+            painter.drawText(self.rect(), self.MESSAGE_FLAGS, self._message)
+            return
+
+        rects, _, line_ascent = self._layout_for(self.width())
+        y_offset = self._y_offset()
+        dirty = QRectF(event.rect())
+        colors = {"normal": self.COLOR_NORMAL, "keyword": self.COLOR_KEYWORD, "hot": self.COLOR_HOT,
+                  "rare": self.COLOR_RARE}
+        for i, rect in enumerate(rects):
+            rect = rect.translated(0, y_offset)
+            if not rect.intersects(dirty):
+                continue
+            style = self._style_of(i)
+            static = self._static_text(i, style)
+            x = rect.x() + (rect.width() - static.size().width()) / 2
+            y = rect.y() + line_ascent - self._ascents[style]
+            painter.setPen(colors[style])
+            painter.drawStaticText(QPointF(x, y), static)
+
+
+class SubtitleScheduler(QObject):
+    """字幕排程器：與 positionChanged 的更新頻率脫鉤
+
+    以播放速度 + 單調時鐘 (time.monotonic) 推算兩次 positionChanged 之間的播放位置，
+    並用單次計時器 (single-shot QTimer) 準確地在下一個單字/片段邊界觸發，
+    不做輪詢；沒有變化時完全不佔 CPU。
+    """
+
+    DRIFT_TOLERANCE_MS = 150  # 推算位置與播放器回報差距超過此值才重新對齊 (例如跳轉)
+    MIN_DELAY_MS = 1
+
+    def __init__(self, render, next_event):
+        super().__init__()
+        self._render = render          # render(position_ms)
+        self._next_event = next_event  # next_event(position_ms) -> 下一個事件的位置 (ms) 或 None
+        self._anchor_pos = 0.0
+        self._anchor_clock = time.monotonic()
+        self._rate = 1.0
+        self._playing = False
+        self._due_clock = None  # 計時器預定觸發的 monotonic 時間 (量測遲到用)
+        self.metrics = None     # player_metrics.PlayerMetrics (選用)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.timeout.connect(self._on_timeout)
+
+    def position_ms(self):
+        """推算目前的播放位置"""
+        if not self._playing:
+            return self._anchor_pos
+        return self._anchor_pos + (time.monotonic() - self._anchor_clock) * 1000.0 * self._rate
+
+    def _anchor(self, position_ms):
+        self._anchor_pos = float(position_ms)
+        self._anchor_clock = time.monotonic()
+
+    def sync(self, position_ms):
+        """播放器回報位置 (positionChanged)；只有偏差過大時才重新對齊時鐘"""
+        if not self._playing or abs(self.position_ms() - position_ms) > self.DRIFT_TOLERANCE_MS:
+            self._anchor(position_ms)
+            self.refresh()
+        elif not self._timer.isActive():
+            self.refresh()
+
+    def set_rate(self, rate):
+        self._anchor(self.position_ms())
+        self._rate = rate
+        self._reschedule()
+
+    def set_playing(self, playing, position_ms=None):
+        if position_ms is None:
+            position_ms = self.position_ms()
+        self._anchor(position_ms)
+        self._playing = playing
+        self.refresh()
+
+    def refresh(self):
+        """立即以推算位置重畫，並排定下一個事件"""
+        self._render(self.position_ms())
+        self._reschedule()
+
+    def stop(self):
+        self._playing = False
+        self._timer.stop()
+
+    def _reschedule(self):
+        self._timer.stop()
+        if not self._playing or self._rate <= 0:
+            return
+        now = self.position_ms()
+        target = self._next_event(now)
+        if target is None:
+            return
+        delay = (target - now) / self._rate
+        delay_ms = max(self.MIN_DELAY_MS, int(delay + 0.999))
+        self._due_clock = time.monotonic() + delay_ms / 1000.0
+        self._timer.start(delay_ms)
+
+    def _on_timeout(self):
+        if self.metrics is not None and self._due_clock is not None:
+            self.metrics.lateness("subtitle_timer", (time.monotonic() - self._due_clock) * 1000.0)
+        self.refresh()
+
 
 class LanguagePlayer(QMainWindow):
-    def __init__(self):
+    def __init__(self, metrics=None, startup=None):
         super().__init__()
         self.setWindowTitle("AI 語言學習播放器 v6.0 (純音訊模式)")
         self.resize(1200, 850)
 
         # 資料變數
-        self.current_json_data = None
+        self.current_lesson = None  # lesson_model.Lesson
         self.segments = []
-        self.noises = self._scan_noises()
+        self.timeline = SegmentTimeline([])
+        self.render_plans = []
+        self._subtitle_state = None  # 上一次輸出到字幕標籤的高亮狀態
+        self.noises = []  # 多媒體初始化後才掃描 (需要噪音引擎判斷格式)
         
         # 狀態變數
         self.noise_target_volume = 0.3 # 記住使用者設定的噪聲最大音量 (0.0 ~ 1.0)
         self.video_duration = 0
         self.audio_only_mode = False  # 純音訊模式開關
+        self.current_video_path = None
+        self.current_audio_path = None
+        self._current_source = None    # 目前播放器載入的檔案 (影片或 MP3)
+        self._pending_restore = None   # 切換來源後要恢復的 (位置, 是否播放中)
+        self._failed_sources = set()   # 目前課程無法開啟的媒體檔 (改用另一個來源)
+        self.catalog = LessonCatalog(ASSETS_DIR)  # 課程清單索引 (只有選取時才載入完整課程)
+
+        # 背景載入
+        self.load_pool = QThreadPool.globalInstance()
+        self.load_signals = LessonLoadSignals()
+        self.load_signals.loaded.connect(self._on_lesson_loaded)
+        self.load_signals.failed.connect(self._on_lesson_load_failed)
+        self._load_task = None        # 目前正在載入的工作
+        self._load_request_id = 0     # 只接受最新一次請求的結果
+        self._load_started = 0.0
+
+        # 課程清單同步：解析新增/變動的 JSON 在背景執行，完成前先顯示快取的清單
+        self.catalog_pool = QThreadPool(self)
+        self.catalog_pool.setMaxThreadCount(1)
+        self.catalog_signals = CatalogRefreshSignals()
+        self.catalog_signals.finished.connect(self._on_catalog_refreshed)
+        self._catalog_running = False
+        self._catalog_rerun = False
+        self._catalog_synced = False    # 啟動後第一次同步完成
+
+        # 索引更新：第一次建立時每課約 70 ms，使用自己的單執行緒池，不佔用課程載入的執行緒；
+        # 同一時間只執行一次，執行中又有變動時，結束後再更新一次
+        self.index_pool = QThreadPool(self)
+        self.index_pool.setMaxThreadCount(1)
+        self.index_signals = LibraryIndexSignals()
+        self.index_signals.finished.connect(self._on_library_index_finished)
+        self._index_running = False
+        self._index_rerun = False
+
+        # 預先載入：下一課 / 滑鼠停留的課程在背景解析，並在備用播放器中先開啟媒體
+        self.prepared_cache = PreparedLessonCache()
+        self.prefetch_signals = LessonLoadSignals()
+        self.prefetch_signals.loaded.connect(self._on_lesson_prefetched)
+        self.prefetch_signals.failed.connect(self._on_lesson_prefetch_failed)
+        self._prefetching = {}          # json_path -> 完成後是否要預先開啟媒體
+        self._current_json_path = None
+        self._standby_source = None     # 備用播放器目前開啟的檔案
+        self._seek_after_load = None    # 搜尋結果：載入後跳到的位置 (ms)
+        self.search_index = None        # lesson_search.LessonSearchIndex (UI 執行緒，第一次搜尋時開啟)
+        self.vocab = None               # lesson_vocab.VocabularyStore (UI 執行緒，點選單字時才開啟)
+        self._rare_words = set()        # 目前課程中在整個課程庫很少出現的單字
 
-        # 初始化 UI
+        # 影片配額：記錄播放時間 (最久沒播放的影片會被清除)，被清除的影片在背景重新下載
+        self.media_cache = None         # media_cache.MediaCache (UI 執行緒)
+        self._play_recorded_for = None  # 這次載入的課程已記錄播放
+        self._refetching = set()        # 正在重新下載 (或排隊中) 的影片 stem
+        # 下載可能要好幾分鐘：使用自己的單執行緒池，不佔用課程載入的執行緒
+        self.refetch_pool = QThreadPool(self)
+        self.refetch_pool.setMaxThreadCount(1)
+        self.refetch_signals = VideoRefetchSignals()
+        self.refetch_signals.finished.connect(self._on_video_refetched)
+        self.refetch_signals.failed.connect(self._on_video_refetch_failed)
+
+        # 快速啟動：先顯示視窗與快取的課程清單，第一次繪製後才初始化多媒體並載入第一課
+        self.startup = startup if startup is not None else StartupTimer()
+        self.ready = False              # 多媒體初始化完成前，播放控制項停用
+        self._first_painted = False
+        self._pending_lesson = None     # 就緒前使用者選取的課程
+        self.player_video = None
+        self.player_standby = None
+
+        # 效能量測 (選用)：必須在綁定訊號之前包裝熱路徑函式
+        self.metrics = metrics
+        if self.metrics is not None:
+            self._wrap_hot_paths()
+
+        # 初始化 UI (只有介面元件與快取的課程清單，不開檔、不載入多媒體)
         self._init_ui()
+        self._show_cached_lesson_list()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._first_painted:
+            self._first_painted = True
+            self.startup.mark("first_paint")
+            # 排到事件佇列：讓這一幀先送到螢幕
+            QTimer.singleShot(0, self._finish_startup)
+
+    def _finish_startup(self):
+        """第一次繪製之後：初始化多媒體、同步課程清單並載入第一課"""
+        load_multimedia()
         self._init_media_players()
-        
-        # 啟動時掃描課程列表
-        self._refresh_lesson_list()
+        if self.metrics is not None:
+            self._init_metrics_overlay()
+        self.startup.mark("media_ready")
+
+        self.ready = True
+        self.progress_container.setEnabled(True)
+        self.control_panel.setEnabled(True)
+        self._init_watchers()
+        self._update_noise_list()
+        self._update_lesson_list()  # 背景同步；清單原本是空的時，完成後自動載入第一課
+
+        if self._load_task is None and self._current_json_path is None:
+            json_path, self._pending_lesson = self._pending_lesson, None
+            if json_path is None and self._lesson_files:
+                row = max(0, self.list_widget.currentRow())
+                json_path = os.path.join(ASSETS_DIR, self._lesson_files[row])
+            if json_path is not None:
+                self.load_lesson(json_path)
+            elif os.path.isdir(ASSETS_DIR):
+                self._show_subtitle_message(self.sub_en, "沒有課程資料")
+        if self._load_task is None and self._current_source is None:
+            self._startup_finished()  # 沒有課程或媒體：多媒體就緒即可操作
+
+    def _startup_finished(self):
+        """第一課的媒體可以播放 (只記錄一次)"""
+        if self.startup.done:
+            return
+        self.startup.finish(self.metrics)
+
+    def _wrap_hot_paths(self):
+        """以量測版本取代熱路徑函式 (實例屬性會蓋過類別方法，訊號也會連到包裝後的版本)"""
+        for name in ("on_position_changed", "update_subtitle", "update_noise_intermittence", "load_lesson"):
+            setattr(self, name, self.metrics.wrap(name, getattr(self, name)))
+
+    def _init_metrics_overlay(self):
+        """計算字幕元件 / 時間標籤的更新次數，並建立 F12 統計面板"""
+        for widget_name in ("sub_en", "sub_zh"):
+            widget = getattr(self, widget_name)
+            for method in ("set_tokens", "set_highlight", "set_message", "clear"):
+                self.metrics.count_calls(widget, method, f"{widget_name}.{method}")
+        self.metrics.count_calls(self.lbl_current_time, "setText", "lbl_current_time.setText")
+        self.subtitle_scheduler.metrics = self.metrics
+        self.metrics_overlay = create_overlay(self, self.metrics)
+        print("📊 效能量測已開啟 (F12 顯示統計面板，結束時輸出 JSON/CSV)")
 
     def _scan_noises(self):
-        """掃描 noises 資料夾中的 WAV 檔案 (QMediaPlayer 對 WAV 的支援最佳)"""
+        """掃描 noises 資料夾中的噪音檔 (WAV/MP3/FLAC，由噪音引擎解碼)"""
         if not os.path.exists(NOISE_DIR):
             os.makedirs(NOISE_DIR)
             return []
-        return [f for f in os.listdir(NOISE_DIR) if f.lower().endswith('.wav')]
+        return [f for f in os.listdir(NOISE_DIR) if is_noise_file(f)]
 
     def _init_ui(self):
         """建立介面元件"""
@@ -51,7 +941,6 @@ class LanguagePlayer(QMainWindow):
 
         # --- 1. 左側：課程播放清單 ---
         self.list_widget = QListWidget()
-        self.list_widget.setFixedWidth(250)
         self.list_widget.setStyleSheet("""
             QListWidget {
                 background-color: #2b2b2b;
@@ -69,7 +958,43 @@ class LanguagePlayer(QMainWindow):
             }
         """)
         self.list_widget.itemClicked.connect(self.on_lesson_selected)
-        main_layout.addWidget(self.list_widget)
+        # 滑鼠停在課程上時預先載入
+        self.list_widget.setMouseTracking(True)
+        self.list_widget.itemEntered.connect(self._on_lesson_hovered)
+        self._hovered_item = None
+        self.hover_timer = QTimer(self)
+        self.hover_timer.setSingleShot(True)
+        self.hover_timer.setInterval(HOVER_PREFETCH_MS)
+        self.hover_timer.timeout.connect(self._prefetch_hovered)
+
+        # 搜尋框：字幕全文 (英/中) + 關鍵字，結果直接跳到課程與片段時間
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("🔍 搜尋字幕 / 關鍵字")
+        self.search_box.setClearButtonEnabled(True)
+        self.search_box.setStyleSheet("background-color: #2b2b2b; color: #e0e0e0; padding: 6px; "
+                                      "border: 1px solid #3a3a3a; font-size: 14px;")
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self._run_search)
+        self.search_box.textChanged.connect(lambda _: self.search_timer.start())
+        self.search_box.returnPressed.connect(self._run_search)
+
+        self.search_results = QListWidget()
+        self.search_results.setStyleSheet(self.list_widget.styleSheet())
+        self.search_results.setWordWrap(True)
+        self.search_results.itemClicked.connect(self._open_search_hit)
+        self.search_results.hide()
+
+        left_layout = QVBoxLayout()
+        left_layout.setContentsMargins(0, 0, 0, 0)
+        left_layout.addWidget(self.search_box)
+        left_layout.addWidget(self.search_results)
+        left_layout.addWidget(self.list_widget)
+        left_panel = QWidget()
+        left_panel.setFixedWidth(250)
+        left_panel.setLayout(left_layout)
+        main_layout.addWidget(left_panel)
 
         # --- 2. 右側：播放器區域 ---
         right_panel = QWidget()
@@ -77,34 +1002,31 @@ class LanguagePlayer(QMainWindow):
         right_layout.setContentsMargins(0, 0, 0, 0)
         main_layout.addWidget(right_panel, stretch=1)
 
-        # A. 影片區域
-        self.video_widget = QVideoWidget()
-        self.video_widget.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-        right_layout.addWidget(self.video_widget, stretch=5)
+        # A. 影片區域 (QVideoWidget 在多媒體初始化後才放進來)
+        self.video_container = QWidget()
+        self.video_container.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        video_layout = QVBoxLayout(self.video_container)
+        video_layout.setContentsMargins(0, 0, 0, 0)
+        right_layout.addWidget(self.video_container, stretch=5)
 
         # B. 字幕區域
         subtitle_container = QFrame()
         subtitle_container.setStyleSheet("background-color: #1a1a1a; border-radius: 8px; margin: 10px; padding: 10px;")
         sub_layout = QVBoxLayout(subtitle_container)
         
-        self.lbl_en = QLabel("Ready")
-        self.lbl_en.setTextFormat(Qt.TextFormat.RichText)
-        self.lbl_en.setStyleSheet("font-size: 24px; font-family: Arial; color: #888;") 
-        self.lbl_en.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.lbl_en.setWordWrap(True)
-        
-        self.lbl_zh = QLabel("請選擇課程")
-        self.lbl_zh.setTextFormat(Qt.TextFormat.RichText)
-        self.lbl_zh.setStyleSheet("font-size: 20px; font-family: 'Microsoft JhengHei', sans-serif; color: #666;")
-        self.lbl_zh.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.lbl_zh.setWordWrap(True)
-
-        sub_layout.addWidget(self.lbl_en)
-        sub_layout.addWidget(self.lbl_zh)
+        # 自繪字幕元件：英文以空白分隔單字，中文逐字
+        self.sub_en = SubtitleWidget(["Arial"], 24, "#888", separator=" ", message="Ready")
+        self.sub_en.wordActivated.connect(self._on_subtitle_word_activated)  # 雙擊單字：列出所有出現位置
+        self.sub_zh = SubtitleWidget(["Microsoft JhengHei", "sans-serif"], 20, "#666", separator="", message="請選擇課程")
+
+        sub_layout.addWidget(self.sub_en)
+        sub_layout.addWidget(self.sub_zh)
         right_layout.addWidget(subtitle_container, stretch=2)
 
         # --- 新增：影片進度條區塊 ---
         progress_container = QWidget()
+        progress_container.setEnabled(False)  # 多媒體就緒後啟用
+        self.progress_container = progress_container
         progress_layout = QHBoxLayout(progress_container)
         progress_layout.setContentsMargins(10, 0, 10, 0)
         
@@ -125,6 +1047,8 @@ class LanguagePlayer(QMainWindow):
 
         # C. 控制面板
         control_panel = QFrame()
+        control_panel.setEnabled(False)  # 多媒體就緒後啟用
+        self.control_panel = control_panel
         control_layout = QHBoxLayout(control_panel)
 
         self.btn_play = QPushButton("▶ 播放")
@@ -190,6 +1114,7 @@ class LanguagePlayer(QMainWindow):
         self.combo_noise_ratio.addItems(list(self.noise_ratios.keys()))
         self.combo_noise_ratio.setCurrentText("100% (持續)")
         self.combo_noise_ratio.setFixedWidth(100)
+        self.combo_noise_ratio.currentTextChanged.connect(self.change_noise_ratio)
         control_layout.addWidget(self.combo_noise_ratio)
 
         # 噪音音量
@@ -260,64 +1185,180 @@ class LanguagePlayer(QMainWindow):
         self.show_subtitle_zh = True
 
     def _init_media_players(self):
+        self.video_widget = QVideoWidget()
+        self.video_widget.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.video_container.layout().addWidget(self.video_widget)
+
         self.player_video = QMediaPlayer()
         self.audio_video = QAudioOutput()
         self.player_video.setAudioOutput(self.audio_video)
         self.player_video.setVideoOutput(self.video_widget)
+        # 備用播放器：預先開啟下一課的媒體 (沒有輸出，不會發出聲音)，切換時直接與主播放器交換
+        self.player_standby = QMediaPlayer()
         
+        # 字幕排程器：在單字/片段邊界觸發，不依賴 positionChanged 的頻率
+        self.subtitle_scheduler = SubtitleScheduler(self.update_subtitle, self._next_subtitle_event_ms)
+
+        # 噪音引擎：QAudioSink 串流 + 逐取樣包絡線 (取代 QMediaPlayer + setVolume 開關)
+        self.noise_engine = NoiseEngine(self)
+        self.noise_engine.set_volume(self.noise_target_volume)
+        self.noise_engine.set_density(self.noise_ratios.get(self.combo_noise_ratio.currentText(), 1.0))
+        self.noise_engine.source_ready.connect(self._on_noise_source_ready)
+        self.noise_engine.source_failed.connect(self._on_noise_source_failed)
+
         # 綁定訊號
-        self.player_video.positionChanged.connect(self.on_position_changed)
-        self.player_video.durationChanged.connect(self.on_duration_changed)
+        self._connect_player(self.player_video)
 
-        self.player_noise = QMediaPlayer()
-        self.audio_noise = QAudioOutput()
-        self.player_noise.setAudioOutput(self.audio_noise)
-        self.player_noise.setLoops(-1)
-        self.audio_noise.setVolume(0.3) 
+    def _player_signal_slots(self, player):
+        return [
+            (player.positionChanged, self.on_position_changed),
+            (player.durationChanged, self.on_duration_changed),
+            (player.playbackStateChanged, self.on_playback_state_changed),
+            (player.playbackRateChanged, self.subtitle_scheduler.set_rate),
+            (player.playbackRateChanged, self.noise_engine.set_rate),
+            (player.mediaStatusChanged, self.on_media_status_changed),
+            (player.errorOccurred, self.on_media_error),
+        ]
 
-    def _refresh_lesson_list(self):
+    def _connect_player(self, player):
+        for signal, slot in self._player_signal_slots(player):
+            signal.connect(slot)
+
+    def _disconnect_player(self, player):
+        for signal, slot in self._player_signal_slots(player):
+            signal.disconnect(slot)
+
+    def _show_cached_lesson_list(self):
+        """啟動時直接顯示課程索引快取的清單 (不掃描資料夾)；多媒體就緒後才增量同步"""
         self.list_widget.clear()
+        self.json_file_mapping = {}  # {display_title: json_filename}
+        self._lesson_files = []      # 清單中的檔名 (與清單項目同順序)
         if not os.path.exists(ASSETS_DIR):
-            self.lbl_en.setText(f"錯誤：找不到 {ASSETS_DIR}")
+            self._show_subtitle_message(self.sub_en, f"錯誤：找不到 {ASSETS_DIR}")
             return
 
-        files = [f for f in os.listdir(ASSETS_DIR) if f.endswith(".json")]
-        files.sort()
-
+        files = self.catalog.filenames()
         if not files:
-            self.lbl_en.setText("沒有課程資料")
+            self._show_subtitle_message(self.sub_en, "沒有課程資料")
             return
 
-        # 載入每個 JSON 取得 title，並建立映射
-        self.json_file_mapping = {}  # {display_title: json_filename}
-        
+        # 建立 title 映射
         for f in files:
-            json_path = os.path.join(ASSETS_DIR, f)
-            try:
-                with open(json_path, 'r', encoding='utf-8') as file:
-                    data = json.load(file)
-                    title = data.get('title', f.replace('.json', ''))  # 如果沒有 title 就用檔名
-                    self.json_file_mapping[title] = f
-                    self.list_widget.addItem(title)
-            except Exception as e:
-                print(f"無法讀取 {f}: {e}")
-                # 讀取失敗時仍顯示檔名
-                self.list_widget.addItem(f)
-                self.json_file_mapping[f] = f
-        
+            self._insert_lesson_item(f)
         self.list_widget.setCurrentRow(0)
-        if files:
-            first_title = self.list_widget.item(0).text()
-            first_file = self.json_file_mapping.get(first_title, files[0])
-            self.load_lesson(os.path.join(ASSETS_DIR, first_file))
+        self._show_subtitle_message(self.sub_en, "初始化播放器...", "#AAA")
+
+    def _insert_lesson_item(self, filename):
+        """依檔名順序插入 (或更新) 一個課程項目"""
+        title = self.catalog.get(filename)["title"]
+        if filename in self._lesson_files:
+            item = self.list_widget.item(self._lesson_files.index(filename))
+            self.json_file_mapping.pop(item.text(), None)
+            item.setText(title)
+        else:
+            row = bisect_left(self._lesson_files, filename)
+            self._lesson_files.insert(row, filename)
+            self.list_widget.insertItem(row, title)
+        self.json_file_mapping[title] = filename
+
+    def _remove_lesson_item(self, filename):
+        if filename not in self._lesson_files:
+            return
+        row = self._lesson_files.index(filename)
+        del self._lesson_files[row]
+        item = self.list_widget.takeItem(row)
+        self.json_file_mapping.pop(item.text(), None)
+
+    # --- 資料夾監看 (工廠產出新課程、加入噪音檔時不必重新啟動) ---
+    def _init_watchers(self):
+        self.fs_watcher = QFileSystemWatcher(self)
+        for path in (ASSETS_DIR, NOISE_DIR):
+            if os.path.isdir(path):
+                self.fs_watcher.addPath(path)
+        if not os.path.isdir(ASSETS_DIR):
+            # 課程資料夾還不存在：先監看上一層，等工廠建立資料夾
+            self.fs_watcher.addPath(os.path.dirname(os.path.abspath(ASSETS_DIR)))
+        self.fs_watcher.directoryChanged.connect(self._on_directory_changed)
+
+        # 防抖動：每次變動都重新計時，安靜 WATCH_DEBOUNCE_MS 之後才真的更新
+        self.assets_watch_timer = QTimer(self)
+        self.assets_watch_timer.setSingleShot(True)
+        self.assets_watch_timer.setInterval(WATCH_DEBOUNCE_MS)
+        self.assets_watch_timer.timeout.connect(self._update_lesson_list)
+        self.noise_watch_timer = QTimer(self)
+        self.noise_watch_timer.setSingleShot(True)
+        self.noise_watch_timer.setInterval(WATCH_DEBOUNCE_MS)
+        self.noise_watch_timer.timeout.connect(self._update_noise_list)
+
+    def _on_directory_changed(self, path):
+        if os.path.abspath(path) == os.path.abspath(NOISE_DIR):
+            self.noise_watch_timer.start()
+        else:
+            self.assets_watch_timer.start()
+
+    def _update_lesson_list(self):
+        """在背景增量更新課程索引 (只重新解析新增/變動的 JSON)，完成後才修改清單"""
+        if os.path.isdir(ASSETS_DIR) and ASSETS_DIR not in self.fs_watcher.directories():
+            self.fs_watcher.addPath(ASSETS_DIR)
+        if self._catalog_running:
+            self._catalog_rerun = True
+            return
+        self._catalog_running = True
+        self.catalog_pool.start(CatalogRefreshTask(self.catalog, self.catalog_signals))
+
+    def _on_catalog_refreshed(self, changed, removed):
+        self._catalog_running = False
+        first_sync = not self._catalog_synced
+        self._catalog_synced = True
+        if changed or removed:
+            was_empty = not self._lesson_files
+            for f in removed:
+                self._remove_lesson_item(f)
+            for f in changed:
+                self._insert_lesson_item(f)
+            print(f"📚 課程清單已更新: {len(changed)} 個新增/變動, {len(removed)} 個移除")
+
+            # 原本沒有課程 (例如第一次執行工廠)：自動載入第一課
+            if was_empty and self._lesson_files and self._current_json_path is None:
+                self.list_widget.setCurrentRow(0)
+                self.load_lesson(os.path.join(ASSETS_DIR, self._lesson_files[0]))
+        # 只有清單變動 (或啟動後第一次同步) 才更新索引：索引寫入 .db 也會觸發資料夾監看
+        if changed or removed or first_sync:
+            self._update_library_index()
+        if self._catalog_rerun:
+            self._catalog_rerun = False
+            self._update_lesson_list()
+
+    def _update_noise_list(self):
+        """增量更新噪音清單，並在背景解碼新加入的檔案"""
+        noises = self._scan_noises()
+        added = [f for f in noises if f not in self.noises]
+        removed = [f for f in self.noises if f not in noises]
+        self.noises = noises
+
+        for f in removed:
+            index = self.combo_noise.findText(f)
+            if index > 0:
+                if index == self.combo_noise.currentIndex():
+                    self.combo_noise.setCurrentIndex(0)  # 正在使用的噪音被刪除：關閉噪音
+                self.combo_noise.removeItem(index)
+        if added:
+            self.combo_noise.addItems(added)
+        # 快取會依 mtime/size 判斷檔案是否被覆寫，已是最新的檔案不會重新解碼
+        self.noise_engine.preload([os.path.join(NOISE_DIR, f) for f in noises])
+        if added or removed:
+            print(f"🔊 噪音清單已更新: {len(added)} 個新增, {len(removed)} 個移除")
 
     def on_lesson_selected(self, item):
         display_title = item.text()
         filename = self.json_file_mapping.get(display_title, display_title)
         json_path = os.path.join(ASSETS_DIR, filename)
+        if not self.ready:
+            self._pending_lesson = json_path  # 多媒體就緒後載入
+            return
         
         self.player_video.stop()
-        self.player_noise.stop()
+        self.noise_engine.stop()
         self.btn_play.setText("▶ 播放")
         self.slider_video.setValue(0)
         self.lbl_current_time.setText("00:00")
@@ -325,26 +1366,399 @@ class LanguagePlayer(QMainWindow):
         self.load_lesson(json_path)
 
     def load_lesson(self, json_path):
+        """在背景執行緒載入課程；若前一個課程還在載入中則取消它"""
         print(f"Loading: {json_path}")
-        try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            self.current_json_data = data
-            self.segments = data.get("segments", [])
-            
-            video_filename = data.get("video_filename")
-            video_path = os.path.join(ASSETS_DIR, video_filename)
-            
-            if os.path.exists(video_path):
-                self.player_video.setSource(QUrl.fromLocalFile(os.path.abspath(video_path)))
-                self.lbl_en.setText(f"<div style='color: white;'>{data.get('title', 'Ready')}</div>")
-                self.lbl_zh.setText("<div style='color: #AAA;'>請按播放開始</div>")
+        if self._load_task is not None:
+            self._load_task.cancel()
+            self._load_task = None
+
+        self._load_request_id += 1
+        self._load_started = time.perf_counter()
+
+        # 已預先載入：直接套用 (不必等背景解析)
+        prepared = self.prepared_cache.get(json_path)
+        if prepared is not None:
+            print("⚡ 使用預先載入的課程")
+            self.btn_play.setEnabled(True)
+            self._apply_prepared(prepared)
+            return
+
+        self._load_task = LessonLoadTask(self._load_request_id, json_path, self.load_signals)
+
+        # 載入中狀態
+        self.btn_play.setEnabled(False)
+        self._show_subtitle_message(self.sub_en, "載入中...", "#AAA")
+        self._show_subtitle_message(self.sub_zh, "")
+
+        self.load_pool.start(self._load_task)
+
+    def _on_lesson_loaded(self, request_id, prepared):
+        """背景載入完成 (UI 執行緒)"""
+        if request_id != self._load_request_id:
+            return  # 已被較新的選取取代
+        self._load_task = None
+        self.btn_play.setEnabled(True)
+        self._apply_prepared(prepared)
+
+    def _apply_prepared(self, prepared):
+        """切換到已解析完成的課程 (UI 執行緒)"""
+        if self.metrics is not None:
+            # 從選取到資料就緒 (含背景執行緒) 的總時間
+            self.metrics.record("lesson_load_total", time.perf_counter() - self._load_started)
+
+        self.prepared_cache.put(prepared)
+        self._current_json_path = prepared.json_path
+        self._play_recorded_for = None
+        self._rare_words = prepared.rare_words
+        lesson = prepared.lesson
+        self.current_lesson = lesson
+        self.segments = lesson.segments
+        self.timeline = prepared.timeline
+        self.render_plans = prepared.render_plans
+        self._subtitle_state = None
+
+        self.current_video_path = prepared.video_path
+        self.current_audio_path = prepared.audio_path
+        self._failed_sources.clear()
+
+        media_path = self._media_path_for_mode()
+        seek_ms, self._seek_after_load = self._seek_after_load, None
+        if media_path:
+            if media_path == self._standby_source:
+                self._swap_in_standby()  # 媒體已在備用播放器中開啟
+                if seek_ms is not None:
+                    self.player_video.setPosition(seek_ms)
             else:
-                self.lbl_en.setText(f"<span style='color: red;'>影片遺失: {video_filename}</span>")
+                self._set_media_source(media_path, None if seek_ms is None else (seek_ms, False))
+            self._show_subtitle_message(self.sub_en, lesson.title, "white")
+            self._show_subtitle_message(self.sub_zh, "請按播放開始", "#AAA")
+            if prepared.video_path is None and lesson.get("video_filename"):
+                self._refetch_video(prepared)  # 影片已被配額清除：先播放 MP3
+        else:
+            self._show_subtitle_message(self.sub_en, f"影片遺失: {lesson.get('video_filename')}", "red")
+            self._startup_finished()
+
+        self._prefetch_next()
+
+    # --- 預先載入 (下一課 / 滑鼠停留的課程) ---
+    def _prefetch_lesson(self, json_path, preopen=True):
+        """在背景解析課程；preopen=True 時完成後在備用播放器中開啟媒體"""
+        if json_path == self._current_json_path:
+            return
+        prepared = self.prepared_cache.get(json_path)
+        if prepared is not None:
+            if preopen:
+                self._preopen_media(prepared)
+            return
+        if json_path in self._prefetching:
+            self._prefetching[json_path] = self._prefetching[json_path] or preopen
+            return
+        self._prefetching[json_path] = preopen
+        # 優先權低於使用者實際選取的載入
+        self.load_pool.start(LessonLoadTask(0, json_path, self.prefetch_signals), -1)
+
+    def _on_lesson_prefetched(self, _request_id, prepared):
+        preopen = self._prefetching.pop(prepared.json_path, False)
+        if prepared.json_path == self._current_json_path:
+            return
+        self.prepared_cache.put(prepared)
+        if preopen:
+            self._preopen_media(prepared)
+
+    def _on_lesson_prefetch_failed(self, _request_id, json_path, error):
+        self._prefetching.pop(json_path, None)
+        print(f"⚠️ 預先載入失敗 {os.path.basename(json_path)}: {error}")
+
+    def _preopen_media(self, prepared):
+        """在備用播放器開啟媒體 (開檔、解析容器)，切換課程時不必等待"""
+        if not self.ready:
+            return
+        path = self._media_path_for(prepared.video_path, prepared.audio_path)
+        if not path or path == self._standby_source or path == self._current_source:
+            return
+        self._standby_source = path
+        self.player_standby.setSource(QUrl.fromLocalFile(os.path.abspath(path)))
+
+    def _swap_in_standby(self):
+        """交換主播放器與備用播放器 (備用播放器已開啟新課程的媒體)"""
+        old, new = self.player_video, self.player_standby
+        path = self._standby_source
+        self._disconnect_player(old)
+        old.stop()
+        old.setVideoOutput(None)
+        old.setAudioOutput(None)
+        old.setSource(QUrl())
+
+        self.player_video, self.player_standby = new, old
+        self._standby_source = None
+        self._current_source = path
+        self._pending_restore = None
+        is_audio = path == self.current_audio_path and path != self.current_video_path
+        new.setAudioOutput(self.audio_video)
+        new.setVideoOutput(None if is_audio else self.video_widget)
+        self._connect_player(new)
+        self.change_speed(self.combo_speed.currentText())
+        self.on_duration_changed(new.duration())  # 已開啟的媒體不會再發出 durationChanged
+        if new.mediaStatus() == QMediaPlayer.MediaStatus.InvalidMedia:
+            self._on_media_failed(new.errorString())  # 備用播放器開啟失敗時訊號還沒連上
+
+    def _lesson_row(self, json_path):
+        filename = os.path.basename(json_path) if json_path else None
+        return self._lesson_files.index(filename) if filename in self._lesson_files else -1
+
+    def _prefetch_next(self):
+        row = self._lesson_row(self._current_json_path)
+        if 0 <= row < len(self._lesson_files) - 1:
+            self._prefetch_lesson(os.path.join(ASSETS_DIR, self._lesson_files[row + 1]))
+
+    # --- 搜尋 ---
+    def _update_library_index(self):
+        if not os.path.isdir(ASSETS_DIR):
+            return
+        if self._index_running:
+            self._index_rerun = True
+            return
+        self._index_running = True
+        self.index_pool.start(LibraryIndexTask(ASSETS_DIR, self.index_signals))
+
+    def _on_library_index_finished(self):
+        self._index_running = False
+        if self._index_rerun:
+            self._index_rerun = False
+            self._update_library_index()
+
+    def _run_search(self):
+        self.search_timer.stop()
+        query = self.search_box.text().strip()
+        self.search_results.clear()
+        if not query or not os.path.isdir(ASSETS_DIR):
+            self.search_results.hide()
+            return
+        if self.search_index is None:
+            self.search_index = LessonSearchIndex(ASSETS_DIR)
+        start = time.perf_counter()
+        hits = self.search_index.search(query)
+        print(f"🔎 「{query}」: {len(hits)} 筆 ({(time.perf_counter() - start) * 1000:.1f} ms)")
+
+        if not hits:
+            self.search_results.addItem("(沒有符合的片段)")
+        for hit in hits:
+            seconds = int(hit.start)
+            mark = "★ " if hit.keyword_match else ""
+            item = QListWidgetItem(f"{mark}{hit.title}  [{seconds // 60:02}:{seconds % 60:02}]\n"
+                                   f"{hit.text_en}\n{hit.text_zh}")
+            item.setData(Qt.ItemDataRole.UserRole, (hit.filename, int(hit.start * 1000)))
+            self.search_results.addItem(item)
+        self.search_results.show()
+
+    def _open_search_hit(self, item):
+        """跳到搜尋結果的課程與片段時間"""
+        target = item.data(Qt.ItemDataRole.UserRole)
+        if not target:
+            return
+        filename, position_ms = target
+        json_path = os.path.join(ASSETS_DIR, filename)
+        if json_path == self._current_json_path and self._load_task is None:
+            self.player_video.setPosition(position_ms)
+            return
+        if filename not in self._lesson_files:
+            return
+        row = self._lesson_files.index(filename)
+        self.list_widget.setCurrentRow(row)
+        self._seek_after_load = position_ms
+        self.on_lesson_selected(self.list_widget.item(row))
+
+    # --- 影片配額 (播放紀錄 / 重新下載被清除的影片) ---
+    def _open_media_cache(self):
+        if self.media_cache is None and os.path.isdir(ASSETS_DIR):
+            self.media_cache = MediaCache(ASSETS_DIR)
+        return self.media_cache
+
+    def _record_play(self):
+        """每次載入課程後第一次開始播放時記錄 (暫停/繼續不重複記錄)"""
+        if self.current_lesson is None or self._play_recorded_for == self._current_json_path:
+            return
+        self._play_recorded_for = self._current_json_path
+        filename = self.current_lesson.get("video_filename")
+        cache = self._open_media_cache()
+        if not filename or cache is None:
+            return
+        try:
+            cache.record_play(filename)
         except Exception as e:
-            print(f"Load Error: {e}")
-            self.lbl_en.setText("檔案讀取錯誤")
+            print(f"⚠️ 無法記錄播放時間: {e}")
+
+    def _refetch_video(self, prepared):
+        filename = prepared.lesson.get("video_filename")
+        source_url = prepared.lesson.get("source_url")
+        if not self.audio_only_mode:
+            self._show_subtitle_message(
+                self.sub_zh, "影片已被清除，先播放 MP3" + ("；背景重新下載中..." if source_url else ""), "#AAA")
+        if not source_url:
+            print(f"⚠️ 影片 {filename} 已不存在且課程沒有 source_url，只能播放 MP3")
+            return
+        stem = os.path.splitext(filename)[0]
+        if stem in self._refetching:
+            return  # 再次點選同一課：已在下載中
+        self._refetching.add(stem)
+        print(f"⬇️ 背景重新下載影片: {filename}")
+        self.refetch_pool.start(VideoRefetchTask(prepared.json_path, source_url, filename, self.refetch_signals))
+
+    def _on_video_refetched(self, json_path, video_path):
+        self._refetching.discard(os.path.splitext(os.path.basename(video_path))[0])
+        self.prepared_cache.discard(json_path)  # 快取中的課程還沒有影片路徑
+        print(f"✅ 影片已重新下載: {os.path.basename(video_path)}")
+        if json_path != self._current_json_path:
+            return
+        self.current_video_path = video_path
+        self._failed_sources.discard(video_path)
+        if not self.audio_only_mode:
+            self._switch_media_source()  # 保留目前位置與播放狀態
+
+    def _on_video_refetch_failed(self, json_path, filename, error):
+        self._refetching.discard(os.path.splitext(filename)[0])
+        print(f"❌ 影片重新下載失敗 ({filename}): {error}")
+        if json_path == self._current_json_path and not self.audio_only_mode:
+            self._show_subtitle_message(self.sub_zh, "影片重新下載失敗，繼續播放 MP3", "#AAA")
+
+    # --- 單字資料庫 (罕見字標示 / 單字出現位置) ---
+    def _open_vocab(self):
+        if self.vocab is None and os.path.isdir(ASSETS_DIR):
+            self.vocab = VocabularyStore(ASSETS_DIR)
+        return self.vocab
+
+    def _rare_flags(self, words):
+        if not self._rare_words:
+            return None
+        return [normalize_word(w) in self._rare_words for w in words]
+
+    def _on_subtitle_word_activated(self, index):
+        if self._subtitle_state is None:
+            return
+        words = self.render_plans[self._subtitle_state[0]].words
+        if 0 <= index < len(words):
+            self._show_word_occurrences(words[index])
+
+    def _show_word_occurrences(self, word):
+        """在搜尋結果區列出單字在整個課程庫的出現位置 (點選即跳轉)"""
+        vocab = self._open_vocab()
+        word = normalize_word(word)
+        if vocab is None or not word:
+            return
+        stats = vocab.word_stats(word)
+        self.search_results.clear()
+        if not stats:
+            self.search_results.addItem(f"📊 {word}: 尚未統計")
+        else:
+            freq, lessons, keyword_count = stats
+            self.search_results.addItem(f"📊 {word}: {freq} 次 / {lessons} 課 (keyword {keyword_count} 次)")
+            for occ in vocab.occurrences(word):
+                seconds = int(occ.time)
+                item = QListWidgetItem(f"{occ.title}  [{seconds // 60:02}:{seconds % 60:02}]")
+                item.setData(Qt.ItemDataRole.UserRole, (occ.filename, int(occ.time * 1000)))
+                self.search_results.addItem(item)
+        self.search_results.show()
+
+    def _on_lesson_hovered(self, item):
+        self._hovered_item = item
+        self.hover_timer.start()
+
+    def _prefetch_hovered(self):
+        item = self._hovered_item
+        if item is None or self.list_widget.row(item) < 0:
+            return
+        filename = self.json_file_mapping.get(item.text())
+        if filename:
+            self._prefetch_lesson(os.path.join(ASSETS_DIR, filename))
+
+    # --- 媒體來源 (影片 / 純音訊 MP3) ---
+    def _media_path_for_mode(self):
+        """純音訊模式優先使用 MP3 (不解碼影片)，沒有 MP3 時才退回影片 (略過無法開啟的檔案)"""
+        video, audio = (None if p in self._failed_sources else p
+                        for p in (self.current_video_path, self.current_audio_path))
+        return self._media_path_for(video, audio)
+
+    def _media_path_for(self, video_path, audio_path):
+        if self.audio_only_mode and audio_path:
+            return audio_path
+        return video_path or audio_path  # 影片已被配額清除時先播放 MP3
+
+    def _set_media_source(self, path, restore=None):
+        is_audio = path == self.current_audio_path and path != self.current_video_path
+        # 純音訊時拔掉影像輸出，避免任何影像處理
+        self.player_video.setVideoOutput(None if is_audio else self.video_widget)
+        self._pending_restore = restore
+        self._current_source = path
+        self.player_video.setSource(QUrl.fromLocalFile(os.path.abspath(path)))
+
+    def _switch_media_source(self):
+        """切換影片/MP3 來源，保留目前位置、播放狀態與速度"""
+        path = self._media_path_for_mode()
+        if not path or path == self._current_source:
+            return
+        if self._pending_restore is not None:
+            restore = self._pending_restore  # 前一次切換還沒完成，沿用原本要恢復的狀態
+        else:
+            playing = self.player_video.playbackState() == QMediaPlayer.PlaybackState.PlayingState
+            restore = (self.player_video.position(), playing)
+        self._set_media_source(path, restore)
+
+    def on_media_status_changed(self, status):
+        if status == QMediaPlayer.MediaStatus.InvalidMedia:
+            self._on_media_failed(self.player_video.errorString())
+            return
+        if status == QMediaPlayer.MediaStatus.NoMedia:
+            self._pending_restore = None  # 來源已被清除，沒有要恢復的對象
+            return
+        if status not in (QMediaPlayer.MediaStatus.LoadedMedia, QMediaPlayer.MediaStatus.BufferedMedia):
+            return
+        self._startup_finished()  # 第一課的媒體已開啟：可以播放
+        if self._pending_restore is None:
+            return
+        position, playing = self._pending_restore
+        self._pending_restore = None
+        self.player_video.setPosition(position)
+        self.change_speed(self.combo_speed.currentText())
+        if playing:
+            self.player_video.play()
+
+    def on_media_error(self, error, message=""):
+        if error != QMediaPlayer.Error.NoError:
+            self._on_media_failed(message or self.player_video.errorString())
+
+    def _on_media_failed(self, message):
+        """媒體無法開啟或播放：改用另一個來源 (影片 <-> MP3)，都不能用才顯示錯誤"""
+        failed = self._current_source
+        if failed is None or failed in self._failed_sources:
+            return  # errorOccurred 與 InvalidMedia 會回報同一個錯誤
+        self._failed_sources.add(failed)
+        if self._pending_restore is not None:
+            restore = self._pending_restore
+        else:
+            playing = self.player_video.playbackState() == QMediaPlayer.PlaybackState.PlayingState
+            restore = (self.player_video.position(), playing)
+        self._pending_restore = None
+        print(f"❌ 無法播放 {os.path.basename(failed)}: {message}")
+
+        fallback = self._media_path_for_mode()
+        if fallback:
+            print(f"↪️ 改用 {os.path.basename(fallback)}")
+            self._set_media_source(fallback, restore)
+            return
+        self._current_source = None
+        self._show_subtitle_message(self.sub_en, f"無法播放媒體: {os.path.basename(failed)}", "red")
+        self._show_subtitle_message(self.sub_zh, message, "#AAA")
+        self.btn_play.setText("▶ 播放")
+        self._startup_finished()
+
+    def _on_lesson_load_failed(self, request_id, json_path, error):
+        if request_id != self._load_request_id:
+            return
+        self._load_task = None
+        self.btn_play.setEnabled(True)
+        print(f"Load Error: {error}")
+        self._show_subtitle_message(self.sub_en, "檔案讀取錯誤")
+        self._startup_finished()
 
     def toggle_audio_mode(self, checked):
         """切換純音訊模式"""
@@ -352,35 +1766,40 @@ class LanguagePlayer(QMainWindow):
         
         if checked:
             # 進入純音訊模式
-            self.video_widget.hide()
+            self.video_container.hide()
             self.btn_audio_mode.setText("🎥 顯示影片")
             
             # 放大字幕區域
-            self.lbl_en.setStyleSheet("font-size: 32px; font-family: Arial; color: #FFD700; font-weight: bold;")
-            self.lbl_zh.setStyleSheet("font-size: 28px; font-family: 'Microsoft JhengHei', sans-serif; color: #e0e0e0;")
+            self.sub_en.set_base_font(32, "#FFD700", bold=True)
+            self.sub_zh.set_base_font(28, "#e0e0e0")
             
+            if self.current_video_path and not self.current_audio_path:
+                print("⚠️ 此課程沒有 MP3，仍使用影片檔播放")
             print("🎵 已切換到純音訊模式 (節省電量)")
         else:
             # 返回影片模式
-            self.video_widget.show()
+            self.video_container.show()
             self.btn_audio_mode.setText("🎵 純音訊")
             
             # 恢復原始字幕大小
-            self.lbl_en.setStyleSheet("font-size: 24px; font-family: Arial; color: #888;")
-            self.lbl_zh.setStyleSheet("font-size: 20px; font-family: 'Microsoft JhengHei', sans-serif; color: #666;")
+            self.sub_en.set_base_font(24, "#888")
+            self.sub_zh.set_base_font(20, "#666")
             
             print("🎥 已切換到影片模式")
 
+        self._switch_media_source()
+
     def toggle_video(self):
         if self.player_video.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
             self.player_video.pause()
-            self.player_noise.pause() 
+            self.noise_engine.pause()
             self.btn_play.setText("▶ 播放")
         else:
             self.player_video.play()
-            # 只有當選了噪音時才播放噪音，音量由邏輯控制
+            # 只有當選了噪音時才播放噪音，音量由噪音引擎控制
             if self.combo_noise.currentIndex() > 0:
-                self.player_noise.play()
+                self.noise_engine.sync_position(self.player_video.position())
+                self.noise_engine.play()
             self.btn_play.setText("❚❚ 暫停")
 
     def change_speed(self, text):
@@ -388,45 +1807,70 @@ class LanguagePlayer(QMainWindow):
         self.player_video.setPlaybackRate(speed)
 
     def change_noise_source(self, text):
-        self.player_noise.stop()
         if text == "無噪音 (Off)":
+            self.noise_engine.clear()
             return
         
         noise_path = os.path.join(NOISE_DIR, text)
         if os.path.exists(noise_path):
-            self.player_noise.setSource(QUrl.fromLocalFile(os.path.abspath(noise_path)))
-            if self.player_video.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
-                self.player_noise.play()
+            # 直接替換串流中的 PCM (快取命中時不需解碼，輸出也不必重新啟動)；
+            # 沒命中時在背景解碼，完成後由 source_ready 接手
+            try:
+                ready = self.noise_engine.load_file(noise_path)
+            except Exception as e:
+                print(f"⚠️ 無法讀取噪音檔 {text}: {e}")
+                self.noise_engine.clear()
+                return
+            if ready:
+                self._on_noise_source_ready(noise_path)
+
+    def _on_noise_source_ready(self, path):
+        if self.player_video.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
+            self.noise_engine.sync_position(self.player_video.position())
+            self.noise_engine.play()
+
+    def _on_noise_source_failed(self, path, message):
+        print(f"⚠️ 無法讀取噪音檔 {os.path.basename(path)}: {message}")
+        self.noise_engine.clear()
 
     def change_noise_volume(self, value):
-        # 更新目標音量 (slider 範圍 0-1000 對應 0.0-1.0)
+        # 更新目標音量 (slider 範圍 0-1000 對應 0.0-1.0)，下一個音訊區塊即生效
         self.noise_target_volume = value / 1000.0
-        # 如果目前是 100% 模式，直接更新音量，否則等待下一次循環更新
-        ratio_text = self.combo_noise_ratio.currentText()
-        if ratio_text == "100% (持續)":
-             self.audio_noise.setVolume(self.noise_target_volume)
+        self.noise_engine.set_volume(self.noise_target_volume)
+
+    def change_noise_ratio(self, text):
+        """噪音密度改變時立即生效 (不必等下一次位置更新)"""
+        self.noise_engine.set_density(self.noise_ratios.get(text, 1.0))
 
     def toggle_subtitle_en(self, checked):
         """切換英文字幕"""
         self.show_subtitle_en = checked
         self.btn_subtitle_en.setText("EN ✓" if checked else "EN ✗")
-        # 立即更新字幕顯示
-        if self.player_video.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
-            self.on_position_changed(self.player_video.position())
-        elif self.segments:
-            # 如果沒在播放，也要更新一下字幕顯示
-            self.on_position_changed(0)
+        self._refresh_subtitles()
 
     def toggle_subtitle_zh(self, checked):
         """切換中文字幕"""
         self.show_subtitle_zh = checked
         self.btn_subtitle_zh.setText("中 ✓" if checked else "中 ✗")
-        # 立即更新字幕顯示
-        if self.player_video.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
-            self.on_position_changed(self.player_video.position())
-        elif self.segments:
-            # 如果沒在播放，也要更新一下字幕顯示
-            self.on_position_changed(0)
+        self._refresh_subtitles()
+
+    def _show_subtitle_message(self, widget, text, color=None):
+        """在字幕元件上顯示提示文字
+
+        同時清除上一次的高亮狀態：否則播放中 update_subtitle 看到同一片段只會更新高亮，
+        提示文字會一直留到下一個片段邊界。
+        """
+        widget.set_message(text, color)
+        self._subtitle_state = None
+
+    def _refresh_subtitles(self):
+        """立即以目前位置重畫字幕
+
+        不經過 on_position_changed：播放中 sync() 在時鐘沒有偏差時不重畫，
+        切換會等到下一個片段邊界才生效。
+        """
+        if self.segments:
+            self.subtitle_scheduler.refresh()
 
     # --- 影片進度條相關 ---
     def on_duration_changed(self, duration):
@@ -450,163 +1894,104 @@ class LanguagePlayer(QMainWindow):
 
     # --- 核心邏輯：位置更新 (包含字幕與噪音控制) ---
     def on_position_changed(self, position_ms):
+        # 切換影片/MP3 來源途中，忽略新來源從 0 開始的位置
+        if self._pending_restore is not None:
+            return
+        if self.metrics is not None:
+            self.metrics.tick("positionChanged")
+
         # 1. 更新 Slider 與 時間顯示
         if not self.slider_being_dragged:
             self.slider_video.setValue(position_ms)
         self.lbl_current_time.setText(self.format_time(position_ms))
 
-        # 2. 更新字幕 (雙語高亮)
-        self.update_subtitle(position_ms)
+        # 2. 字幕 (雙語高亮) 交給排程器：對齊時鐘，並在下一個邊界準時更新
+        self.subtitle_scheduler.sync(position_ms)
 
         # 3. 更新間歇性噪音 (Intermittent Noise Logic)
         self.update_noise_intermittence(position_ms)
 
+    def on_playback_state_changed(self, state):
+        playing = state == QMediaPlayer.PlaybackState.PlayingState
+        if self.metrics is not None:
+            self.metrics.reset_tick("positionChanged")  # 暫停期間不算漏掉 tick
+        self.subtitle_scheduler.set_playing(playing, self.player_video.position())
+        if playing:
+            self._record_play()
+
+    def _next_subtitle_event_ms(self, position_ms):
+        """下一個字幕高亮可能改變的位置 (ms)，沒有則回傳 None"""
+        current_sec = position_ms / 1000.0
+        seg_idx = self.timeline.locate(current_sec)
+        if seg_idx >= 0:
+            next_sec = self.render_plans[seg_idx].next_change(current_sec)
+        else:
+            next_sec = self.timeline.next_start_after(current_sec)
+        return None if next_sec is None else next_sec * 1000.0
+
     def update_noise_intermittence(self, position_ms):
-        """根據設定的比例，週期性開關噪音音量"""
+        """間歇噪音由噪音引擎逐取樣產生 (2 秒週期，先靜音再開啟)；這裡只在跳轉後對齊週期"""
         # 如果沒有選擇噪音，直接跳過
         if self.combo_noise.currentIndex() == 0:
             return
+        self.noise_engine.sync_position(position_ms)
 
-        ratio_text = self.combo_noise_ratio.currentText()
-        ratio = self.noise_ratios.get(ratio_text, 1.0)
+    def update_subtitle(self, position_ms):
+        """雙語字幕高亮邏輯 (相容兩種 JSON 格式 + keywords 紅字顯示 + 精確 word-level 時間戳)"""
+        current_sec = position_ms / 1000.0
 
-        # 如果是 100%，保持最大音量
-        if ratio >= 1.0:
-            if self.audio_noise.volume() != self.noise_target_volume:
-                self.audio_noise.setVolume(self.noise_target_volume)
+        # 以時間軸索引定位片段 (取代逐一掃描 self.segments)
+        seg_idx = self.timeline.locate(current_sec)
+        if seg_idx < 0:
             return
 
-        # 週期設定：2000ms (2秒)
-        # 邏輯：先靜音(Off)，再開啟(On)。
-        # 例如 50% -> 1000ms 靜音, 1000ms 噪音
-        # 例如 30% -> 1400ms 靜音, 600ms 噪音
-        cycle_duration = 2000 
-        on_duration = cycle_duration * ratio
-        off_duration = cycle_duration - on_duration
-        
-        cycle_pos = position_ms % cycle_duration
+        plan = self.render_plans[seg_idx]
+        en_range, zh_idx = plan.highlight_state(current_sec)
 
-        if cycle_pos < off_duration:
-            # 在 "靜音" 區間
-            self.audio_noise.setVolume(0)
-        else:
-            # 在 "噪音" 區間 -> 恢復使用者設定的音量
-            self.audio_noise.setVolume(self.noise_target_volume)
+        # 高亮狀態沒變就完全不碰字幕元件
+        state = (seg_idx, en_range, zh_idx, self.show_subtitle_en, self.show_subtitle_zh)
+        if state == self._subtitle_state:
+            return
+        last = self._subtitle_state
+        self._subtitle_state = state
+
+        # 換片段 (或切換顯示) 時才重新排版，其餘只更新高亮範圍
+        if last is None or last[0] != seg_idx or last[3] != self.show_subtitle_en:
+            if self.show_subtitle_en:
+                self.sub_en.set_tokens(plan.words, plan.keyword_flags,
+                                       plan.en_keyword_scale, plan.en_hot_scale,
+                                       hot_over_keyword=plan.has_word_times,
+                                       rare_flags=self._rare_flags(plan.words))
+            else:
+                self.sub_en.clear()
+        if self.show_subtitle_en:
+            self.sub_en.set_highlight(*plan.en_highlight(en_range))
+
+        if last is None or last[0] != seg_idx or last[4] != self.show_subtitle_zh:
+            if self.show_subtitle_zh:
+                self.sub_zh.set_tokens(plan.chars, None, 1.0, 1.1)
+            else:
+                self.sub_zh.clear()
+        if self.show_subtitle_zh:
+            self.sub_zh.set_highlight(*plan.zh_highlight(zh_idx))
 
-    def update_subtitle(self, position_ms):
-        """雙語字幕高亮邏輯 (相容兩種 JSON 格式 + keywords 紅字顯示 + 精確 word-level 時間戳)"""
-        current_sec = position_ms / 1000.0
-        
-        found_segment = False
-        for seg in self.segments:
-            # 相容兩種格式：Gemini 處理後 (start_time/end_time) 和 Whisper 原始 (start/end)
-            start_time = seg.get('start_time', seg.get('start', 0))
-            end_time = seg.get('end_time', seg.get('end', 0))
-            
-            if start_time <= current_sec <= end_time:
-                found_segment = True
-                
-                # 相容兩種格式
-                text_en = seg.get('text_en', seg.get('text', ''))
-                text_zh = seg.get('text_zh', '[無中文翻譯]')
-                keywords = seg.get('keywords', [])
-                words_data = seg.get('words', [])  # 取得 word-level timestamps
-
-                # A. 英文 (優先使用 word-level timestamps，回退到進度估算)
-                if words_data:
-                    # 使用精確的 word-level timestamps
-                    en_html_parts = []
-                    for word_info in words_data:
-                        word = word_info.get('word', '').strip()
-                        word_start = word_info.get('start', 0)
-                        word_end = word_info.get('end', 0)
-                        
-                        # 移除標點符號來比對 keywords
-                        clean_word = word.strip('.,!?;:\'"').lower()
-                        is_keyword = any(kw.lower() == clean_word for kw in keywords)
-                        
-                        # 檢查當前時間是否在此單字的時間範圍內
-                        is_current = word_start <= current_sec <= word_end
-                        
-                        if is_current:
-                            # 當前播放的單字 (金色高亮) - 優先顯示
-                            en_html_parts.append(f"<span style='color: #FFD700; font-weight: bold; font-size: 1.2em;'>{word}</span>")
-                        elif is_keyword:
-                            # keywords 顯示為粗體紅字 (未播放到時)
-                            en_html_parts.append(f"<span style='color: #FF4444; font-weight: bold; font-size: 1.1em;'>{word}</span>")
-                        else:
-                            # 其他單字
-                            en_html_parts.append(f"<span style='color: #DDDDDD;'>{word}</span>")
-                    final_html_en = " ".join(en_html_parts)
-                else:
-                    # 回退到舊的進度估算方式 (當沒有 word-level timestamps 時)
-                    seg_duration = end_time - start_time
-                    time_elapsed = current_sec - start_time
-                    progress = 0.0
-                    if seg_duration > 0:
-                        progress = time_elapsed / seg_duration
-                    
-                    words = text_en.split(' ')
-                    word_count = len(words)
-                    en_html_parts = []
-                    if word_count > 0:
-                        current_word_idx = int(progress * word_count)
-                        current_word_idx = max(0, min(current_word_idx, word_count - 1))
-                        for i, word in enumerate(words):
-                            clean_word = word.strip('.,!?;:\'"').lower()
-                            is_keyword = any(kw.lower() == clean_word for kw in keywords)
-                            
-                            if is_keyword:
-                                en_html_parts.append(f"<span style='color: #FF4444; font-weight: bold; font-size: 1.2em;'>{word}</span>")
-                            elif current_word_idx - 2 <= i <= current_word_idx + 2:
-                                en_html_parts.append(f"<span style='color: #FFD700; font-weight: bold; font-size: 1.1em;'>{word}</span>")
-                            else:
-                                en_html_parts.append(f"<span style='color: #DDDDDD;'>{word}</span>")
-                    final_html_en = " ".join(en_html_parts)
-
-                # B. 中文 (使用進度估算)
-                seg_duration = end_time - start_time
-                time_elapsed = current_sec - start_time
-                progress = 0.0
-                if seg_duration > 0:
-                    progress = time_elapsed / seg_duration
-                
-                chars = list(text_zh) 
-                char_count = len(chars)
-                zh_html_parts = []
-                if char_count > 0:
-                    current_char_idx = int(progress * char_count)
-                    current_char_idx = max(0, min(current_char_idx, char_count - 1))
-                    for i, char in enumerate(chars):
-                        if current_char_idx - 2 <= i <= current_char_idx + 2:
-                            zh_html_parts.append(f"<span style='color: #FFD700; font-weight: bold; font-size: 1.1em;'>{char}</span>")
-                        else:
-                            zh_html_parts.append(f"<span style='color: #DDDDDD;'>{char}</span>")
-                final_html_zh = "".join(zh_html_parts)
-
-                if self.show_subtitle_en:
-                    self.lbl_en.setText(f"<div style='text-align: center;'>{final_html_en}</div>")
-                else:
-                    self.lbl_en.setText("")
-                
-                if self.show_subtitle_zh:
-                    self.lbl_zh.setText(f"<div style='text-align: center;'>{final_html_zh}</div>")
-                else:
-                    self.lbl_zh.setText("")
-                break
-        
-        if not found_segment:
-            pass
-    
     def update_subtitle_visibility(self):
         """根據設定更新字幕可見性"""
         if not self.show_subtitle_en:
-            self.lbl_en.setText("")
+            self.sub_en.clear()
         if not self.show_subtitle_zh:
-            self.lbl_zh.setText("")
+            self.sub_zh.clear()
 
 if __name__ == "__main__":
+    startup = StartupTimer()
     app = QApplication(sys.argv)
-    window = LanguagePlayer()
+    # 效能量測：PLAYER_METRICS=1 或 --metrics
+    metrics = PlayerMetrics() if metrics_requested(sys.argv) else None
+    if metrics is not None:
+        app.aboutToQuit.connect(metrics.export)
+    # 啟動時間量測：--measure-startup 輸出結果後直接結束
+    if startup_measure_requested(sys.argv):
+        startup.on_finished = lambda timer: (timer.export(), app.quit())
+    window = LanguagePlayer(metrics, startup)
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,431 @@
+import os
+import re
+import json
+import time
+import hashlib
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Gemini 批次翻譯 (並行 + 速率限制 + 重試) ---
+# - 多個批次同時送出 (執行緒池)，結果依原本順序組回
+# - 權杖桶 (token bucket) 限制每分鐘請求數；遇到配額錯誤時所有執行緒一起暫停
+# - 暫時性錯誤 (配額、逾時、連線、回應格式/片段數不符) 以指數退避重試
+# - BatchCheckpoint：每批成功後立刻寫入課程旁的檢查點，重新執行時只送失敗/缺少的批次
+# model 只需要 generate_content(prompt) -> 物件.text，可以換成本機的 StubModel 測試
+#
+# 吞吐量的上限是每分鐘請求數 (rpm)，不是並行數：最多每分鐘 rpm 個批次。
+# 並行只能把每個請求的往返時間重疊起來，超過 ceil(rpm * 往返秒數 / 60) 就沒有幫助
+# (例如 10 rpm、每批約 10 秒時，同時 2 批就已經用滿配額)。
+
+CONCURRENCY_ENV = "GEMINI_CONCURRENCY"      # 環境變數可覆寫並行數
+RPM_ENV = "GEMINI_REQUESTS_PER_MINUTE"      # 環境變數可覆寫每分鐘請求數 (依 API 方案調整)
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RPM = 10          # 每分鐘請求數 (免費方案的 gemini-2.5-flash)
+MAX_RETRIES = 4
+BACKOFF_BASE_S = 2.0
+BACKOFF_MAX_S = 60.0
+QUOTA_COOLDOWN_S = 30.0   # 配額錯誤沒有附建議等待時間時的暫停秒數
+PROMPT_VERSION = 1        # 修改 build_prompt 時請加一 (舊的檢查點/快取結果不再使用)
+CHECKPOINT_VERSION = 1
+_TOKEN_EPSILON = 1e-9
+
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+_RETRYABLE_STATUS_TEXT = re.compile(r"\b(?:408|429|50[0234])\b")
+_QUOTA_TEXT = re.compile(r"\b(?:429|quota|rate limit|resource exhausted)\b", re.IGNORECASE)
+_AUTH_TEXT = re.compile(r"\b(?:api[_ ]key|authentication|unauthenticated|permission)", re.IGNORECASE)
+_TRANSIENT_TEXT = re.compile(r"\b(?:timed? ?out|deadline exceeded|service unavailable|internal (?:server )?error"
+                             r"|connection (?:reset|refused|aborted|error)|temporarily unavailable)\b",
+                             re.IGNORECASE)
+_RETRY_HINT = re.compile(r"retry in ([\d.]+)\s*s|retry_delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE)
+
+
+def _env_number(name, default, cast):
+    try:
+        value = cast(os.environ.get(name, default))
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+def translator_limits(concurrency=None, requests_per_minute=None):
+    """(並行數, 每分鐘請求數)；None 時使用環境變數，沒有設定或格式錯誤時用預設值"""
+    if concurrency is None:
+        concurrency = _env_number(CONCURRENCY_ENV, DEFAULT_CONCURRENCY, int)
+    if requests_per_minute is None:
+        requests_per_minute = _env_number(RPM_ENV, DEFAULT_RPM, float)
+    return concurrency, requests_per_minute
+
+
+class BatchFormatError(ValueError):
+    """Gemini 回應的格式或片段數量不符 (重試通常就會成功)"""
+
+
+def build_prompt(raw_segments):
+    # 不包含 words 陣列發送給 Gemini，避免回應過長被截斷
+    simplified_input = [
+        {
+            "id": i,
+            "start": seg["start"],
+            "end": seg["end"],
+            "text": seg["text"].strip()
+        }
+        for i, seg in enumerate(raw_segments)
+    ]
+
+    return f"""
+        Translate to Traditional Chinese (Taiwan). Keep exact structure.
+
+        Input ({len(simplified_input)} segments):
+        {json.dumps(simplified_input, ensure_ascii=False)}
+
+        Output ({len(simplified_input)} segments with translations):
+        [
+          {{
+            "id": <same>,
+            "start_time": <same start>,
+            "end_time": <same end>,
+            "text_en": "<same text>",
+            "text_zh": "中文翻譯",
+            "keywords": ["important_word"]
+          }}
+        ]
+
+        Rules:
+        - Output EXACTLY {len(simplified_input)} items
+        - keywords: choose difficult, important, meaning and name words (min 1,max 5), in English
+        - don't translate keywords.
+        - Keep all IDs, timestamps, text_en unchanged
+        """
+
+
+def batch_key(raw_segments, model_name):
+    """批次內容的雜湊 (只取送給 Gemini 的欄位) + 模型名稱 + prompt 版本"""
+    payload = json.dumps({
+        "model": model_name,
+        "prompt": PROMPT_VERSION,
+        "segments": [[seg["start"], seg["end"], seg["text"].strip()] for seg in raw_segments],
+    }, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def parse_response(response_text, raw_segments):
+    """解析 Gemini 回應並加回 Whisper 的 words 陣列；格式錯誤時拋出例外"""
+    # 檢查回應是否被截斷
+    if len(response_text) > 100000:
+        print(f"   ⚠️ Gemini 回應過長 ({len(response_text)} 字元)，可能被截斷")
+
+    clean_text = response_text.replace("```json", "").replace("```", "").strip()
+    try:
+        parsed_data = json.loads(clean_text)
+    except json.JSONDecodeError as e:
+        raise BatchFormatError(f"無法解析 JSON ({len(response_text)} 字元): {e}") from e
+
+    # 驗證輸出片段數量
+    if not isinstance(parsed_data, list) or len(parsed_data) != len(raw_segments):
+        count = len(parsed_data) if isinstance(parsed_data, list) else "?"
+        raise BatchFormatError(f"Gemini 合併了片段！輸入 {len(raw_segments)} 個，輸出 {count} 個")
+
+    # ✨ 關鍵步驟：將原始 Whisper 的 words 陣列加回去
+    for i, item in enumerate(parsed_data):
+        item["words"] = raw_segments[i].get("words", [])
+    return parsed_data
+
+
+def _status_code(error):
+    """google.api_core 例外的 HTTP 狀態碼 (GoogleAPICallError.code)；沒有時回傳 None"""
+    code = getattr(error, "code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_quota_error(error):
+    return (_status_code(error) == 429 or bool(_QUOTA_TEXT.search(str(error)))
+            or type(error).__name__ in ('ResourceExhausted', 'TooManyRequests'))
+
+
+def is_retryable(error):
+    """配額、逾時、連線、伺服器錯誤與回應格式錯誤可以重試；API Key / 權限 / 請求錯誤不行
+
+    先看例外類型與狀態碼，只有一般例外才比對訊息 (狀態碼必須是獨立的數字，
+    避免 "max 5000 tokens" 之類的訊息被誤判)。
+    """
+    if isinstance(error, BatchFormatError) or is_quota_error(error):
+        return True
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    code = _status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    msg = str(error)
+    if _AUTH_TEXT.search(msg):
+        return False
+    return bool(_RETRYABLE_STATUS_TEXT.search(msg) or _TRANSIENT_TEXT.search(msg))
+
+
+def retry_hint_seconds(error):
+    """配額錯誤訊息中建議的等待時間 ("Please retry in 27.3s" / retry_delay { seconds: 27 })"""
+    match = _RETRY_HINT.search(str(error))
+    if not match:
+        return None
+    return float(match.group(1) or match.group(2))
+
+
+def explain_error(error):
+    """印出常見錯誤的可能原因"""
+    print(f"   錯誤類型: {type(error).__name__}")
+    print(f"   錯誤訊息: {str(error)}")
+    error_msg = str(error).lower()
+    if is_quota_error(error) or 'limit' in error_msg:
+        print(f"   💡 可能原因: API 配額用完或達到速率限制")
+        print(f"   建議: 檢查 https://aistudio.google.com/app/apikey")
+    elif 'api_key' in error_msg or 'authentication' in error_msg:
+        print(f"   💡 可能原因: API Key 無效或過期")
+    elif 'permission' in error_msg:
+        print(f"   💡 可能原因: API Key 權限不足")
+    elif 'timeout' in error_msg or 'connection' in error_msg:
+        print(f"   💡 可能原因: 網路連線問題")
+
+
+class TokenBucket:
+    """權杖桶：平均每分鐘 rate_per_min 個請求，最多累積 burst 個"""
+
+    def __init__(self, rate_per_min, burst=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate_per_min / 60.0
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """取得一個權杖 (必要時等待)"""
+        while True:
+            with self.lock:
+                now = self.clock()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1.0 - _TOKEN_EPSILON:  # 浮點誤差差一點點也算一個權杖
+                        self.tokens = max(0.0, self.tokens - 1.0)
+                        return
+                    wait = (1.0 - self.tokens) / self.rate
+            self.sleep(wait)
+
+    def pause(self, seconds):
+        """配額錯誤：暫停發出新的請求，並清空累積的權杖"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+            self.tokens = 0.0
+            self.updated = self.paused_until
+
+
+class GeminiBatchTranslator:
+    """並行送出翻譯批次 (同一個實例的所有請求共用速率限制)
+
+    concurrency / requests_per_minute 為 None 時讀取環境變數 GEMINI_CONCURRENCY /
+    GEMINI_REQUESTS_PER_MINUTE。
+    """
+
+    def __init__(self, model, concurrency=None, requests_per_minute=None,
+                 max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE_S, sleep=time.sleep):
+        concurrency, requests_per_minute = translator_limits(concurrency, requests_per_minute)
+        self.model = model
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.sleep = sleep
+        self.bucket = TokenBucket(requests_per_minute, burst=self.concurrency, sleep=sleep)
+        self.stats = {"requests": 0, "retries": 0, "quota_errors": 0, "failed_batches": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _backoff(self, attempt):
+        delay = min(BACKOFF_MAX_S, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)  # 加上隨機量，避免所有執行緒同時重試
+
+    def translate_batch(self, raw_segments, label=""):
+        """翻譯一個批次 (含重試)；全部失敗時回傳 None"""
+        prompt = build_prompt(raw_segments)
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            self._count("requests")
+            try:
+                response = self.model.generate_content(prompt)
+                parsed_data = parse_response(response.text, raw_segments)
+                print(f"✅ Gemini 成功處理 {len(parsed_data)} 個片段{label}")
+                return parsed_data
+            except Exception as e:
+                retryable = is_retryable(e)
+                if is_quota_error(e):
+                    self._count("quota_errors")
+                    hint = retry_hint_seconds(e)
+                    self.bucket.pause(hint if hint is not None else QUOTA_COOLDOWN_S)
+                if not retryable or attempt >= self.max_retries:
+                    print(f"\n❌ Gemini 批次失敗{label} (已嘗試 {attempt + 1} 次)")
+                    explain_error(e)
+                    self._count("failed_batches")
+                    return None
+                delay = self._backoff(attempt)
+                print(f"   🔁 Gemini 暫時失敗{label}: {type(e).__name__}: {str(e)[:120]}，"
+                      f"{delay:.1f} 秒後重試 ({attempt + 1}/{self.max_retries})")
+                self._count("retries")
+                self.sleep(delay)
+        return None
+
+    def map_batches(self, batches, translate=None):
+        """並行處理所有批次，依原本順序回傳結果 (失敗的批次為 None)
+
+        translate(batch, batch_num) 預設為 translate_batch；呼叫端可以傳入加上快取等處理的版本。
+        """
+        if translate is None:
+            translate = lambda batch, num: self.translate_batch(batch, f" (第 {num} 批)")
+        if len(batches) <= 1 or self.concurrency == 1:
+            return [translate(batch, num) for num, batch in enumerate(batches, 1)]
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches)),
+                                thread_name_prefix="gemini") as pool:
+            futures = [pool.submit(translate, batch, num) for num, batch in enumerate(batches, 1)]
+            return [future.result() for future in futures]
+
+
+class BatchCheckpoint:
+    """一個課程的批次翻譯檢查點 {batch_key: 翻譯結果 (不含 words)}
+
+    檔名請以 . 開頭 (例如 .<video_id>.checkpoint.json)，課程清單與索引會略過它。
+    """
+
+    def __init__(self, path, model_name):
+        self.path = path
+        self.model_name = model_name
+        self.batches = {}
+        self.lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == CHECKPOINT_VERSION:
+                self.batches = data.get("batches", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"   ⚠️ 翻譯檢查點損毀，將重新翻譯: {e}")
+
+    def __len__(self):
+        return len(self.batches)
+
+    def get(self, raw_segments):
+        """已完成的批次結果 (加回 words)；沒有時回傳 None"""
+        with self.lock:
+            items = self.batches.get(batch_key(raw_segments, self.model_name))
+        if items is None or len(items) != len(raw_segments):
+            return None
+        return [dict(item, words=raw_segments[i].get("words", [])) for i, item in enumerate(items)]
+
+    def put(self, raw_segments, processed):
+        """記錄一個成功的批次並立即寫檔 (先寫暫存檔再換名)"""
+        items = [{k: v for k, v in item.items() if k != "words"} for item in processed]
+        with self.lock:
+            self.batches[batch_key(raw_segments, self.model_name)] = items
+            tmp_path = self.path + ".tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({"version": CHECKPOINT_VERSION, "model": self.model_name,
+                               "batches": self.batches}, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"   ⚠️ 無法寫入翻譯檢查點: {e}")
+
+    def discard(self):
+        """所有批次都完成並寫入課程後刪除"""
+        with self.lock:
+            self.batches = {}
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """本機假模型：把輸入原樣「翻譯」回去，可設定延遲、失敗率與配額錯誤率"""
+
+    def __init__(self, latency_s=0.2, fail_rate=0.0, quota_rate=0.0, merge_rate=0.0, seed=0):
+        self.latency_s = latency_s
+        self.fail_rate = fail_rate
+        self.quota_rate = quota_rate
+        self.merge_rate = merge_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+
+    def generate_content(self, prompt):
+        with self.lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            roll = self.random.random()
+        try:
+            time.sleep(self.latency_s)
+            if roll < self.quota_rate:
+                raise RuntimeError("429 Resource exhausted: quota exceeded. Please retry in 0.5s")
+            if roll < self.quota_rate + self.fail_rate:
+                raise RuntimeError("503 Service unavailable")
+            line = next(l.strip() for l in prompt.splitlines() if l.strip().startswith("[{"))
+            segments = json.loads(line)
+            if roll < self.quota_rate + self.fail_rate + self.merge_rate and len(segments) > 1:
+                segments = segments[:-1]  # 模擬 Gemini 合併片段
+            output = [{"id": s["id"], "start_time": s["start"], "end_time": s["end"], "text_en": s["text"],
+                       "text_zh": f"譯:{s['text']}", "keywords": s["text"].split()[:1]} for s in segments]
+            return StubResponse("```json\n" + json.dumps(output, ensure_ascii=False) + "\n```")
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def main():
+    """python gemini_translator.py：以本機假模型檢查並行翻譯 (順序、重試、速率限制)"""
+    import argparse
+    parser = argparse.ArgumentParser(description="Gemini 批次翻譯自我檢查 (StubModel)")
+    parser.add_argument("--segments", type=int, default=300)
+    parser.add_argument("--batch-size", type=int, default=15)
+    parser.add_argument("--concurrency", type=int, default=None, help=f"預設讀取 {CONCURRENCY_ENV}")
+    parser.add_argument("--rpm", type=float, default=600, help="每分鐘請求數 (吞吐量上限)")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--fail-rate", type=float, default=0.1)
+    parser.add_argument("--quota-rate", type=float, default=0.05)
+    parser.add_argument("--merge-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    raw_segments = [{"start": i * 2.0, "end": i * 2.0 + 1.5, "text": f" segment number {i}",
+                     "words": [{"word": "segment", "start": i * 2.0, "end": i * 2.0 + 0.5}]}
+                    for i in range(args.segments)]
+    batches = [raw_segments[i:i + args.batch_size] for i in range(0, len(raw_segments), args.batch_size)]
+    model = StubModel(args.latency, args.fail_rate, args.quota_rate, args.merge_rate)
+    translator = GeminiBatchTranslator(model, args.concurrency, args.rpm, backoff_base=0.2)
+
+    start = time.perf_counter()
+    results = translator.map_batches(batches)
+    elapsed = time.perf_counter() - start
+
+    translated = [seg for batch in results if batch for seg in batch]
+    in_order = all(seg["text_en"] == f"segment number {i}" for i, seg in enumerate(translated))
+    rpm_bound = max(0, len(batches) - translator.concurrency) * 60.0 / args.rpm
+    print(f"\n📊 {len(batches)} 批 / {elapsed:.2f} 秒 (依序約 {len(batches) * args.latency:.2f} 秒，"
+          f"{args.rpm:g} rpm 下至少約 {rpm_bound:.2f} 秒)")
+    print(f"   成功 {sum(r is not None for r in results)} 批, 順序正確: {in_order}, "
+          f"最大同時請求 {model.max_active}, 統計 {translator.stats}")
+
+
+if __name__ == "__main__":
+    main()
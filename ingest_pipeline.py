@@ -0,0 +1,105 @@
+import time
+import queue
+import threading
+
+# --- 多階段處理管線 (工廠批次處理多個網址) ---
+# 每個階段有自己的工作執行緒數與有界佇列：
+# - 下載、ffmpeg、Whisper、Gemini 同時處理不同影片 (第 3 支在下載時，第 2 支在辨識、第 1 支在翻譯)
+# - 佇列滿時上一階段會等待 (backpressure)，暫存影片與記憶體不會無限制累積
+# 階段函式回傳下一階段的工作；回傳 None 表示這個項目到此結束 (已存在而跳過、或失敗)。
+
+_DONE = object()  # 結束訊號：每個工作執行緒收到一個
+
+
+class Stage:
+    """管線的一個階段"""
+
+    def __init__(self, name, func, workers=1, queue_size=2):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)  # 等待這個階段處理的項目上限
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.busy = 0.0  # 所有工作執行緒實際處理的總秒數
+        self.lock = threading.Lock()
+
+
+class StagedPipeline:
+    """依序串接多個 Stage；run() 會阻塞直到所有項目離開管線，回傳最後一個階段的輸出"""
+
+    def __init__(self, stages, label=str):
+        self.stages = stages
+        self.label = label  # 項目 -> 記錄用的名稱
+
+    def run(self, items):
+        stages = self.stages
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in stages]
+        remaining = [stage.workers for stage in stages]
+        remaining_lock = threading.Lock()
+        results = []
+
+        def worker(i):
+            stage = stages[i]
+            q_in = queues[i]
+            q_out = queues[i + 1] if i + 1 < len(stages) else None
+            while True:
+                item = q_in.get()
+                if item is _DONE:
+                    break
+                start = time.perf_counter()
+                failed = False
+                try:
+                    out = stage.func(item)
+                except Exception as e:
+                    print(f"❌ [{stage.name}] {self.label(item)}: {type(e).__name__}: {e}")
+                    out = None
+                    failed = True
+                with stage.lock:
+                    stage.busy += time.perf_counter() - start
+                    if failed:
+                        stage.failed += 1
+                    elif out is None:
+                        stage.dropped += 1
+                    else:
+                        stage.processed += 1
+                if out is None:
+                    continue
+                if q_out is not None:
+                    q_out.put(out)  # 下一階段忙碌時在這裡等待
+                else:
+                    results.append(out)
+
+            # 這個階段最後一個結束的執行緒通知下一階段
+            with remaining_lock:
+                remaining[i] -= 1
+                last = remaining[i] == 0
+            if last and q_out is not None:
+                for _ in range(stages[i + 1].workers):
+                    q_out.put(_DONE)
+
+        threads = []
+        for i, stage in enumerate(stages):
+            for n in range(stage.workers):
+                t = threading.Thread(target=worker, args=(i,), name=f"{stage.name}-{n}", daemon=True)
+                t.start()
+                threads.append(t)
+
+        started = time.perf_counter()
+        for item in items:
+            queues[0].put(item)
+        for _ in range(stages[0].workers):
+            queues[0].put(_DONE)
+        for t in threads:
+            t.join()
+
+        self.print_summary(time.perf_counter() - started)
+        return results
+
+    def print_summary(self, elapsed):
+        print(f"\n📊 管線完成，總耗時 {elapsed:.1f} 秒")
+        for stage in self.stages:
+            usage = stage.busy / (elapsed * stage.workers) * 100 if elapsed > 0 else 0.0
+            print(f"   {stage.name:10s} x{stage.workers}  完成 {stage.processed}  略過 {stage.dropped}  "
+                  f"失敗 {stage.failed}  忙碌 {stage.busy:.1f} 秒 ({usage:.0f}%)")
@@ -0,0 +1,247 @@
+import os
+import sys
+import json
+import mmap
+import struct
+import numpy as np
+
+# --- 二進位課程格式 (.lesson) ---
+# 與 JSON 並存的播放用格式：片段/單字時間為打包的 float64 陣列，文字放在字串表，
+# keyword 以 bitmap 儲存；讀取時以 mmap 對應檔案並建立零複製的 NumPy view。
+# JSON 仍是原始資料來源 (例如單字 probability 只保留在 JSON)。
+#
+# 檔案結構 (little-endian，每個區段對齊 8 bytes):
+#   MAGIC(4) | VERSION(u32) | 區段數(u32) | 區段表 [名稱(8s) offset(u64) 長度(u64)] * N | 區段資料...
+
+MAGIC = b"LLB1"
+VERSION = 1
+BINARY_EXT = ".lesson"
+_HEADER = struct.Struct("<4sII")
+_SECTION = struct.Struct("<8sQQ")
+_PUNCTUATION = '.,!?;:\'"'
+
+
+def binary_path_for(json_path):
+    """課程 JSON 對應的二進位檔路徑"""
+    return os.path.splitext(json_path)[0] + BINARY_EXT
+
+
+def is_binary_fresh(json_path):
+    """二進位檔存在且不比 JSON 舊"""
+    bin_path = binary_path_for(json_path)
+    try:
+        return os.path.getmtime(bin_path) >= os.path.getmtime(json_path)
+    except OSError:
+        return False
+
+
+class _StringTable:
+    """字串去重 (重複的單字只存一次)"""
+
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def add(self, text):
+        idx = self.ids.get(text)
+        if idx is None:
+            idx = len(self.strings)
+            self.ids[text] = idx
+            self.strings.append(text)
+        return idx
+
+    def pack(self):
+        blobs = [s.encode("utf-8") for s in self.strings]
+        offsets = np.zeros(len(blobs) + 1, dtype="<u8")
+        if blobs:
+            offsets[1:] = np.cumsum([len(b) for b in blobs])
+        return offsets, b"".join(blobs)
+
+
+def write_binary_lesson(data, bin_path):
+    """把課程資料 (JSON 結構) 寫成二進位格式 (先寫暫存檔再換名)"""
+    segments = data.get("segments", [])
+    strings = _StringTable()
+
+    seg_times, seg_text, seg_word, seg_kw = [], [], [0], [0]
+    kw_ids, word_times, word_text, word_kw = [], [], [], []
+
+    for seg in segments:
+        # 相容兩種格式：Gemini 處理後 (start_time/end_time) 和 Whisper 原始 (start/end)
+        seg_times.append((seg.get('start_time', seg.get('start', 0)), seg.get('end_time', seg.get('end', 0))))
+        seg_text.append((strings.add(seg.get('text_en', seg.get('text', ''))),
+                         strings.add(seg.get('text_zh', '[無中文翻譯]'))))
+
+        keywords = seg.get('keywords', [])
+        kw_ids.extend(strings.add(kw) for kw in keywords)
+        seg_kw.append(len(kw_ids))
+
+        keyword_set = {kw.lower() for kw in keywords}
+        for w in seg.get('words', []):
+            word = w.get('word', '').strip()
+            word_times.append((w.get('start', 0), w.get('end', 0)))
+            word_text.append(strings.add(word))
+            word_kw.append(word.strip(_PUNCTUATION).lower() in keyword_set)
+        seg_word.append(len(word_text))
+
+    meta = {k: v for k, v in data.items() if k != "segments"}
+    str_offsets, str_data = strings.pack()
+    sections = [
+        (b"meta", json.dumps(meta, ensure_ascii=False).encode("utf-8")),
+        (b"segtime", np.asarray(seg_times, dtype="<f8").reshape(-1, 2).tobytes()),
+        (b"segtext", np.asarray(seg_text, dtype="<u4").reshape(-1, 2).tobytes()),
+        (b"segword", np.asarray(seg_word, dtype="<u4").tobytes()),
+        (b"segkw", np.asarray(seg_kw, dtype="<u4").tobytes()),
+        (b"kwids", np.asarray(kw_ids, dtype="<u4").tobytes()),
+        (b"wordtime", np.asarray(word_times, dtype="<f8").reshape(-1, 2).tobytes()),
+        (b"wordtext", np.asarray(word_text, dtype="<u4").tobytes()),
+        (b"kwbits", np.packbits(np.asarray(word_kw, dtype=bool), bitorder="little").tobytes()),
+        (b"stroffs", str_offsets.tobytes()),
+        (b"strdata", str_data),
+    ]
+
+    def align(n):
+        return (n + 7) & ~7
+
+    offset = align(_HEADER.size + _SECTION.size * len(sections))
+    table = []
+    for name, payload in sections:
+        table.append(_SECTION.pack(name, offset, len(payload)))
+        offset = align(offset + len(payload))
+
+    tmp_path = bin_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(sections)))
+        f.write(b"".join(table))
+        for name, payload in sections:
+            f.write(b"\0" * (align(f.tell()) - f.tell()))
+            f.write(payload)
+    os.replace(tmp_path, bin_path)
+
+
+class BinaryLesson:
+    """以 mmap 讀取 .lesson 檔，所有陣列都是直接指向檔案的 NumPy view (不複製)"""
+
+    def __init__(self, bin_path):
+        self.path = bin_path
+        with open(bin_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"不支援的課程格式: {bin_path}")
+        self._sections = {}
+        for i in range(count):
+            name, offset, length = _SECTION.unpack_from(self._mm, _HEADER.size + i * _SECTION.size)
+            self._sections[name.rstrip(b"\0")] = (offset, length)
+
+        self.meta = json.loads(bytes(self._view(b"meta", "u1")).decode("utf-8"))
+        self.segment_times = self._view(b"segtime", "<f8").reshape(-1, 2)   # [n, (start, end)]
+        self.segment_text = self._view(b"segtext", "<u4").reshape(-1, 2)    # [n, (en, zh)] 字串編號
+        self.segment_words = self._view(b"segword", "<u4")                  # 單字範圍 (CSR offsets)
+        self.segment_keywords = self._view(b"segkw", "<u4")                 # keyword 範圍 (CSR offsets)
+        self.keyword_ids = self._view(b"kwids", "<u4")
+        self.word_times = self._view(b"wordtime", "<f8").reshape(-1, 2)     # [n_words, (start, end)]
+        self.word_text = self._view(b"wordtext", "<u4")
+        self.keyword_bits = self._view(b"kwbits", "u1")
+        self._str_offsets = self._view(b"stroffs", "<u8")
+        self._str_data = memoryview(self._mm)
+        self._str_base = self._sections[b"strdata"][0]
+        self._strings = {}
+
+    def _view(self, name, dtype):
+        offset, length = self._sections[name]
+        dtype = np.dtype(dtype)
+        return np.frombuffer(self._mm, dtype=dtype, count=length // dtype.itemsize, offset=offset)
+
+    def __len__(self):
+        return len(self.segment_times)
+
+    @property
+    def word_count(self):
+        return len(self.word_times)
+
+    def string(self, idx):
+        """字串表查詢 (解碼結果會快取)"""
+        text = self._strings.get(idx)
+        if text is None:
+            start = self._str_base + int(self._str_offsets[idx])
+            end = self._str_base + int(self._str_offsets[idx + 1])
+            text = self._str_data[start:end].tobytes().decode("utf-8")
+            self._strings[idx] = text
+        return text
+
+    def keyword_flags(self):
+        """每個單字是否為 keyword (bool 陣列)"""
+        return np.unpackbits(self.keyword_bits, count=self.word_count, bitorder="little").astype(bool)
+
+    def to_dict(self):
+        """還原成與 JSON 相同結構的課程資料 (不含單字 probability)"""
+        seg_times = self.segment_times.tolist()
+        seg_text = self.segment_text.tolist()
+        seg_words = self.segment_words.tolist()
+        seg_kw = self.segment_keywords.tolist()
+        kw_ids = self.keyword_ids.tolist()
+        word_times = self.word_times.tolist()
+        word_text = [self.string(i) for i in self.word_text.tolist()]
+
+        segments = []
+        for i, ((start, end), (en_id, zh_id)) in enumerate(zip(seg_times, seg_text)):
+            w0, w1 = seg_words[i], seg_words[i + 1]
+            segments.append({
+                "id": i,
+                "start_time": start,
+                "end_time": end,
+                "text_en": self.string(en_id),
+                "text_zh": self.string(zh_id),
+                "keywords": [self.string(k) for k in kw_ids[seg_kw[i]:seg_kw[i + 1]]],
+                "words": [
+                    {"word": word_text[w], "start": word_times[w][0], "end": word_times[w][1]}
+                    for w in range(w0, w1)
+                ],
+            })
+        data = dict(self.meta)
+        data["segments"] = segments
+        return data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # 先釋放指向 mmap 的 view，才能關閉 mmap
+        self.segment_times = self.segment_text = self.segment_words = None
+        self.segment_keywords = self.keyword_ids = self.word_times = None
+        self.word_text = self.keyword_bits = self._str_offsets = None
+        self._str_data.release()
+        self._mm.close()
+
+
+def convert_library(assets_dir, force=False):
+    """把資料夾中所有課程 JSON 轉成二進位格式 (已是最新的會跳過)"""
+    converted = 0
+    for f in sorted(os.listdir(assets_dir)):
+        if not f.endswith(".json") or f.startswith("."):
+            continue
+        json_path = os.path.join(assets_dir, f)
+        if not force and is_binary_fresh(json_path):
+            continue
+        try:
+            with open(json_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            write_binary_lesson(data, binary_path_for(json_path))
+            converted += 1
+            print(f"✅ {f} → {os.path.basename(binary_path_for(json_path))}")
+        except Exception as e:
+            print(f"❌ 轉換失敗 {f}: {e}")
+    print(f"完成：轉換 {converted} 個課程")
+    return converted
+
+
+if __name__ == "__main__":
+    # 用法: python lesson_binary.py [app_assets 資料夾] [--force]
+    args = [a for a in sys.argv[1:] if a != "--force"]
+    convert_library(args[0] if args else "./app_assets", force="--force" in sys.argv)
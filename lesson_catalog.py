@@ -0,0 +1,122 @@
+import os
+import json
+
+# --- 設定 ---
+CATALOG_FILENAME = ".catalog.json"  # 存放在課程資料夾內的索引檔
+CATALOG_VERSION = 1
+
+
+def is_lesson_file(filename):
+    """課程 JSON (排除 . 開頭的索引/暫存檔)"""
+    return filename.endswith(".json") and not filename.startswith(".")
+
+
+def read_lesson_summary(json_path):
+    """完整讀取一個課程 JSON，只留下清單需要的摘要欄位"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    filename = os.path.basename(json_path)
+    return {
+        "title": data.get('title', filename.replace('.json', '')),  # 如果沒有 title 就用檔名
+        "duration": data.get('duration', 0),
+        "segment_count": len(data.get('segments', [])),
+        "video_filename": data.get('video_filename'),
+        "audio_filename": data.get('audio_filename'),
+    }
+
+
+class LessonCatalog:
+    """課程目錄索引 (app_assets/.catalog.json)
+
+    以 (檔名, mtime, size) 判斷 JSON 是否變動，啟動時只重新解析有變動的檔案，
+    其餘直接使用快取的摘要 (title / duration / 片段數 / 媒體檔名)。
+    """
+
+    def __init__(self, assets_dir):
+        self.assets_dir = assets_dir
+        self.path = os.path.join(assets_dir, CATALOG_FILENAME)
+        self.lessons = {}  # {json_filename: 摘要}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == CATALOG_VERSION:
+                self.lessons = data.get("lessons", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ 課程索引損毀，將重新建立: {e}")
+            self.lessons = {}
+
+    def save(self):
+        """有變動時才寫回索引檔 (先寫暫存檔再換名，避免寫到一半損毀)"""
+        if not self._dirty:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": CATALOG_VERSION, "lessons": self.lessons}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except OSError as e:
+            print(f"⚠️ 無法寫入課程索引: {e}")
+
+    def _update_entry(self, filename, stat):
+        """重新解析單一課程 JSON 並更新索引"""
+        try:
+            summary = read_lesson_summary(os.path.join(self.assets_dir, filename))
+        except Exception as e:
+            print(f"無法讀取 {filename}: {e}")
+            # 讀取失敗時仍顯示檔名
+            summary = {"title": filename, "duration": 0, "segment_count": 0,
+                       "video_filename": None, "audio_filename": None, "error": str(e)}
+        summary["mtime_ns"] = stat.st_mtime_ns
+        summary["size"] = stat.st_size
+        self.lessons[filename] = summary
+        self._dirty = True
+
+    def refresh(self, filenames=None):
+        """增量更新索引，回傳 (新增或變動的檔名, 已移除的檔名)
+
+        filenames 為 None 時掃描整個資料夾；否則只檢查指定的檔案。
+        """
+        if filenames is None:
+            try:
+                filenames = [f for f in os.listdir(self.assets_dir) if is_lesson_file(f)]
+            except FileNotFoundError:
+                filenames = []
+            present = set(filenames)
+            removed = [f for f in self.lessons if f not in present]
+        else:
+            removed = []
+
+        changed = []
+        for f in filenames:
+            try:
+                stat = os.stat(os.path.join(self.assets_dir, f))
+            except FileNotFoundError:
+                if f in self.lessons:
+                    removed.append(f)
+                continue
+            entry = self.lessons.get(f)
+            if entry and entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+                continue
+            self._update_entry(f, stat)
+            changed.append(f)
+
+        for f in removed:
+            self.lessons.pop(f, None)
+            self._dirty = True
+
+        self.save()
+        return changed, removed
+
+    def filenames(self):
+        """依檔名排序的課程 JSON 清單"""
+        return sorted(self.lessons)
+
+    def get(self, filename):
+        return self.lessons.get(filename)
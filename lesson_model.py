@@ -0,0 +1,95 @@
+import sys
+from array import array
+
+# 正規化後的課程資料模型 (播放器在記憶體中使用)
+# - 載入時一次處理 start/start_time、text/text_en 等格式差異
+# - 片段使用 __slots__，單字改為每個片段的平行陣列 (不再是一個單字一個 dict)
+# - 單字字串經過 intern，整個課程中重複的單字只佔一份記憶體
+
+
+class Segment:
+    """單一字幕片段"""
+
+    __slots__ = ("index", "start", "end", "text_en", "text_zh", "keywords", "keyword_set",
+                 "words", "word_starts", "word_ends")
+
+    def __init__(self, index, start, end, text_en, text_zh, keywords, words, word_starts, word_ends):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.text_en = text_en
+        self.text_zh = text_zh
+        self.keywords = keywords                                   # tuple，保留原始大小寫
+        self.keyword_set = frozenset(kw.lower() for kw in keywords)  # 小寫，用於比對
+        self.words = words              # tuple[str]，已去除前後空白
+        self.word_starts = word_starts  # array('d')
+        self.word_ends = word_ends      # array('d')
+
+    @property
+    def has_words(self):
+        return len(self.words) > 0
+
+    @classmethod
+    def from_dict(cls, index, seg):
+        """由 JSON 片段建立 (相容 Gemini 處理後與 Whisper 原始兩種格式)"""
+        words_data = seg.get('words', [])
+        return cls(
+            index,
+            seg.get('start_time', seg.get('start', 0)),
+            seg.get('end_time', seg.get('end', 0)),
+            seg.get('text_en', seg.get('text', '')),
+            seg.get('text_zh', '[無中文翻譯]'),
+            tuple(seg.get('keywords', [])),
+            tuple(sys.intern(w.get('word', '').strip()) for w in words_data),  # 重複單字共用同一字串
+            array('d', [w.get('start', 0) for w in words_data]),
+            array('d', [w.get('end', 0) for w in words_data]),
+        )
+
+
+class Lesson:
+    """一個課程：基本資料 (title、媒體檔名...) + 正規化後的片段"""
+
+    __slots__ = ("meta", "segments")
+
+    def __init__(self, meta, segments):
+        self.meta = meta          # JSON 最上層欄位 (不含 segments)
+        self.segments = segments  # list[Segment]
+
+    def get(self, key, default=None):
+        return self.meta.get(key, default)
+
+    @property
+    def title(self):
+        return self.meta.get('title', 'Ready')
+
+    @classmethod
+    def from_dict(cls, data):
+        meta = {k: v for k, v in data.items() if k != "segments"}
+        segments = [Segment.from_dict(i, seg) for i, seg in enumerate(data.get("segments", []))]
+        return cls(meta, segments)
+
+    @classmethod
+    def from_binary(cls, binary):
+        """由 lesson_binary.BinaryLesson 建立 (直接讀取打包陣列，不經過 dict)"""
+        seg_times = binary.segment_times.tolist()
+        seg_text = binary.segment_text.tolist()
+        seg_words = binary.segment_words.tolist()
+        seg_kw = binary.segment_keywords.tolist()
+        kw_ids = binary.keyword_ids.tolist()
+        word_starts = binary.word_times[:, 0].tolist()
+        word_ends = binary.word_times[:, 1].tolist()
+        word_text = [binary.string(i) for i in binary.word_text.tolist()]
+
+        segments = []
+        for i, ((start, end), (en_id, zh_id)) in enumerate(zip(seg_times, seg_text)):
+            w0, w1 = seg_words[i], seg_words[i + 1]
+            segments.append(Segment(
+                i, start, end,
+                binary.string(en_id),
+                binary.string(zh_id),
+                tuple(binary.string(k) for k in kw_ids[seg_kw[i]:seg_kw[i + 1]]),
+                tuple(word_text[w0:w1]),
+                array('d', word_starts[w0:w1]),
+                array('d', word_ends[w0:w1]),
+            ))
+        return cls(dict(binary.meta), segments)
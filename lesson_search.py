@@ -0,0 +1,326 @@
+import os
+import re
+import json
+import sqlite3
+from array import array
+
+from lesson_catalog import is_lesson_file
+
+# --- 全課程搜尋索引 (SQLite 反向索引) ---
+# app_assets/.search_index.db：
+# - terms(id, term, kind)：kind 0 = 英文單字、1 = 中文字 (單字 + 相鄰兩字)、2 = Gemini keywords
+# - postings(term_id, lesson_id, segs)：每個 (詞, 課程) 一列，segs 為片段編號的打包陣列 (uint32)；
+#   依 term_id 叢集 (WITHOUT ROWID)，查詢只讀需要的詞，先以課程交集再解開片段
+# - segments 保存每個片段的開始時間與文字 (顯示結果用)，搜尋時完全不開課程 JSON
+# - lessons 以 (mtime_ns, size) 判斷是否需要重新索引，工廠寫入新課程時只索引該課程
+
+INDEX_FILENAME = ".search_index.db"
+INDEX_VERSION = 2
+SEARCH_CHUNK_LESSONS = 32  # 搜尋時每次解開多少個共同課程的片段 (湊滿 limit 就停止)
+
+KIND_EN = 0
+KIND_ZH = 1
+KIND_KEYWORD = 2
+
+_EN_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_CJK_RUN = re.compile(r"[㐀-鿿豈-﫿]+")
+
+
+def en_tokens(text):
+    return _EN_TOKEN.findall(text.lower())
+
+
+def zh_terms(text, bigrams_only=False):
+    """中文字的索引詞：每個字 + 相鄰兩字 (查詢時只用兩字詞，單字查詢才用單字)"""
+    terms = []
+    for run in _CJK_RUN.findall(text):
+        if not bigrams_only or len(run) == 1:
+            terms.extend(run)
+        terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def segment_terms(seg):
+    """一個片段的所有 (term, kind)"""
+    terms = {(t, KIND_EN) for t in en_tokens(seg.get('text_en', seg.get('text', '')))}
+    terms.update((t, KIND_ZH) for t in zh_terms(seg.get('text_zh', '')))
+    terms.update((kw.strip().lower(), KIND_KEYWORD) for kw in seg.get('keywords', []) if kw.strip())
+    return terms
+
+
+def _unpack_segs(blob):
+    segs = array('I')
+    segs.frombytes(blob)
+    return set(segs)
+
+
+class SearchHit:
+    """一筆搜尋結果"""
+
+    __slots__ = ("filename", "title", "seg_index", "start", "text_en", "text_zh", "keyword_match")
+
+    def __init__(self, filename, title, seg_index, start, text_en, text_zh, keyword_match):
+        self.filename = filename
+        self.title = title
+        self.seg_index = seg_index
+        self.start = start
+        self.text_en = text_en
+        self.text_zh = text_zh
+        self.keyword_match = keyword_match
+
+
+class LessonSearchIndex:
+    """課程搜尋索引 (每個執行緒請使用自己的實例)"""
+
+    def __init__(self, assets_dir):
+        self.assets_dir = assets_dir
+        self.path = os.path.join(assets_dir, INDEX_FILENAME)
+        self.conn = sqlite3.connect(self.path, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")   # 工廠/背景更新時播放器仍可查詢
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, INDEX_VERSION):
+            self.conn.executescript("DROP TABLE IF EXISTS postings; DROP TABLE IF EXISTS segments; "
+                                    "DROP TABLE IF EXISTS terms; DROP TABLE IF EXISTS lessons;")
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS lessons (
+                id INTEGER PRIMARY KEY,
+                filename TEXT UNIQUE NOT NULL,
+                title TEXT,
+                mtime_ns INTEGER,
+                size INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS segments (
+                lesson_id INTEGER NOT NULL,
+                seg_index INTEGER NOT NULL,
+                start REAL,
+                text_en TEXT,
+                text_zh TEXT,
+                PRIMARY KEY (lesson_id, seg_index)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS terms (
+                id INTEGER PRIMARY KEY,
+                term TEXT NOT NULL,
+                kind INTEGER NOT NULL,
+                UNIQUE (term, kind)
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term_id INTEGER NOT NULL,
+                lesson_id INTEGER NOT NULL,
+                segs BLOB NOT NULL,
+                PRIMARY KEY (term_id, lesson_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_lesson ON postings (lesson_id);
+            PRAGMA user_version = {INDEX_VERSION};
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    # --- 建立 / 更新 ---
+    def _term_ids(self, keys):
+        """{(term, kind): id}，必須在交易中呼叫
+
+        不在記憶體中快取 id：工廠與播放器的背景更新會同時寫入同一個索引，
+        交易失敗回滾後快取的 id 也可能已不存在。
+        """
+        self.conn.executemany("INSERT OR IGNORE INTO terms (term, kind) VALUES (?, ?)", keys)
+        by_kind = {}
+        for term, kind in keys:
+            by_kind.setdefault(kind, []).append(term)
+        ids = {}
+        for kind, terms in by_kind.items():
+            for i in range(0, len(terms), 500):  # SQLite 參數數量上限
+                chunk = terms[i:i + 500]
+                for term, term_id in self.conn.execute(
+                        f"SELECT term, id FROM terms WHERE kind = ? AND term IN ({','.join('?' * len(chunk))})",
+                        [kind, *chunk]):
+                    ids[(term, kind)] = term_id
+        return ids
+
+    def _remove_lesson(self, lesson_id):
+        self.conn.execute("DELETE FROM postings WHERE lesson_id = ?", (lesson_id,))
+        self.conn.execute("DELETE FROM segments WHERE lesson_id = ?", (lesson_id,))
+        self.conn.execute("DELETE FROM lessons WHERE id = ?", (lesson_id,))
+
+    def index_lesson(self, json_path, data=None):
+        """索引 (或重新索引) 一個課程；data 為已在記憶體中的課程 JSON (工廠剛寫入時)"""
+        filename = os.path.basename(json_path)
+        stat = os.stat(json_path)
+        if data is None:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")  # 先取得寫入鎖，避免與其他寫入者交錯
+            row = self.conn.execute("SELECT id FROM lessons WHERE filename = ?", (filename,)).fetchone()
+            if row:
+                self._remove_lesson(row[0])
+            cur = self.conn.execute(
+                "INSERT INTO lessons (filename, title, mtime_ns, size) VALUES (?, ?, ?, ?)",
+                (filename, data.get('title', filename.replace('.json', '')), stat.st_mtime_ns, stat.st_size))
+            lesson_id = cur.lastrowid
+
+            seg_rows = []
+            postings = {}  # (term, kind) -> array 片段編號 (遞增)
+            for i, seg in enumerate(data.get('segments', [])):
+                seg_rows.append((lesson_id, i, seg.get('start_time', seg.get('start', 0)),
+                                 seg.get('text_en', seg.get('text', '')), seg.get('text_zh', '')))
+                for key in segment_terms(seg):
+                    segs = postings.get(key)
+                    if segs is None:
+                        segs = postings[key] = array('I')
+                    segs.append(i)
+            self.conn.executemany("INSERT INTO segments VALUES (?, ?, ?, ?, ?)", seg_rows)
+            term_ids = self._term_ids(list(postings))
+            self.conn.executemany(
+                "INSERT INTO postings VALUES (?, ?, ?)",
+                [(term_ids[key], lesson_id, segs.tobytes()) for key, segs in postings.items()])
+
+    def remove(self, filename):
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute("SELECT id FROM lessons WHERE filename = ?", (filename,)).fetchone()
+            if row:
+                self._remove_lesson(row[0])
+
+    def refresh(self):
+        """增量同步整個課程資料夾，回傳 (重新索引的檔名, 移除的檔名)"""
+        try:
+            filenames = [f for f in os.listdir(self.assets_dir) if is_lesson_file(f)]
+        except FileNotFoundError:
+            filenames = []
+        known = {f: (m, s) for f, m, s in self.conn.execute("SELECT filename, mtime_ns, size FROM lessons")}
+
+        changed = []
+        for f in filenames:
+            path = os.path.join(self.assets_dir, f)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if known.get(f) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            try:
+                self.index_lesson(path)
+                changed.append(f)
+            except Exception as e:
+                print(f"⚠️ 無法索引 {f}: {e}")
+
+        present = set(filenames)
+        removed = [f for f in known if f not in present]
+        for f in removed:
+            self.remove(f)
+        return changed, removed
+
+    # --- 查詢 ---
+    def _lookup_term(self, term, kind):
+        row = self.conn.execute("SELECT id FROM terms WHERE term = ? AND kind = ?", (term, kind)).fetchone()
+        return row[0] if row else None
+
+    def _lessons_for(self, term_id):
+        return {r[0] for r in self.conn.execute("SELECT lesson_id FROM postings WHERE term_id = ?", (term_id,))}
+
+    def _segments_for(self, term_id, lesson_ids):
+        """{lesson_id: set(片段編號)}，只讀取並解開指定課程的列"""
+        result = {}
+        lesson_ids = sorted(lesson_ids)
+        for i in range(0, len(lesson_ids), 500):  # SQLite 參數數量上限
+            chunk = lesson_ids[i:i + 500]
+            for lesson_id, blob in self.conn.execute(
+                    f"SELECT lesson_id, segs FROM postings WHERE term_id = ? "
+                    f"AND lesson_id IN ({','.join('?' * len(chunk))})", (term_id, *chunk)):
+                result[lesson_id] = _unpack_segs(blob)
+        return result
+
+    def _first_segments_for(self, term_id, limit):
+        """依課程順序讀取片段，累積到 limit 個片段就停止 {lesson_id: set(片段編號)}"""
+        result = {}
+        count = 0
+        for lesson_id, blob in self.conn.execute(
+                "SELECT lesson_id, segs FROM postings WHERE term_id = ? ORDER BY lesson_id", (term_id,)):
+            result[lesson_id] = _unpack_segs(blob)
+            count += len(result[lesson_id])
+            if count >= limit:
+                break
+        return result
+
+    def search(self, query, limit=100):
+        """搜尋片段：所有英文單字與中文詞都要出現 (AND)；整個查詢符合 keyword 的片段排在前面"""
+        query = query.strip()
+        if not query:
+            return []
+        terms = [(t, KIND_EN) for t in en_tokens(query)]
+        terms += [(t, KIND_ZH) for t in zh_terms(query, bigrams_only=True)]
+
+        # 1. 整個查詢符合 keyword 的片段排在最前面 (依課程、片段順序)，只需要讀到 limit 個
+        keyword_hits = set()  # {(lesson_id, seg_index)}
+        keyword_id = self._lookup_term(query.lower(), KIND_KEYWORD)
+        if keyword_id is not None:
+            for lesson_id, segs in self._first_segments_for(keyword_id, limit).items():
+                keyword_hits.update((lesson_id, i) for i in segs)
+
+        matched = set()  # 所有詞都出現、但不是 keyword 結果的片段
+        term_ids = [self._lookup_term(t, k) for t, k in dict.fromkeys(terms)]
+        if len(keyword_hits) < limit and term_ids and None not in term_ids:
+            # 2. 先以課程交集 (只讀 lesson_id)，從最少課程的詞開始
+            lesson_sets = sorted(((self._lessons_for(t), t) for t in term_ids), key=lambda x: len(x[0]))
+            lessons = sorted(set.intersection(*(ls for ls, _ in lesson_sets)))
+            # 3. 依課程順序每次解開一小批共同課程的片段再交集，湊滿 limit 個就停止
+            wanted = limit - len(keyword_hits)
+            for i in range(0, len(lessons), SEARCH_CHUNK_LESSONS):
+                chunk = lessons[i:i + SEARCH_CHUNK_LESSONS]
+                segs = self._segments_for(lesson_sets[0][1], chunk)
+                for _, term_id in lesson_sets[1:]:
+                    chunk = [l for l in chunk if segs.get(l)]  # 之後的詞只讀還有交集的課程
+                    found = self._segments_for(term_id, chunk)
+                    segs = {l: segs[l] & found.get(l, set()) for l in chunk}
+                for lesson_id in sorted(segs):
+                    matched.update((lesson_id, j) for j in segs[lesson_id]
+                                   if (lesson_id, j) not in keyword_hits)
+                if len(matched) >= wanted:
+                    break
+
+        matched |= keyword_hits
+        if not matched:
+            return []
+
+        ordered = sorted(matched, key=lambda ls: (ls not in keyword_hits, ls[0], ls[1]))[:limit]
+        hits = []
+        for lesson_id, seg_index in ordered:
+            row = self.conn.execute(
+                "SELECT l.filename, l.title, s.start, s.text_en, s.text_zh FROM segments s "
+                "JOIN lessons l ON l.id = s.lesson_id WHERE s.lesson_id = ? AND s.seg_index = ?",
+                (lesson_id, seg_index)).fetchone()
+            if row:
+                hits.append(SearchHit(row[0], row[1], seg_index, row[2], row[3], row[4],
+                                      (lesson_id, seg_index) in keyword_hits))
+        return hits
+
+
+def main():
+    """python lesson_search.py [資料夾] 查詢字串：更新索引後搜尋"""
+    import sys
+    import time
+    args = sys.argv[1:]
+    assets_dir = args.pop(0) if args and os.path.isdir(args[0]) else "./app_assets"
+    index = LessonSearchIndex(assets_dir)
+    changed, removed = index.refresh()
+    print(f"🔎 索引已更新: {len(changed)} 個課程重新索引, {len(removed)} 個移除")
+    if args:
+        start = time.perf_counter()
+        hits = index.search(" ".join(args))
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"找到 {len(hits)} 筆 ({elapsed:.1f} ms)")
+        for hit in hits[:20]:
+            mark = "★" if hit.keyword_match else " "
+            print(f" {mark} [{hit.title}] {int(hit.start) // 60:02}:{int(hit.start) % 60:02}  {hit.text_en} / {hit.text_zh}")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
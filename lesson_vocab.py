@@ -0,0 +1,299 @@
+import os
+import re
+import json
+import sqlite3
+from array import array
+from pathlib import Path
+
+from lesson_catalog import is_lesson_file
+
+# --- 全課程單字頻率資料庫 (SQLite) ---
+# app_assets/.vocab.db：
+# - words(word, freq, lesson_count, keyword_count)：整個課程庫的累計次數
+# - lesson_words(word_id, lesson_id, count, keyword_count, segs, times)：每個 (單字, 課程) 一列，
+#   segs / times 為出現位置的打包陣列 (片段編號 uint32、秒數 float32)
+# 新增或更新一個課程時，只扣掉該課程舊的次數再加上新的次數，不必重建整個資料庫。
+
+VOCAB_FILENAME = ".vocab.db"
+VOCAB_VERSION = 1
+
+RARE_MAX_FREQ = 2       # 整個課程庫出現次數 <= 此值視為罕見字
+RARE_MIN_LESSONS = 5    # 課程太少時不標示罕見字 (統計沒有意義)
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def normalize_word(text):
+    """單字正規化：小寫、去掉標點 ("Hello," -> "hello")；沒有單字時回傳空字串"""
+    match = _WORD.search(text.lower())
+    return match.group(0) if match else ""
+
+
+def lesson_word_postings(data):
+    """統計一個課程的單字：{word: [count, keyword_count, array(片段), array(秒數)]}
+
+    有 Whisper words 時使用逐字時間，否則以片段開始時間代替。
+    """
+    postings = {}
+
+    def entry(word):
+        item = postings.get(word)
+        if item is None:
+            item = postings[word] = [0, 0, array('I'), array('f')]
+        return item
+
+    for i, seg in enumerate(data.get('segments', [])):
+        words = seg.get('words')
+        if words:
+            occurrences = [(normalize_word(w.get('word', '')), w.get('start', 0)) for w in words]
+        else:
+            start = seg.get('start_time', seg.get('start', 0))
+            occurrences = [(w, start) for w in _WORD.findall(seg.get('text_en', seg.get('text', '')).lower())]
+        for word, t in occurrences:
+            if not word:
+                continue
+            item = entry(word)
+            item[0] += 1
+            item[2].append(i)
+            item[3].append(t)
+        for kw in seg.get('keywords', []):
+            kw = kw.strip().lower()
+            if kw:
+                entry(kw)[1] += 1
+    return postings
+
+
+def _query_rare_words(conn, filename, max_freq):
+    if conn.execute("SELECT COUNT(*) FROM lessons").fetchone()[0] < RARE_MIN_LESSONS:
+        return set()
+    return {w for (w,) in conn.execute(
+        "SELECT w.word FROM lessons l JOIN lesson_words lw ON lw.lesson_id = l.id "
+        "JOIN words w ON w.id = lw.word_id WHERE l.filename = ? AND w.freq BETWEEN 1 AND ?",
+        (filename, max_freq))}
+
+
+def read_rare_words(assets_dir, filename, max_freq=RARE_MAX_FREQ):
+    """唯讀查詢課程的罕見字 (背景載入課程時呼叫，使用自己的連線)
+
+    不建立資料表也不寫入；資料庫還不存在或尚未建立時回傳空集合。
+    """
+    path = os.path.join(assets_dir, VOCAB_FILENAME)
+    if not os.path.exists(path):
+        return set()
+    conn = sqlite3.connect(Path(path).absolute().as_uri() + "?mode=ro", uri=True, timeout=10)
+    try:
+        return _query_rare_words(conn, filename, max_freq)
+    except sqlite3.OperationalError:
+        return set()  # 資料表尚未建立
+    finally:
+        conn.close()
+
+
+class WordOccurrence:
+    __slots__ = ("filename", "title", "seg_index", "time")
+
+    def __init__(self, filename, title, seg_index, time):
+        self.filename = filename
+        self.title = title
+        self.seg_index = seg_index
+        self.time = time
+
+
+class VocabularyStore:
+    """單字頻率資料庫 (每個執行緒請使用自己的實例)"""
+
+    def __init__(self, assets_dir):
+        self.assets_dir = assets_dir
+        self.path = os.path.join(assets_dir, VOCAB_FILENAME)
+        self.conn = sqlite3.connect(self.path, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, VOCAB_VERSION):
+            self.conn.executescript("DROP TABLE IF EXISTS lesson_words; DROP TABLE IF EXISTS words; "
+                                    "DROP TABLE IF EXISTS lessons;")
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS lessons (
+                id INTEGER PRIMARY KEY,
+                filename TEXT UNIQUE NOT NULL,
+                title TEXT,
+                mtime_ns INTEGER,
+                size INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS words (
+                id INTEGER PRIMARY KEY,
+                word TEXT UNIQUE NOT NULL,
+                freq INTEGER NOT NULL DEFAULT 0,
+                lesson_count INTEGER NOT NULL DEFAULT 0,
+                keyword_count INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS lesson_words (
+                word_id INTEGER NOT NULL,
+                lesson_id INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                keyword_count INTEGER NOT NULL,
+                segs BLOB NOT NULL,
+                times BLOB NOT NULL,
+                PRIMARY KEY (word_id, lesson_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS lesson_words_lesson ON lesson_words (lesson_id);
+            PRAGMA user_version = {VOCAB_VERSION};
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    # --- 更新 ---
+    def _word_ids(self, words):
+        """{word: id}，必須在交易中呼叫
+
+        不在記憶體中快取 id：工廠與播放器的背景更新會同時寫入同一個資料庫，
+        交易失敗回滾後快取的 id 也可能已不存在。
+        """
+        self.conn.executemany("INSERT OR IGNORE INTO words (word) VALUES (?)", [(w,) for w in words])
+        ids = {}
+        for i in range(0, len(words), 500):  # SQLite 參數數量上限
+            chunk = words[i:i + 500]
+            ids.update(self.conn.execute(
+                f"SELECT word, id FROM words WHERE word IN ({','.join('?' * len(chunk))})", chunk))
+        return ids
+
+    def _remove_lesson(self, lesson_id):
+        """扣掉課程的舊次數並刪除它的列"""
+        rows = self.conn.execute(
+            "SELECT word_id, count, keyword_count FROM lesson_words WHERE lesson_id = ?", (lesson_id,)).fetchall()
+        self.conn.executemany(
+            "UPDATE words SET freq = freq - ?, keyword_count = keyword_count - ?, "
+            "lesson_count = lesson_count - ? WHERE id = ?",
+            [(count, kw_count, 1 if count else 0, word_id) for word_id, count, kw_count in rows])
+        self.conn.execute("DELETE FROM lesson_words WHERE lesson_id = ?", (lesson_id,))
+        self.conn.execute("DELETE FROM lessons WHERE id = ?", (lesson_id,))
+
+    def index_lesson(self, json_path, data=None):
+        """加入 (或更新) 一個課程；data 為已在記憶體中的課程 JSON"""
+        filename = os.path.basename(json_path)
+        stat = os.stat(json_path)
+        if data is None:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        postings = lesson_word_postings(data)
+
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")  # 先取得寫入鎖：讀取舊次數到寫入之間不會被其他寫入者插入
+            row = self.conn.execute("SELECT id FROM lessons WHERE filename = ?", (filename,)).fetchone()
+            if row:
+                self._remove_lesson(row[0])
+            lesson_id = self.conn.execute(
+                "INSERT INTO lessons (filename, title, mtime_ns, size) VALUES (?, ?, ?, ?)",
+                (filename, data.get('title', filename.replace('.json', '')), stat.st_mtime_ns, stat.st_size)
+            ).lastrowid
+
+            word_ids = self._word_ids(list(postings))
+            rows = [(word_ids[word], lesson_id, count, kw_count, segs.tobytes(), times.tobytes())
+                    for word, (count, kw_count, segs, times) in postings.items()]
+            self.conn.executemany("INSERT INTO lesson_words VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self.conn.executemany(
+                "UPDATE words SET freq = freq + ?, keyword_count = keyword_count + ?, "
+                "lesson_count = lesson_count + ? WHERE id = ?",
+                [(count, kw_count, 1 if count else 0, word_id) for word_id, _, count, kw_count, _, _ in rows])
+
+    def remove(self, filename):
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute("SELECT id FROM lessons WHERE filename = ?", (filename,)).fetchone()
+            if row:
+                self._remove_lesson(row[0])
+
+    def refresh(self):
+        """增量同步整個課程資料夾，回傳 (重新統計的檔名, 移除的檔名)"""
+        try:
+            filenames = [f for f in os.listdir(self.assets_dir) if is_lesson_file(f)]
+        except FileNotFoundError:
+            filenames = []
+        known = {f: (m, s) for f, m, s in self.conn.execute("SELECT filename, mtime_ns, size FROM lessons")}
+
+        changed = []
+        for f in filenames:
+            path = os.path.join(self.assets_dir, f)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if known.get(f) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            try:
+                self.index_lesson(path)
+                changed.append(f)
+            except Exception as e:
+                print(f"⚠️ 無法統計 {f}: {e}")
+
+        present = set(filenames)
+        removed = [f for f in known if f not in present]
+        for f in removed:
+            self.remove(f)
+        return changed, removed
+
+    # --- 查詢 ---
+    def lesson_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM lessons").fetchone()[0]
+
+    def word_stats(self, word):
+        """(freq, lesson_count, keyword_count)，不存在時回傳 None"""
+        return self.conn.execute("SELECT freq, lesson_count, keyword_count FROM words WHERE word = ?",
+                                 (normalize_word(word) or word.lower(),)).fetchone()
+
+    def rare_words(self, filename, max_freq=RARE_MAX_FREQ):
+        """課程中在整個課程庫裡很少出現的單字 (set)"""
+        return _query_rare_words(self.conn, filename, max_freq)
+
+    def occurrences(self, word, limit=200):
+        """單字在所有課程中出現的位置 (依課程檔名、時間排序)"""
+        result = []
+        for filename, title, segs_blob, times_blob in self.conn.execute(
+                "SELECT l.filename, l.title, lw.segs, lw.times FROM words w "
+                "JOIN lesson_words lw ON lw.word_id = w.id JOIN lessons l ON l.id = lw.lesson_id "
+                "WHERE w.word = ? ORDER BY l.filename", (normalize_word(word) or word.lower(),)):
+            segs, times = array('I'), array('f')
+            segs.frombytes(segs_blob)
+            times.frombytes(times_blob)
+            for seg_index, t in zip(segs, times):
+                result.append(WordOccurrence(filename, title, seg_index, t))
+                if len(result) >= limit:
+                    return result
+        return result
+
+    def top_words(self, limit=20):
+        return self.conn.execute(
+            "SELECT word, freq, lesson_count FROM words WHERE freq > 0 ORDER BY freq DESC LIMIT ?",
+            (limit,)).fetchall()
+
+
+def main():
+    """python lesson_vocab.py [資料夾] [單字]：更新資料庫後顯示常用字或單字出現位置"""
+    import sys
+    args = sys.argv[1:]
+    assets_dir = args.pop(0) if args and os.path.isdir(args[0]) else "./app_assets"
+    store = VocabularyStore(assets_dir)
+    changed, removed = store.refresh()
+    print(f"📊 單字資料庫已更新: {len(changed)} 個課程重新統計, {len(removed)} 個移除")
+    if args:
+        word = args[0]
+        stats = store.word_stats(word)
+        if not stats:
+            print(f"找不到「{word}」")
+        else:
+            print(f"「{word}」: {stats[0]} 次, {stats[1]} 個課程, keyword {stats[2]} 次")
+            for occ in store.occurrences(word, limit=20):
+                print(f"  [{occ.title}] {int(occ.time) // 60:02}:{int(occ.time) % 60:02} (片段 {occ.seg_index})")
+    else:
+        for word, freq, lessons in store.top_words():
+            print(f"  {word:20s} {freq:8d} 次  {lessons:5d} 課")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import os
+import time
+import shutil
+import sqlite3
+
+from asset_store import finalize_file, gc_temp_files
+
+# --- 課程影片的磁碟配額 (app_assets) ---
+# 課程 JSON、二進位課程檔與 MP3 一律保留；影片 (MP4) 超過配額時，刪除最久沒播放的。
+# - 播放器開始播放課程時記錄時間 (.media_cache.db)，工廠加入新影片時也記錄一次
+# - 只清除同名 <id>.json 與 <id>.mp3 都存在的影片 (工廠的命名方式)，課程仍可純音訊播放
+# - 播放器開啟被清除的課程時先以 MP3 播放，並在背景以 source_url 重新下載影片
+
+MEDIA_CACHE_FILENAME = ".media_cache.db"
+VIDEO_EXTENSIONS = (".mp4", ".webm", ".mkv", ".mov")
+QUOTA_ENV = "LESSON_VIDEO_QUOTA_GB"   # 環境變數可覆寫配額
+DEFAULT_QUOTA_GB = 20.0
+REFETCH_DIRNAME = ".refetch"          # 重新下載的暫存子資料夾 (同一個磁碟，完成後直接換名)
+
+
+def is_video_file(filename):
+    return filename.lower().endswith(VIDEO_EXTENSIONS) and not filename.startswith(".")
+
+
+def video_quota_bytes(quota_gb=None):
+    if quota_gb is None:
+        try:
+            quota_gb = float(os.environ.get(QUOTA_ENV, DEFAULT_QUOTA_GB))
+        except ValueError:
+            quota_gb = DEFAULT_QUOTA_GB
+    return int(quota_gb * 1024 ** 3)
+
+
+class CachedVideo:
+    __slots__ = ("filename", "size", "last_used", "evictable")
+
+    def __init__(self, filename, size, last_used, evictable):
+        self.filename = filename
+        self.size = size
+        self.last_used = last_used
+        self.evictable = evictable
+
+
+class MediaCache:
+    """影片配額管理 (每個執行緒請使用自己的實例)"""
+
+    def __init__(self, assets_dir, quota_gb=None):
+        self.assets_dir = assets_dir
+        self.quota_bytes = video_quota_bytes(quota_gb)
+        self.conn = sqlite3.connect(os.path.join(assets_dir, MEDIA_CACHE_FILENAME), timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS media (
+                filename TEXT PRIMARY KEY,
+                last_used REAL NOT NULL,
+                play_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    # --- 使用紀錄 ---
+    def record_play(self, filename):
+        """播放器開始播放課程 (影片已被清除時也記錄，重新下載後不會馬上又被清掉)"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO media (filename, last_used, play_count) VALUES (?, ?, 1) "
+                "ON CONFLICT(filename) DO UPDATE SET last_used = excluded.last_used, play_count = play_count + 1",
+                (filename, time.time()))
+
+    def touch(self, filename):
+        """新加入 (或重新下載) 的影片：視為剛使用過"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO media (filename, last_used) VALUES (?, ?) "
+                "ON CONFLICT(filename) DO UPDATE SET last_used = excluded.last_used",
+                (filename, time.time()))
+
+    # --- 配額 ---
+    def videos(self):
+        """課程資料夾中的所有影片 (依最後使用時間排序，最久的在前)"""
+        try:
+            names = os.listdir(self.assets_dir)
+        except FileNotFoundError:
+            return []
+        present = set(names)
+        last_used = dict(self.conn.execute("SELECT filename, last_used FROM media"))
+        result = []
+        for name in names:
+            if not is_video_file(name):
+                continue
+            try:
+                st = os.stat(os.path.join(self.assets_dir, name))
+            except OSError:
+                continue
+            stem = os.path.splitext(name)[0]
+            evictable = f"{stem}.json" in present and f"{stem}.mp3" in present
+            # 沒有播放紀錄時以檔案時間代替 (yt-dlp 會把 mtime 設成上傳日期，ctime 才是加入的時間)
+            used = last_used.get(name, max(st.st_mtime, st.st_ctime))
+            result.append(CachedVideo(name, st.st_size, used, evictable))
+        result.sort(key=lambda v: v.last_used)
+        return result
+
+    def usage(self):
+        return sum(v.size for v in self.videos())
+
+    def enforce_quota(self, protect=(), dry_run=False):
+        """影片總大小超過配額時，從最久沒播放的開始刪除，回傳 [(檔名, 大小)]"""
+        videos = self.videos()
+        total = sum(v.size for v in videos)
+        evicted = []
+        if total <= self.quota_bytes:
+            return evicted
+        for video in videos:
+            if total <= self.quota_bytes:
+                break
+            if not video.evictable or video.filename in protect:
+                continue
+            if not dry_run:
+                try:
+                    os.remove(os.path.join(self.assets_dir, video.filename))
+                except OSError as e:
+                    print(f"⚠️ 無法清除影片 {video.filename}: {e}")  # 例如 Windows 上正在播放
+                    continue
+                print(f"🗑️ 已清除影片 {video.filename} ({video.size / 1024 ** 2:.0f} MB)，保留 JSON / MP3")
+            total -= video.size
+            evicted.append((video.filename, video.size))
+        if total > self.quota_bytes:
+            print(f"⚠️ 影片仍超過配額 ({total / 1024 ** 3:.1f} / {self.quota_bytes / 1024 ** 3:.1f} GB)："
+                  f"其餘影片沒有 MP3 或正在使用")
+        return evicted
+
+
+def refetch_video(source_url, assets_dir, video_filename):
+    """以 source_url 重新下載被清除的影片到 assets_dir/video_filename，回傳完整路徑
+
+    需要 yt-dlp；有 FFmpeg 時下載與工廠相同的格式 (影像 + 音訊合併)，否則下載單一 MP4。
+    """
+    try:
+        import yt_dlp
+    except ImportError:
+        raise RuntimeError("需要 yt-dlp 才能重新下載影片 (pip install yt-dlp)")
+
+    video_path = os.path.join(assets_dir, video_filename)
+    if os.path.exists(video_path):
+        return video_path  # 已經重新下載過 (或工廠重新產生)
+    stem = os.path.splitext(video_filename)[0]
+    temp_dir = os.path.join(assets_dir, REFETCH_DIRNAME)
+    os.makedirs(temp_dir, exist_ok=True)
+    if shutil.which("ffmpeg"):
+        video_format = 'bestvideo[ext=mp4][height<=720]+bestaudio[ext=m4a]/best[ext=mp4]/best'
+    else:
+        video_format = 'best[ext=mp4][height<=720]/best[ext=mp4]/best'
+    ydl_opts = {
+        'format': video_format,
+        'outtmpl': os.path.join(temp_dir, f'{stem}.%(ext)s'),
+        'quiet': True,
+        'no_warnings': True,
+        'nocheckcertificate': True,
+        'updatetime': False,
+    }
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(source_url, download=True)
+            downloaded = ydl.prepare_filename(info)
+        if not os.path.exists(downloaded):
+            # 合併後的副檔名可能與 prepare_filename 不同
+            candidates = [f for f in os.listdir(temp_dir) if f.startswith(f"{stem}.") and is_video_file(f)]
+            if not candidates:
+                raise RuntimeError("下載完成但找不到影片檔")
+            downloaded = os.path.join(temp_dir, candidates[0])
+        finalize_file(downloaded, video_path)
+    finally:
+        gc_temp_files(temp_dir, stem)  # 下載分段 / 失敗的殘留
+    return video_path
+
+
+def main():
+    """python media_cache.py [資料夾] [--quota-gb N] [--dry-run]：顯示影片使用量並執行配額"""
+    import argparse
+    parser = argparse.ArgumentParser(description="課程影片磁碟配額")
+    parser.add_argument("assets_dir", nargs="?", default="./app_assets")
+    parser.add_argument("--quota-gb", type=float, default=None)
+    parser.add_argument("--dry-run", action="store_true", help="只列出會被清除的影片")
+    args = parser.parse_args()
+
+    cache = MediaCache(args.assets_dir, args.quota_gb)
+    videos = cache.videos()
+    total = sum(v.size for v in videos)
+    print(f"🎥 影片 {len(videos)} 個，共 {total / 1024 ** 3:.2f} GB (配額 {cache.quota_bytes / 1024 ** 3:.1f} GB)")
+    for v in videos:
+        mark = " " if v.evictable else "*"
+        print(f" {mark} {time.strftime('%Y-%m-%d %H:%M', time.localtime(v.last_used))}  "
+              f"{v.size / 1024 ** 2:8.0f} MB  {v.filename}")
+    print("   (* 沒有 MP3 / JSON，不會被清除)")
+    evicted = cache.enforce_quota(dry_run=args.dry_run)
+    if evicted:
+        verb = "將清除" if args.dry_run else "已清除"
+        print(f"🧹 {verb} {len(evicted)} 個影片，釋放 {sum(s for _, s in evicted) / 1024 ** 3:.2f} GB")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+import os
+import wave
+import threading
+from collections import OrderedDict
+import numpy as np
+from PySide6.QtCore import QObject, Signal, QIODevice, QUrl, QEventLoop, QRunnable, QThreadPool
+from PySide6.QtMultimedia import QAudioSink, QAudioFormat, QMediaDevices, QAudioDecoder
+
+# --- 噪音混音引擎 ---
+# 以 QAudioSink (pull 模式) 串流噪音 PCM，音量包絡線以 NumPy 逐取樣計算：
+# - 間歇比例 (density) 依「影片時間」的 2 秒週期開關，跟著播放速度走
+# - 開/關邊緣與音量變化都有短暫淡入淡出，不會有爆音
+# - 設定改變後，下一個音訊區塊 (約 BUFFER_MS) 就生效，不必等 positionChanged
+
+CYCLE_MS = 2000.0     # 間歇週期 (與原本相同：先靜音，再開啟)
+FADE_MS = 10.0        # 開關邊緣的淡入淡出長度 (真實時間)
+BUFFER_MS = 60        # QAudioSink 緩衝區長度，決定設定生效的延遲
+DRIFT_TOLERANCE_MS = 100.0  # 1x 時允許的偏差 (影片時間)，會隨播放速度放大
+
+NOISE_EXTENSIONS = ('.wav', '.mp3', '.flac')
+CACHE_BUDGET_MB = 256  # 解碼後 PCM 快取上限 (int16；1 分鐘 48kHz 立體聲約 11 MB)
+
+
+def gate_envelope(phases_ms, ratio, fade_ms, cycle_ms=CYCLE_MS):
+    """間歇噪音的包絡線 (0.0 ~ 1.0)
+
+    例如 50% -> 週期前 1000ms 靜音、後 1000ms 噪音；30% -> 1400ms 靜音、600ms 噪音。
+    """
+    if ratio >= 1.0:
+        return np.ones(len(phases_ms), dtype=np.float32)
+    if ratio <= 0.0:
+        return np.zeros(len(phases_ms), dtype=np.float32)
+    off_duration = cycle_ms * (1.0 - ratio)
+    fade_ms = max(fade_ms, 1e-3)
+    rise = np.clip((phases_ms - off_duration) / fade_ms, 0.0, 1.0)  # 靜音 -> 噪音
+    fall = np.clip((cycle_ms - phases_ms) / fade_ms, 0.0, 1.0)      # 週期結束前淡出
+    return np.minimum(rise, fall).astype(np.float32)
+
+
+def to_output_pcm(samples, source_rate, output_rate, output_channels):
+    """把 float32 PCM [frames, channels] 轉成輸出的取樣率與聲道數 (線性內插)"""
+    samples = np.asarray(samples, dtype=np.float32)
+    if samples.ndim == 1:
+        samples = samples[:, None]
+
+    if source_rate != output_rate and len(samples) > 1:
+        frames = int(round(len(samples) * output_rate / source_rate))
+        src_t = np.arange(len(samples), dtype=np.float64)
+        dst_t = np.linspace(0, len(samples) - 1, frames)
+        samples = np.stack([np.interp(dst_t, src_t, samples[:, c]) for c in range(samples.shape[1])],
+                           axis=1).astype(np.float32)
+
+    if samples.shape[1] == output_channels:
+        return np.ascontiguousarray(samples)
+    if output_channels == 1:
+        return samples.mean(axis=1, keepdims=True)
+    return np.repeat(samples[:, :1], output_channels, axis=1) if samples.shape[1] == 1 \
+        else np.ascontiguousarray(samples[:, :output_channels])
+
+
+def read_wav(path):
+    """讀取 WAV，回傳 (float32 PCM [frames, channels], 取樣率)"""
+    with wave.open(path, 'rb') as wav:
+        rate = wav.getframerate()
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        raw = wav.readframes(wav.getnframes())
+    if width == 1:
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        data = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = (b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16))
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        data = ints.astype(np.float32) / 8388608.0
+    elif width == 4:
+        data = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"不支援的 WAV 取樣寬度: {width}")
+    return data.reshape(-1, channels), rate
+
+
+def is_noise_file(filename):
+    return filename.lower().endswith(NOISE_EXTENSIONS)
+
+
+# QAudioBuffer 取樣格式 -> (NumPy dtype, 偏移, 縮放)
+_QT_SAMPLE_FORMATS = {
+    QAudioFormat.SampleFormat.UInt8: (np.uint8, 128.0, 1 / 128.0),
+    QAudioFormat.SampleFormat.Int16: (np.int16, 0.0, 1 / 32768.0),
+    QAudioFormat.SampleFormat.Int32: (np.int32, 0.0, 1 / 2147483648.0),
+    QAudioFormat.SampleFormat.Float: (np.float32, 0.0, 1.0),
+}
+
+
+def read_compressed(path):
+    """以 QAudioDecoder 解碼 MP3 / FLAC (同步等待完成)，回傳 (float32 PCM, 取樣率)"""
+    decoder = QAudioDecoder()
+    loop = QEventLoop()
+    chunks = []
+    info = {}
+
+    def on_buffer():
+        buffer = decoder.read()
+        fmt = buffer.format()
+        dtype, offset, scale = _QT_SAMPLE_FORMATS.get(fmt.sampleFormat(), (None, 0.0, 1.0))
+        if dtype is None:
+            info["error"] = f"不支援的取樣格式: {fmt.sampleFormat()}"
+            decoder.stop()
+            loop.quit()
+            return
+        data = np.frombuffer(buffer.constData(), dtype=dtype, count=buffer.sampleCount())
+        chunks.append(((data.astype(np.float32) - offset) * scale).reshape(-1, fmt.channelCount()))
+        info["rate"] = fmt.sampleRate()
+
+    def on_error(error, message=""):
+        info["error"] = message or decoder.errorString() or str(error)
+        loop.quit()
+
+    decoder.bufferReady.connect(on_buffer)
+    decoder.finished.connect(loop.quit)
+    decoder.error.connect(lambda err: on_error(err))
+    decoder.setSource(QUrl.fromLocalFile(os.path.abspath(path)))
+    decoder.start()
+    loop.exec()
+    decoder.stop()
+
+    if "error" in info:
+        raise RuntimeError(info["error"])
+    if not chunks:
+        raise RuntimeError("解碼結果為空")
+    return np.concatenate(chunks), info["rate"]
+
+
+def decode_noise_file(path, output_rate, output_channels):
+    """讀取噪音檔 (WAV/MP3/FLAC) 並轉成輸出格式的 int16 PCM [frames, channels]"""
+    if path.lower().endswith('.wav'):
+        samples, rate = read_wav(path)
+    else:
+        samples, rate = read_compressed(path)
+    pcm = to_output_pcm(samples, rate, output_rate, output_channels)
+    return (np.clip(pcm, -1.0, 1.0) * 32767.0).astype(np.int16)
+
+
+class NoiseSourceCache:
+    """解碼後噪音 PCM 的 LRU 快取 (依記憶體預算淘汰；檔案修改後自動失效)
+
+    背景解碼與主執行緒會同時存取，所以用 lock 保護。
+    """
+
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.entries = OrderedDict()  # abspath -> (mtime_ns, size, pcm)
+        self.total_bytes = 0
+        self.pending = {}             # abspath -> NoiseDecodeTask
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(path):
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def get(self, path):
+        key = os.path.abspath(path)
+        stamp = self._stamp(key)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[:2] != stamp:
+                return None
+            self.entries.move_to_end(key)
+            return entry[2]
+
+    def put(self, path, pcm):
+        key = os.path.abspath(path)
+        stamp = self._stamp(key)
+        with self.lock:
+            self._discard(key)
+            if pcm.nbytes > self.budget_bytes:
+                return  # 單一檔案超過預算：照常播放，只是不快取
+            self.entries[key] = (stamp[0], stamp[1], pcm)
+            self.total_bytes += pcm.nbytes
+            while self.total_bytes > self.budget_bytes:
+                _, (_, _, evicted) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted.nbytes
+
+    def has_room_for(self, nbytes):
+        with self.lock:
+            return self.total_bytes + nbytes <= self.budget_bytes
+
+    def _discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[2].nbytes
+
+    # --- 排隊或解碼中的檔案 (每個檔案同時只有一個解碼工作) ---
+    def pending_task(self, path):
+        with self.lock:
+            return self.pending.get(os.path.abspath(path))
+
+    def add_pending(self, path, task):
+        with self.lock:
+            self.pending[os.path.abspath(path)] = task
+
+    def finish_pending(self, path):
+        with self.lock:
+            self.pending.pop(os.path.abspath(path), None)
+
+
+class NoiseDecodeSignals(QObject):
+    decoded = Signal(str, object)  # (abspath, int16 PCM)
+    failed = Signal(str, str)      # (abspath, 錯誤訊息)
+
+
+class NoiseDecodeTask(QRunnable):
+    """在背景解碼一個噪音檔 (MP3/FLAC 的 QAudioDecoder 事件迴圈只在工作執行緒內執行)
+
+    預載時 keep=False：快取放不下就不放入 (並設定 out_of_room，同一批預載的其他檔案不再解碼)，
+    不把使用者正在聽的來源擠出快取；使用者選了這個檔案時改成 keep=True。
+    """
+
+    def __init__(self, cache, path, output_rate, output_channels, signals, keep=False, out_of_room=None):
+        super().__init__()
+        self.setAutoDelete(False)  # 引擎保留參考，之後可能調整 keep 或提前排程
+        self.cache = cache
+        self.path = os.path.abspath(path)
+        self.output_rate = output_rate
+        self.output_channels = output_channels
+        self.signals = signals
+        self.keep = keep
+        self.out_of_room = out_of_room
+
+    def run(self):
+        try:
+            pcm = self.cache.get(self.path)
+            if pcm is None:
+                if not self.keep and self.out_of_room is not None and self.out_of_room.is_set():
+                    self.signals.decoded.emit(self.path, None)  # 略過 (快取已滿)
+                    return
+                pcm = decode_noise_file(self.path, self.output_rate, self.output_channels)
+                if self.keep or self.cache.has_room_for(pcm.nbytes):
+                    self.cache.put(self.path, pcm)
+                elif self.out_of_room is not None:
+                    self.out_of_room.set()
+        except Exception as e:
+            self.signals.failed.emit(self.path, str(e))
+            return
+        self.signals.decoded.emit(self.path, pcm)
+
+
+class NoiseStream(QIODevice):
+    """QAudioSink 的 pull 來源：循環播放 PCM 並套用包絡線"""
+
+    def __init__(self, sample_rate, channels):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.pcm = None          # int16 [frames, channels]，已是輸出格式 (由快取共用，唯讀)
+        self.read_pos = 0        # PCM 讀取位置 (frame)
+        self.phase_ms = 0.0      # 間歇週期中的位置 (影片時間)
+        self.rate = 1.0          # 影片播放速度
+        self.ratio = 1.0         # 噪音密度
+        self.volume = 0.3        # 目標音量
+        self._last_volume = 0.0
+        self._last_gate = 1.0
+
+    def reset_fade(self):
+        """重新開始時從靜音淡入"""
+        self._last_volume = 0.0
+
+    def isSequential(self):
+        return True
+
+    def bytesAvailable(self):
+        # 循環噪音永遠有資料可讀
+        return 1 << 20
+
+    def writeData(self, data):
+        return -1
+
+    def readData(self, maxlen):
+        frames = int(maxlen) // (2 * self.channels)
+        if frames <= 0:
+            return b""
+        return self.render(frames).tobytes()
+
+    def render(self, frames):
+        """產生 frames 個取樣 (int16 交錯格式)"""
+        if self.pcm is None or len(self.pcm) == 0:
+            return np.zeros(frames * self.channels, dtype="<i2")
+
+        # 1. 循環讀取噪音 PCM
+        idx = (self.read_pos + np.arange(frames)) % len(self.pcm)
+        block = self.pcm[idx].astype(np.float32) * (1.0 / 32768.0)
+        self.read_pos = int((self.read_pos + frames) % len(self.pcm))
+
+        # 2. 間歇包絡線：週期依影片時間推進 (跟著播放速度)
+        step_ms = 1000.0 / self.sample_rate * self.rate
+        phases = (self.phase_ms + np.arange(frames) * step_ms) % CYCLE_MS
+        self.phase_ms = (self.phase_ms + frames * step_ms) % CYCLE_MS
+        gate = gate_envelope(phases, self.ratio, FADE_MS * self.rate)
+
+        # 密度剛改變時，從上一區塊的增益平滑過渡 (避免跳變)
+        fade_frames = min(frames, int(self.sample_rate * FADE_MS / 1000.0))
+        if fade_frames > 0 and abs(gate[0] - self._last_gate) > 1e-3:
+            w = np.linspace(0.0, 1.0, fade_frames, dtype=np.float32)
+            gate[:fade_frames] = self._last_gate * (1.0 - w) + gate[:fade_frames] * w
+        self._last_gate = float(gate[-1])
+
+        # 3. 音量：整個區塊內線性過渡到新音量
+        volume = np.linspace(self._last_volume, self.volume, frames, dtype=np.float32)
+        self._last_volume = self.volume
+
+        out = block * (gate * volume)[:, None]
+        return (np.clip(out, -1.0, 1.0) * 32767.0).astype("<i2").reshape(-1)
+
+
+class NoiseEngine(QObject):
+    """背景噪音播放引擎 (取代 QMediaPlayer + setVolume 開關)"""
+
+    source_ready = Signal(str)        # 背景解碼完成，已切換到這個來源
+    source_failed = Signal(str, str)  # (路徑, 錯誤訊息)
+
+    def __init__(self, parent=None, cache_budget_mb=CACHE_BUDGET_MB):
+        super().__init__(parent)
+        device = QMediaDevices.defaultAudioOutput()
+        self.format = QAudioFormat()
+        self.format.setSampleRate(device.preferredFormat().sampleRate() or 44100)
+        self.format.setChannelCount(2)
+        self.format.setSampleFormat(QAudioFormat.SampleFormat.Int16)
+
+        self.stream = NoiseStream(self.format.sampleRate(), self.format.channelCount())
+        self.stream.open(QIODevice.OpenModeFlag.ReadOnly)
+        self.sink = QAudioSink(device, self.format, self)
+        self.sink.setBufferSize(self.format.bytesForDuration(BUFFER_MS * 1000))
+        self._started = False
+        self._suspended = False
+
+        self.cache = NoiseSourceCache(cache_budget_mb * 1024 * 1024)
+        self.preload_pool = QThreadPool(self)
+        self.preload_pool.setMaxThreadCount(1)
+        self.decode_signals = NoiseDecodeSignals(self)
+        self.decode_signals.decoded.connect(self._on_decoded)
+        self.decode_signals.failed.connect(self._on_decode_failed)
+        self._requested = None  # 等待背景解碼的來源 (abspath)
+
+    @property
+    def sample_rate(self):
+        return self.format.sampleRate()
+
+    @property
+    def channels(self):
+        return self.format.channelCount()
+
+    # --- 來源 ---
+    def set_pcm(self, pcm):
+        """設定噪音 PCM (int16 [frames, channels]，已是輸出取樣率與聲道數)"""
+        self.stream.pcm = pcm
+        self.stream.read_pos = 0
+        self.stream.reset_fade()  # 播放中切換來源時從靜音淡入，避免爆音
+
+    def load_file(self, path):
+        """切換噪音來源，快取命中時立即切換並回傳 True
+
+        沒命中時排入背景解碼並回傳 False (UI 執行緒不解碼)，完成後才切換並發出 source_ready；
+        在那之前仍播放原本的來源。
+        """
+        pcm = self.cache.get(path)
+        if pcm is not None:
+            self._requested = None
+            self.set_pcm(pcm)
+            return True
+        self._requested = os.path.abspath(path)
+        self._decode(path, keep=True)
+        return False
+
+    def preload(self, paths):
+        """在背景把噪音檔解碼進快取 (快取滿了就停止)"""
+        out_of_room = threading.Event()
+        for path in paths:
+            self._decode(path, out_of_room=out_of_room)
+
+    def _decode(self, path, keep=False, out_of_room=None):
+        """排入解碼工作；同一個檔案已在排隊或解碼中就沿用那個工作"""
+        task = self.cache.pending_task(path)
+        if task is None:
+            task = NoiseDecodeTask(self.cache, path, self.sample_rate, self.channels, self.decode_signals,
+                                   keep, out_of_room)
+            self.cache.add_pending(path, task)
+            self.preload_pool.start(task, 1 if keep else 0)
+        elif keep and not task.keep:
+            task.keep = True
+            if self.preload_pool.tryTake(task):  # 還在排隊：排到其他預載工作前面
+                self.preload_pool.start(task, 1)
+
+    def _on_decoded(self, path, pcm):
+        self.cache.finish_pending(path)
+        if pcm is None:
+            if path == self._requested:
+                self._decode(path, keep=True)  # 預載略過了使用者剛選的檔案
+            return
+        if path == self._requested:
+            self._requested = None
+            self.set_pcm(pcm)
+            self.source_ready.emit(path)
+
+    def _on_decode_failed(self, path, message):
+        self.cache.finish_pending(path)
+        if path == self._requested:
+            self._requested = None
+            self.source_failed.emit(path, message)
+        else:
+            print(f"⚠️ 噪音預載失敗 {os.path.basename(path)}: {message}")
+
+    def has_source(self):
+        return self.stream.pcm is not None
+
+    # --- 參數 (下一個音訊區塊即生效) ---
+    def set_volume(self, volume):
+        self.stream.volume = float(volume)
+
+    def set_density(self, ratio):
+        self.stream.ratio = float(ratio)
+
+    def set_rate(self, rate):
+        self.stream.rate = float(rate)
+
+    def sync_position(self, position_ms):
+        """對齊影片位置 (只有跳轉造成的明顯偏差才重新定相，避免抖動)
+
+        pull 模式下串流已經讀到緩衝區尾端，phase_ms 比聽到的聲音超前約 BUFFER_MS 真實時間
+        (影片時間要乘上播放速度)；位置更新的間隔抖動同樣隨速度放大，容許偏差也一起放大。
+        """
+        rate = self.stream.rate
+        target = (position_ms + BUFFER_MS * rate) % CYCLE_MS
+        drift = abs(self.stream.phase_ms - target)
+        drift = min(drift, CYCLE_MS - drift)
+        if drift > DRIFT_TOLERANCE_MS * max(1.0, rate):
+            self.stream.phase_ms = target
+
+    # --- 播放控制 ---
+    def play(self):
+        if not self.has_source():
+            return
+        if self._suspended:
+            self.sink.resume()
+        elif not self._started:
+            self.stream.reset_fade()
+            self.sink.start(self.stream)
+            self._started = True
+        self._suspended = False
+
+    def pause(self):
+        if self._started and not self._suspended:
+            self.sink.suspend()
+            self._suspended = True
+
+    def stop(self):
+        """停止輸出 (保留目前的噪音來源，之後 play() 會重新開始)"""
+        self.sink.stop()
+        self._started = False
+        self._suspended = False
+
+    def clear(self):
+        """停止並移除噪音來源"""
+        self._requested = None
+        self.stop()
+        self.stream.pcm = None
@@ -0,0 +1,336 @@
+import os
+import sys
+import csv
+import json
+import time
+from collections import Counter
+
+_IMPORT_TIME = time.time()  # 取不到行程啟動時間時的替代起點
+
+# --- 播放器效能量測 (選用) ---
+# 以環境變數 PLAYER_METRICS=1 或命令列參數 --metrics 開啟；沒開啟時播放器完全不經過這裡。
+# - 每個熱路徑函式的延遲直方圖 (on_position_changed、update_subtitle ...)
+# - positionChanged 的 tick 頻率、間隔過長 (skipped) 的次數、字幕計時器遲到 (late) 的次數
+# - 字幕元件 / 時間標籤的 setText 類呼叫次數
+# - F12 切換畫面上的統計面板，結束時輸出 JSON + CSV
+# 啟動時間 (StartupTimer) 則一律記錄：行程啟動 -> 第一次繪製 -> 多媒體就緒 -> 第一課可播放
+
+METRICS_ENV = "PLAYER_METRICS"
+METRICS_DIR_ENV = "PLAYER_METRICS_DIR"
+METRICS_FLAG = "--metrics"
+STARTUP_FLAG = "--measure-startup"   # 量測啟動時間後輸出 JSON 並結束
+DEFAULT_METRICS_DIR = "./metrics"
+
+SKIPPED_TICK_MS = 250.0  # 播放中兩次 positionChanged 間隔超過此值視為漏掉 tick
+LATE_TICK_MS = 8.0       # 字幕計時器比預定時間晚超過此值視為遲到
+BUCKET_COUNT = 24        # 直方圖桶：1us, 2us, 4us ... 約 8 秒
+
+
+def metrics_requested(argv=None):
+    """是否開啟量測 (環境變數或命令列參數)"""
+    if argv is not None and METRICS_FLAG in argv:
+        return True
+    return os.environ.get(METRICS_ENV, "") not in ("", "0")
+
+
+def startup_measure_requested(argv):
+    return STARTUP_FLAG in argv
+
+
+def _linux_start_time(pid):
+    """/proc/<pid>/stat 的 starttime (開機後的 clock ticks)，以 /proc/uptime 換算成現在時間
+    (/proc/stat 的 btime 只到整秒)"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    with open("/proc/uptime") as f:
+        uptime = float(f.read().split()[0])
+    return time.time() - (uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK"))
+
+
+def _windows_start_time(pid):
+    """GetProcessTimes 的建立時間 (FILETIME：1601 年起的 100ns)"""
+    import ctypes
+    from ctypes import wintypes
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+    if not handle:
+        raise OSError("OpenProcess failed")
+    try:
+        times = [wintypes.FILETIME() for _ in range(4)]
+        if not kernel32.GetProcessTimes(handle, *[ctypes.byref(t) for t in times]):
+            raise OSError("GetProcessTimes failed")
+        created = (times[0].dwHighDateTime << 32) | times[0].dwLowDateTime
+        return (created - 116444736000000000) / 1e7
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def process_start_time():
+    """(行程啟動的 epoch 秒, 來源說明)
+
+    PyInstaller onefile 版本先由啟動程式 (父行程) 解壓縮到 _MEIxxxx 暫存資料夾，
+    使用者感受到的啟動時間要從父行程算起。
+    """
+    pid, source = os.getpid(), "process"
+    meipass = getattr(sys, "_MEIPASS", None)
+    if getattr(sys, "frozen", False) and meipass and os.path.basename(meipass).startswith("_MEI"):
+        pid, source = os.getppid(), "onefile bootloader"
+    try:
+        if sys.platform.startswith("linux"):
+            return _linux_start_time(pid), source
+        if sys.platform == "win32":
+            return _windows_start_time(pid), source
+    except (OSError, ValueError, IndexError, StopIteration, AttributeError):
+        pass
+    return _IMPORT_TIME, "import"
+
+
+class StartupTimer:
+    """啟動時間：各階段相對於行程啟動的秒數"""
+
+    def __init__(self):
+        self.origin, self.origin_source = process_start_time()
+        self.marks = {"imported": _IMPORT_TIME - self.origin}
+        self.done = False
+        self.on_finished = None  # 可播放時呼叫 on_finished(timer)
+
+    def mark(self, name):
+        self.marks[name] = time.time() - self.origin
+
+    def finish(self, metrics=None):
+        """第一課可以播放 (或沒有課程可載入)"""
+        self.mark("ready_to_play")
+        self.done = True
+        print("🚀 啟動時間: " + ", ".join(f"{name} {sec * 1000:.0f} ms" for name, sec in self.marks.items()))
+        if metrics is not None:
+            for name, sec in self.marks.items():
+                metrics.record(f"startup.{name}", sec)
+        if self.on_finished is not None:
+            self.on_finished(self)
+
+    def report(self):
+        return {
+            "origin": self.origin_source,
+            "frozen": bool(getattr(sys, "frozen", False)),
+            "marks_ms": {name: round(sec * 1000.0, 1) for name, sec in self.marks.items()},
+        }
+
+    def export(self, out_dir=None):
+        """印出 JSON 並寫入量測資料夾 (視窗版沒有主控台)，回傳檔案路徑"""
+        out_dir = out_dir or os.environ.get(METRICS_DIR_ENV, DEFAULT_METRICS_DIR)
+        os.makedirs(out_dir, exist_ok=True)
+        path = os.path.join(out_dir, f"startup_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        text = json.dumps(self.report(), ensure_ascii=False, indent=2)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(text)
+        return path
+
+
+class LatencyHistogram:
+    """以 2 的次方 (微秒) 分桶的延遲直方圖；記錄本身只是幾個整數運算"""
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        us = int(seconds * 1e6)
+        self.buckets[min(us.bit_length(), BUCKET_COUNT - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile_ms(self, p):
+        """估計第 p 百分位 (取所在桶的上緣)"""
+        if not self.count:
+            return 0.0
+        rank = p / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min((1 << i) / 1000.0, self.max * 1000.0)
+        return self.max * 1000.0
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000.0, 4) if self.count else 0.0,
+            "p50_ms": round(self.percentile_ms(50), 4),
+            "p95_ms": round(self.percentile_ms(95), 4),
+            "p99_ms": round(self.percentile_ms(99), 4),
+            "max_ms": round(self.max * 1000.0, 4),
+            "buckets_us": {str(1 << i if i else 0): n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class PlayerMetrics:
+    """量測資料收集器"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.histograms = {}     # name -> LatencyHistogram
+        self.counters = Counter()
+        self._last_tick = {}     # tick 名稱 -> 上一次的 monotonic 時間
+
+    def histogram(self, name):
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = LatencyHistogram()
+        return hist
+
+    def record(self, name, seconds):
+        self.histogram(name).add(seconds)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def wrap(self, name, func):
+        """包裝函式，記錄每次呼叫的延遲"""
+        hist = self.histogram(name)
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                hist.add(perf_counter() - start)
+
+        timed.__name__ = getattr(func, "__name__", name)
+        return timed
+
+    def count_calls(self, obj, method_name, counter_name):
+        """把物件上的方法換成會計數的版本 (例如 QLabel.setText)"""
+        original = getattr(obj, method_name)
+        counters = self.counters
+
+        def counted(*args, **kwargs):
+            counters[counter_name] += 1
+            return original(*args, **kwargs)
+
+        setattr(obj, method_name, counted)
+
+    # --- tick 統計 ---
+    def tick(self, name):
+        """記錄一次 tick (例如 positionChanged)；間隔進直方圖，過長的算 skipped"""
+        now = time.monotonic()
+        self.counters[f"{name}.ticks"] += 1
+        last = self._last_tick.get(name)
+        self._last_tick[name] = now
+        if last is None:
+            return
+        interval = now - last
+        self.histogram(f"{name}.interval").add(interval)
+        if interval * 1000.0 > SKIPPED_TICK_MS:
+            self.counters[f"{name}.skipped"] += 1
+
+    def reset_tick(self, name):
+        """暫停/跳轉後重新開始計算間隔"""
+        self._last_tick.pop(name, None)
+
+    def lateness(self, name, late_ms):
+        """計時器實際觸發比預定時間晚了多少"""
+        self.histogram(f"{name}.lateness").add(max(0.0, late_ms) / 1000.0)
+        if late_ms > LATE_TICK_MS:
+            self.counters[f"{name}.late"] += 1
+
+    def tick_rate(self, name):
+        """平均 tick 頻率 (Hz)，由間隔直方圖計算"""
+        hist = self.histograms.get(f"{name}.interval")
+        if hist is None or not hist.total:
+            return 0.0
+        return hist.count / hist.total
+
+    # --- 輸出 ---
+    def snapshot(self):
+        return {
+            "uptime_s": round(time.monotonic() - self.started, 2),
+            "latency": {name: hist.summary() for name, hist in sorted(self.histograms.items())},
+            "counters": dict(sorted(self.counters.items())),
+            "tick_rate_hz": {name[:-len(".interval")]: round(self.tick_rate(name[:-len(".interval")]), 2)
+                             for name in self.histograms if name.endswith(".interval")},
+        }
+
+    def format_overlay(self):
+        """畫面上統計面板的文字"""
+        lines = [f"⏱ metrics  {time.monotonic() - self.started:7.1f}s"]
+        for name, hist in sorted(self.histograms.items()):
+            if not hist.count:
+                continue
+            lines.append(f"{name:32s} n={hist.count:<7d} p50={hist.percentile_ms(50):7.3f} "
+                         f"p99={hist.percentile_ms(99):7.3f} max={hist.max * 1000:7.3f} ms")
+        for name in self.histograms:
+            if name.endswith(".interval"):
+                tick = name[:-len(".interval")]
+                lines.append(f"{tick + ' rate':32s} {self.tick_rate(tick):7.1f} Hz")
+        for name, n in sorted(self.counters.items()):
+            lines.append(f"{name:32s} {n}")
+        return "\n".join(lines)
+
+    def export(self, out_dir=None):
+        """輸出 JSON (完整直方圖) 與 CSV (每個指標一列)，回傳兩個檔案路徑"""
+        out_dir = out_dir or os.environ.get(METRICS_DIR_ENV, DEFAULT_METRICS_DIR)
+        os.makedirs(out_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        json_path = os.path.join(out_dir, f"player_metrics_{stamp}.json")
+        csv_path = os.path.join(out_dir, f"player_metrics_{stamp}.csv")
+
+        data = self.snapshot()
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+        with open(csv_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "kind", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+            for name, s in data["latency"].items():
+                writer.writerow([name, "latency", s["count"], s["mean_ms"], s["p50_ms"],
+                                 s["p95_ms"], s["p99_ms"], s["max_ms"]])
+            for name, n in data["counters"].items():
+                writer.writerow([name, "counter", n, "", "", "", "", ""])
+
+        print(f"📊 效能量測已輸出: {json_path}, {csv_path}")
+        return json_path, csv_path
+
+
+def create_overlay(parent, metrics, interval_ms=500):
+    """在視窗左上角建立統計面板 (F12 切換顯示)"""
+    from PySide6.QtCore import Qt, QTimer
+    from PySide6.QtGui import QKeySequence, QShortcut
+    from PySide6.QtWidgets import QLabel
+
+    overlay = QLabel(parent)
+    overlay.setStyleSheet("background-color: rgba(0, 0, 0, 180); color: #7CFC00; "
+                          "font-family: Consolas, monospace; font-size: 11px; padding: 6px;")
+    overlay.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents, True)
+    overlay.hide()
+
+    timer = QTimer(overlay)
+    timer.setInterval(interval_ms)
+
+    def refresh():
+        overlay.setText(metrics.format_overlay())
+        overlay.adjustSize()
+        overlay.move(10, 10)
+        overlay.raise_()
+
+    def toggle():
+        if overlay.isVisible():
+            timer.stop()
+            overlay.hide()
+        else:
+            refresh()
+            overlay.show()
+            timer.start()
+
+    timer.timeout.connect(refresh)
+    shortcut = QShortcut(QKeySequence("F12"), parent)
+    shortcut.activated.connect(toggle)
+    overlay.shortcut = shortcut  # 保持參考
+    return overlay
@@ -0,0 +1,23 @@
+import os
+import sys
+import json
+
+import pytest
+
+# 模組都在專案根目錄 (沒有套件)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def write_lesson(tmp_path):
+    """在 tmp_path 寫入課程 JSON：片段可以是英文句子 (字串) 或完整的片段 dict，回傳 JSON 路徑"""
+    def write(name, segments, title=None, **meta):
+        data = {"title": title or name, **meta, "segments": [
+            seg if isinstance(seg, dict) else
+            {"start_time": i * 2.0, "end_time": i * 2.0 + 1.5, "text_en": seg, "text_zh": "", "keywords": []}
+            for i, seg in enumerate(segments)
+        ]}
+        path = tmp_path / name
+        path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        return str(path)
+    return write
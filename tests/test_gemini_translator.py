@@ -0,0 +1,173 @@
+import re
+import time
+
+import pytest
+
+from gemini_translator import (GeminiBatchTranslator, BatchCheckpoint, StubModel, TokenBucket,
+                               is_retryable, is_quota_error)
+
+
+class FakeClock:
+    """假時鐘：sleep 直接推進時間並記錄等待秒數"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class ScriptedModel(StubModel):
+    """依序拋出 errors 中的例外，之後照常回應"""
+
+    def __init__(self, errors=()):
+        super().__init__(latency_s=0.0)
+        self.errors = list(errors)
+
+    def generate_content(self, prompt):
+        with self.lock:
+            error = self.errors.pop(0) if self.errors else None
+            if error is not None:
+                self.calls += 1
+        if error is not None:
+            raise error
+        return super().generate_content(prompt)
+
+
+class SlowFirstModel(StubModel):
+    """越前面的批次回應越慢，讓完成順序與送出順序相反"""
+
+    def __init__(self, batch_count):
+        super().__init__(latency_s=0.0)
+        self.batch_count = batch_count
+        self.finished = []
+
+    def generate_content(self, prompt):
+        batch = int(re.search(r'"text": "b(\d+)', prompt).group(1))
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(0.02 * (self.batch_count - batch))
+        finally:
+            with self.lock:
+                self.active -= 1
+        response = super().generate_content(prompt)
+        with self.lock:
+            self.finished.append(batch)
+        return response
+
+
+def _batches(count, size=3):
+    return [[{"start": float(n * size + i), "end": n * size + i + 0.5, "text": f" b{n} s{n * size + i}",
+              "words": [{"word": f"b{n}", "start": float(n * size + i), "end": n * size + i + 0.2}]}
+             for i in range(size)] for n in range(count)]
+
+
+def _translator(model, clock, concurrency=1):
+    translator = GeminiBatchTranslator(model, concurrency, 6000, backoff_base=0.5, sleep=clock.sleep)
+    translator.bucket = TokenBucket(6000, burst=concurrency, clock=clock.time, sleep=clock.sleep)
+    return translator
+
+
+def test_results_keep_input_order_when_batches_finish_out_of_order():
+    batches = _batches(5)
+    model = SlowFirstModel(len(batches))
+    translator = GeminiBatchTranslator(model, concurrency=len(batches), requests_per_minute=6000)
+
+    results = translator.map_batches(batches)
+    assert model.finished != sorted(model.finished)
+    assert model.max_active > 1
+    for batch, processed in zip(batches, results, strict=True):
+        assert [item["text_en"] for item in processed] == [seg["text"].strip() for seg in batch]
+        assert [item["words"] for item in processed] == [seg["words"] for seg in batch]
+
+
+def test_quota_error_pauses_and_retries():
+    clock = FakeClock()
+    model = ScriptedModel([RuntimeError("429 Resource exhausted: quota exceeded. Please retry in 7s")])
+    translator = _translator(model, clock)
+
+    processed = translator.translate_batch(_batches(1)[0])
+    assert [item["text_zh"] for item in processed] == ["譯:b0 s0", "譯:b0 s1", "譯:b0 s2"]
+    assert model.calls == 2
+    assert translator.stats == {"requests": 2, "retries": 1, "quota_errors": 1, "failed_batches": 0}
+    # 依照錯誤訊息建議的時間暫停 (加上退避時間)
+    assert clock.now >= 7.0
+
+
+def test_non_retryable_error_fails_immediately():
+    clock = FakeClock()
+    model = ScriptedModel([RuntimeError("400 API_KEY_INVALID: API key not valid")])
+    translator = _translator(model, clock)
+
+    assert translator.translate_batch(_batches(1)[0]) is None
+    assert model.calls == 1
+    assert translator.stats["failed_batches"] == 1 and translator.stats["retries"] == 0
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (RuntimeError("503 Service unavailable"), True),
+    (RuntimeError("connection reset by peer"), True),
+    (TimeoutError("read timed out"), True),
+    (RuntimeError("Request exceeded max 5000 tokens"), False),
+    (RuntimeError("reset is not a valid field"), False),
+    (RuntimeError("Permission denied on resource"), False),
+])
+def test_is_retryable(error, retryable):
+    assert is_retryable(error) is retryable
+
+
+def test_status_code_takes_precedence_over_message():
+    class ApiError(Exception):
+        def __init__(self, code, message):
+            super().__init__(message)
+            self.code = code
+
+    assert not is_retryable(ApiError(400, "internal error 500 in request field"))
+    assert is_retryable(ApiError(503, "backend"))
+    assert is_quota_error(ApiError(429, "slow down"))
+
+
+def test_checkpoint_resume_keeps_partial_results(tmp_path):
+    path = str(tmp_path / ".abc.checkpoint.json")
+    batches = _batches(3)
+    clock = FakeClock()
+
+    # 第一次執行：第 2 批失敗 (不可重試)，其餘成功的批次寫入檢查點
+    checkpoint = BatchCheckpoint(path, "model-a")
+    model = ScriptedModel()
+    translator = _translator(model, clock)
+
+    def translate(batch, num):
+        if num == 2:
+            model.errors.append(RuntimeError("403 Permission denied"))
+        processed = translator.translate_batch(batch)
+        if processed:
+            checkpoint.put(batch, processed)
+        return processed
+
+    results = translator.map_batches(batches, translate)
+    assert [r is not None for r in results] == [True, False, True]
+
+    # 重新執行：從檔案讀回已完成的批次 (加回 words)，只需要送出失敗的批次
+    resumed = BatchCheckpoint(path, "model-a")
+    assert len(resumed) == 2
+    assert resumed.get(batches[0]) == results[0]
+    assert resumed.get(batches[2]) == results[2]
+    assert resumed.get(batches[1]) is None
+    assert BatchCheckpoint(path, "model-b").get(batches[0]) is None  # 換模型時不沿用
+
+    model = ScriptedModel()
+    translator = _translator(model, clock)
+    pending = [batch for batch in batches if resumed.get(batch) is None]
+    assert translator.map_batches(pending)[0] is not None
+    assert model.calls == 1
+
+    resumed.discard()
+    assert not (tmp_path / ".abc.checkpoint.json").exists()
@@ -0,0 +1,90 @@
+import os
+import json
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from lesson_binary import BinaryLesson, write_binary_lesson, binary_path_for, is_binary_fresh
+from lesson_model import Lesson
+
+LESSON = {
+    "lesson_id": "abc",
+    "title": "測試課程",
+    "source_url": "https://example.com/watch?v=abc",
+    "video_filename": "abc.mp4",
+    "duration": 12,
+    "segments": [
+        {"id": 0, "start_time": 0.0, "end_time": 2.5, "text_en": "Hello, world!", "text_zh": "你好，世界！",
+         "keywords": ["world"],
+         "words": [{"word": " Hello,", "start": 0.0, "end": 0.8}, {"word": " world!", "start": 0.9, "end": 2.4}]},
+        {"id": 1, "start_time": 3.0, "end_time": 5.0, "text_en": "no word timings", "text_zh": "沒有逐字時間",
+         "keywords": [], "words": []},
+        {"id": 2, "start_time": 6.0, "end_time": 8.0, "text_en": "world again", "text_zh": "[無中文翻譯]",
+         "keywords": ["again", "world"],
+         "words": [{"word": " world", "start": 6.0, "end": 6.5}, {"word": " again", "start": 6.6, "end": 7.9}]},
+    ],
+}
+
+
+@pytest.fixture
+def binary_lesson(tmp_path):
+    path = str(tmp_path / "abc.lesson")
+    write_binary_lesson(LESSON, path)
+    binary = BinaryLesson(path)
+    yield binary
+    binary.close()
+
+
+def test_round_trip_to_dict(binary_lesson):
+    data = binary_lesson.to_dict()
+    assert {k: v for k, v in data.items() if k != "segments"} == \
+        {k: v for k, v in LESSON.items() if k != "segments"}
+    for got, expected in zip(data["segments"], LESSON["segments"], strict=True):
+        assert got["start_time"] == expected["start_time"] and got["end_time"] == expected["end_time"]
+        assert got["text_en"] == expected["text_en"] and got["text_zh"] == expected["text_zh"]
+        assert got["keywords"] == expected["keywords"]
+        assert got["words"] == [{"word": w["word"].strip(), "start": w["start"], "end": w["end"]}
+                                for w in expected["words"]]
+
+
+def test_keyword_flags(binary_lesson):
+    # 比對時去掉標點、不分大小寫
+    assert binary_lesson.keyword_flags().tolist() == [False, True, True, True]
+    assert len(binary_lesson) == 3 and binary_lesson.word_count == 4
+
+
+def test_lesson_model_matches_json(binary_lesson):
+    from_binary = Lesson.from_binary(binary_lesson)
+    from_json = Lesson.from_dict(json.loads(json.dumps(LESSON)))
+    assert from_binary.meta == from_json.meta
+    for a, b in zip(from_binary.segments, from_json.segments, strict=True):
+        assert (a.index, a.start, a.end, a.text_en, a.text_zh, a.keywords, a.words) == \
+            (b.index, b.start, b.end, b.text_en, b.text_zh, b.keywords, b.words)
+        assert list(a.word_starts) == list(b.word_starts) and list(a.word_ends) == list(b.word_ends)
+
+
+def test_binary_freshness(tmp_path):
+    json_path = tmp_path / "abc.json"
+    json_path.write_text(json.dumps(LESSON), encoding="utf-8")
+    assert not is_binary_fresh(str(json_path))
+
+    bin_path = binary_path_for(str(json_path))
+    assert bin_path == str(tmp_path / "abc.lesson")
+    write_binary_lesson(LESSON, bin_path)
+    assert is_binary_fresh(str(json_path))
+
+    # JSON 比二進位檔新 (重新翻譯後)：需要重新輸出
+    stat = os.stat(bin_path)
+    os.utime(json_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert not is_binary_fresh(str(json_path))
+
+
+def test_context_manager_closes_mmap_on_error(tmp_path):
+    path = str(tmp_path / "abc.lesson")
+    write_binary_lesson(LESSON, path)
+    with pytest.raises(RuntimeError):
+        with BinaryLesson(path) as binary:
+            raise RuntimeError("轉換失敗")
+    assert binary._mm.closed
+    os.replace(path, path + ".old")  # 關閉後可以覆寫 (Windows 上開著的 mmap 會擋住)
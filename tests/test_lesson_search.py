@@ -0,0 +1,136 @@
+import os
+
+from lesson_search import LessonSearchIndex, KIND_EN, KIND_KEYWORD
+
+
+def _files(hits):
+    return sorted({hit.filename for hit in hits})
+
+
+def test_search_english_chinese_and_keywords(tmp_path, write_lesson):
+    write_lesson("a.json", [
+        {"start_time": 0.0, "end_time": 2.0, "text_en": "The quick brown fox", "text_zh": "敏捷的狐狸",
+         "keywords": []},
+        {"start_time": 2.0, "end_time": 4.0, "text_en": "jumps over the dog", "text_zh": "跳過那隻狗",
+         "keywords": ["quick fox"]},
+    ])
+    index = LessonSearchIndex(str(tmp_path))
+    index.refresh()
+
+    hits = index.search("quick fox")
+    # 整個查詢符合 keyword 的片段排在前面，其次是所有單字都出現的片段 (AND)
+    assert [(h.seg_index, h.keyword_match) for h in hits] == [(1, True), (0, False)]
+    assert [h.seg_index for h in index.search("狐狸")] == [0]
+    assert [h.start for h in index.search("dog")] == [2.0]
+    assert index.search("fox dog") == []
+    index.close()
+
+
+def test_index_update_remove_round_trip(tmp_path, write_lesson):
+    a = write_lesson("a.json", ["alpha beta"])
+    write_lesson("b.json", ["beta gamma"])
+    index = LessonSearchIndex(str(tmp_path))
+    changed, removed = index.refresh()
+    assert sorted(changed) == ["a.json", "b.json"] and removed == []
+    assert _files(index.search("beta")) == ["a.json", "b.json"]
+
+    # 沒有變動時不重新索引
+    assert index.refresh() == ([], [])
+
+    # 內容改變：舊的詞消失，新的詞可以搜尋
+    write_lesson("a.json", ["delta epsilon and more"])
+    changed, removed = index.refresh()
+    assert changed == ["a.json"] and removed == []
+    assert _files(index.search("alpha")) == []
+    assert _files(index.search("delta")) == ["a.json"]
+    assert _files(index.search("beta")) == ["b.json"]
+
+    os.remove(a)
+    assert index.refresh() == ([], ["a.json"])
+    assert _files(index.search("delta")) == []
+    assert _files(index.search("gamma")) == ["b.json"]
+    index.close()
+
+
+def test_concurrent_writers_keep_term_ids_consistent(tmp_path, write_lesson):
+    """兩個寫入者 (工廠 + 播放器背景更新) 交錯寫入同一個索引"""
+    a, b = LessonSearchIndex(str(tmp_path)), LessonSearchIndex(str(tmp_path))
+    a.index_lesson(write_lesson("1.json", ["alpha"]))
+    b.index_lesson(write_lesson("2.json", ["alpha"]))
+    a.index_lesson(write_lesson("3.json", ["beta"]))        # b 不知道 a 新增的詞
+    b.index_lesson(write_lesson("4.json", ["gamma beta"]))
+    b.index_lesson(write_lesson("5.json", ["gamma"]))
+    a.index_lesson(write_lesson("6.json", ["delta"]))
+
+    assert _files(a.search("beta")) == ["3.json", "4.json"]
+    assert _files(a.search("gamma")) == ["4.json", "5.json"]
+    assert _files(b.search("delta")) == ["6.json"]
+    a.close()
+    b.close()
+
+
+def test_rarest_term_first_and_only_common_lessons_decoded(tmp_path, write_lesson, monkeypatch):
+    for i in range(4):
+        write_lesson(f"common{i}.json", ["common word here"])
+    write_lesson("both.json", ["common and rare together"])
+    write_lesson("rare_only.json", ["rare alone"])  # rare 的課程不是 common 課程的子集
+    index = LessonSearchIndex(str(tmp_path))
+    index.refresh()
+
+    calls = []
+    segments_for = index._segments_for
+
+    def spy(term_id, lesson_ids):
+        result = segments_for(term_id, lesson_ids)
+        calls.append((term_id, set(result)))
+        return result
+    monkeypatch.setattr(index, "_segments_for", spy)
+
+    assert _files(index.search("common rare")) == ["both.json"]
+    rare_id = index._lookup_term("rare", KIND_EN)
+    assert calls[0][0] == rare_id
+    both_id = index.conn.execute("SELECT id FROM lessons WHERE filename = 'both.json'").fetchone()[0]
+    assert all(lessons == {both_id} for _, lessons in calls)
+    index.close()
+
+
+def test_keyword_hits_stop_at_limit(tmp_path, write_lesson):
+    for i in range(5):
+        write_lesson(f"k{i}.json", [{"start_time": 0.0, "end_time": 1.0, "text_en": "x", "text_zh": "",
+                                     "keywords": ["idiom"]}] * 2)
+    index = LessonSearchIndex(str(tmp_path))
+    index.refresh()
+    keyword_id = index._lookup_term("idiom", KIND_KEYWORD)
+    assert len(index._first_segments_for(keyword_id, 3)) == 2
+
+    hits = index.search("idiom", limit=3)
+    first, second = [f for f, in index.conn.execute("SELECT filename FROM lessons ORDER BY id LIMIT 2")]
+    assert [(h.filename, h.seg_index) for h in hits] == [(first, 0), (first, 1), (second, 0)]
+    assert all(h.keyword_match for h in hits)
+    index.close()
+
+
+def test_common_term_stops_at_limit(tmp_path, write_lesson, monkeypatch):
+    import lesson_search
+    monkeypatch.setattr(lesson_search, "SEARCH_CHUNK_LESSONS", 2)
+    for i in range(10):
+        write_lesson(f"c{i}.json", ["common one", "common two", "other"])
+    index = LessonSearchIndex(str(tmp_path))
+    index.refresh()
+
+    decoded = []
+    segments_for = index._segments_for
+
+    def spy(term_id, lesson_ids):
+        result = segments_for(term_id, lesson_ids)
+        decoded.extend(result)
+        return result
+    monkeypatch.setattr(index, "_segments_for", spy)
+
+    hits = index.search("common", limit=3)
+    first_two = [f for f, in index.conn.execute("SELECT filename FROM lessons ORDER BY id LIMIT 2")]
+    assert [(h.filename, h.seg_index) for h in hits] == \
+        [(first_two[0], 0), (first_two[0], 1), (first_two[1], 0)]
+    assert len(decoded) == 2  # 只解開第一批 (2 個課程)，不是全部 10 個
+    assert len(index.search("common", limit=100)) == 20
+    index.close()
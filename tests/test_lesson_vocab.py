@@ -0,0 +1,109 @@
+import os
+import threading
+
+from lesson_vocab import VocabularyStore, read_rare_words, RARE_MIN_LESSONS
+
+
+def _lessons(store, word):
+    return sorted({occ.filename for occ in store.occurrences(word)})
+
+
+def test_counts_and_occurrences(tmp_path, write_lesson):
+    write_lesson("a.json", [
+        {"start_time": 0.0, "end_time": 2.0, "text_en": "Hello, world", "keywords": ["world"],
+         "words": [{"word": " Hello,", "start": 0.1, "end": 0.5}, {"word": " world", "start": 0.6, "end": 1.0}]},
+        {"start_time": 3.0, "end_time": 4.0, "text_en": "hello again", "keywords": []},
+    ])
+    store = VocabularyStore(str(tmp_path))
+    store.refresh()
+
+    assert store.word_stats("hello") == (2, 1, 0)
+    assert store.word_stats("World") == (1, 1, 1)
+    # 有 Whisper words 時使用逐字時間，否則以片段開始時間代替
+    occurrences = [(occ.seg_index, round(occ.time, 2)) for occ in store.occurrences("hello")]
+    assert occurrences == [(0, 0.1), (1, 3.0)]
+    store.close()
+
+
+def test_index_update_remove_round_trip(tmp_path, write_lesson):
+    a = write_lesson("a.json", ["apple apple banana"])
+    write_lesson("b.json", ["banana cherry"])
+    store = VocabularyStore(str(tmp_path))
+    store.refresh()
+    assert store.word_stats("apple") == (2, 1, 0)
+    assert store.word_stats("banana") == (2, 2, 0)
+
+    # 更新課程：只扣掉舊的次數再加上新的
+    write_lesson("a.json", ["cherry only here now"])
+    assert store.refresh() == (["a.json"], [])
+    assert store.word_stats("apple") == (0, 0, 0)
+    assert store.word_stats("banana") == (1, 1, 0)
+    assert store.word_stats("cherry") == (2, 2, 0)
+
+    os.remove(a)
+    assert store.refresh() == ([], ["a.json"])
+    assert store.word_stats("cherry") == (1, 1, 0)
+    assert _lessons(store, "cherry") == ["b.json"]
+    assert _lessons(store, "now") == []
+    store.close()
+
+
+def test_concurrent_writers_keep_word_ids_consistent(tmp_path, write_lesson):
+    """兩個寫入者 (工廠 + 播放器背景更新) 交錯寫入同一個資料庫"""
+    a, b = VocabularyStore(str(tmp_path)), VocabularyStore(str(tmp_path))
+    a.index_lesson(write_lesson("1.json", ["alpha"]))
+    b.index_lesson(write_lesson("2.json", ["alpha"]))
+    a.index_lesson(write_lesson("3.json", ["beta"]))        # b 不知道 a 新增的單字
+    b.index_lesson(write_lesson("4.json", ["gamma beta"]))
+    b.index_lesson(write_lesson("5.json", ["gamma"]))
+    a.index_lesson(write_lesson("6.json", ["delta"]))
+
+    assert _lessons(a, "delta") == ["6.json"]
+    assert _lessons(a, "gamma") == ["4.json", "5.json"]
+    assert a.word_stats("gamma") == (2, 2, 0)
+    assert b.word_stats("beta") == (2, 2, 0)
+    a.close()
+    b.close()
+
+
+def test_threaded_writers(tmp_path, write_lesson):
+    paths = [write_lesson(f"{i}.json", [f"shared word{i % 7} common"]) for i in range(40)]
+    errors = []
+
+    def index(chunk):
+        store = VocabularyStore(str(tmp_path))
+        try:
+            for path in chunk:
+                store.index_lesson(path)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            store.close()
+
+    threads = [threading.Thread(target=index, args=(paths[i::2],)) for i in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    store = VocabularyStore(str(tmp_path))
+    assert store.word_stats("shared") == (40, 40, 0)
+    assert sum(store.word_stats(f"word{i}")[0] for i in range(7)) == 40
+    assert len(_lessons(store, "word3")) == len(range(3, 40, 7))
+    store.close()
+
+
+def test_rare_words(tmp_path, write_lesson):
+    assert read_rare_words(str(tmp_path), "0.json") == set()  # 資料庫還不存在
+    store = VocabularyStore(str(tmp_path))
+    for i in range(RARE_MIN_LESSONS):
+        store.index_lesson(write_lesson(f"{i}.json", ["common words here" + (" zebra" if i == 0 else "")]))
+    assert store.rare_words("0.json") == {"zebra"}
+    assert read_rare_words(str(tmp_path), "0.json") == {"zebra"}
+    assert read_rare_words(str(tmp_path), "1.json") == set()
+
+    # 課程太少時不標示罕見字
+    store.remove("4.json")
+    assert read_rare_words(str(tmp_path), "0.json") == set()
+    store.close()
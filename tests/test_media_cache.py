@@ -0,0 +1,93 @@
+import itertools
+
+import pytest
+
+import media_cache
+from media_cache import MediaCache
+
+MB = 1024 ** 2
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """播放紀錄使用遞增的假時間 (連續呼叫不會得到相同時間)"""
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(media_cache.time, "time", lambda: float(next(ticks)))
+
+
+def _lesson(assets, stem, video_mb=1, mp3=True, json_file=True):
+    (assets / f"{stem}.mp4").write_bytes(b"\0" * int(video_mb * MB))
+    if mp3:
+        (assets / f"{stem}.mp3").write_bytes(b"m")
+    if json_file:
+        (assets / f"{stem}.json").write_text("{}")
+
+
+def _videos(assets):
+    return sorted(p.name for p in assets.glob("*.mp4"))
+
+
+def test_evicts_least_recently_played_until_under_quota(tmp_path, clock):
+    for stem in "abcd":
+        _lesson(tmp_path, stem)
+    cache = MediaCache(str(tmp_path), quota_gb=2.5 * MB / 1024 ** 3)
+    for stem in "cadb":  # 播放順序：c 最久沒播放，b 最近
+        cache.record_play(f"{stem}.mp4")
+
+    evicted = cache.enforce_quota()
+    assert evicted == [("c.mp4", MB), ("a.mp4", MB)]
+    assert _videos(tmp_path) == ["b.mp4", "d.mp4"]
+    # JSON 與 MP3 一律保留
+    assert sorted(p.name for p in tmp_path.glob("*.mp3")) == ["a.mp3", "b.mp3", "c.mp3", "d.mp3"]
+    assert sorted(p.name for p in tmp_path.glob("*.json")) == ["a.json", "b.json", "c.json", "d.json"]
+    assert cache.enforce_quota() == []
+    cache.close()
+
+
+def test_keeps_videos_without_audio_fallback_and_protected(tmp_path, clock):
+    _lesson(tmp_path, "no_mp3", mp3=False)
+    _lesson(tmp_path, "no_json", json_file=False)
+    _lesson(tmp_path, "new")
+    _lesson(tmp_path, "old")
+    cache = MediaCache(str(tmp_path), quota_gb=0)
+    for stem in ("no_mp3", "no_json", "new", "old"):
+        cache.touch(f"{stem}.mp4")
+    cache.record_play("old.mp4")
+
+    assert cache.enforce_quota(protect={"new.mp4"}) == [("old.mp4", MB)]
+    assert _videos(tmp_path) == ["new.mp4", "no_json.mp4", "no_mp3.mp4"]
+    cache.close()
+
+
+def test_dry_run_and_usage(tmp_path, clock):
+    _lesson(tmp_path, "a", video_mb=2)
+    _lesson(tmp_path, "b", video_mb=1)
+    cache = MediaCache(str(tmp_path), quota_gb=1.5 * MB / 1024 ** 3)
+    cache.record_play("b.mp4")
+    cache.record_play("a.mp4")
+    assert cache.usage() == 3 * MB
+
+    assert cache.enforce_quota(dry_run=True) == [("b.mp4", MB), ("a.mp4", 2 * MB)]
+    assert _videos(tmp_path) == ["a.mp4", "b.mp4"]
+    cache.close()
+
+
+def test_play_history_persists(tmp_path, clock):
+    _lesson(tmp_path, "a")
+    _lesson(tmp_path, "b")
+    cache = MediaCache(str(tmp_path))
+    cache.record_play("b.mp4")
+    cache.record_play("a.mp4")
+    cache.close()
+
+    cache = MediaCache(str(tmp_path))
+    assert [v.filename for v in cache.videos()] == ["b.mp4", "a.mp4"]
+    cache.close()
+
+
+def test_quota_from_environment(monkeypatch):
+    monkeypatch.setenv(media_cache.QUOTA_ENV, "0.5")
+    assert media_cache.video_quota_bytes() == 512 * MB
+    monkeypatch.setenv(media_cache.QUOTA_ENV, "not a number")
+    assert media_cache.video_quota_bytes() == int(media_cache.DEFAULT_QUOTA_GB * 1024 ** 3)
+    assert media_cache.video_quota_bytes(1) == 1024 * MB
@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("PySide6.QtMultimedia", exc_type=ImportError)  # 需要系統音訊函式庫
+
+from noise_engine import NoiseEngine, BUFFER_MS, CYCLE_MS, DRIFT_TOLERANCE_MS
+
+
+def _engine(phase_ms, rate):
+    # sync_position 只用到 stream 的 phase_ms 與 rate
+    return SimpleNamespace(stream=SimpleNamespace(phase_ms=phase_ms, rate=rate))
+
+
+def test_sync_position_tolerates_buffer_lead_at_high_rate():
+    rate = 2.5
+    lead = BUFFER_MS * rate  # 串流讀在聽到的聲音之前
+    position = 1000.0
+    for jitter in (-DRIFT_TOLERANCE_MS * rate * 0.9, 0.0, DRIFT_TOLERANCE_MS * rate * 0.9):
+        phase = (position + lead + jitter) % CYCLE_MS
+        engine = _engine(phase, rate)
+        NoiseEngine.sync_position(engine, position)
+        assert engine.stream.phase_ms == phase  # 正常播放中不重新定相
+
+
+def test_sync_position_rephases_after_seek():
+    rate = 2.5
+    engine = _engine(100.0, rate)
+    NoiseEngine.sync_position(engine, 41000.0)  # 跳轉到週期中的 1000ms
+    assert engine.stream.phase_ms == pytest.approx((1000.0 + BUFFER_MS * rate) % CYCLE_MS)
+
+
+def test_sync_position_wraps_around_cycle():
+    engine = _engine(CYCLE_MS - 10.0, 1.0)
+    NoiseEngine.sync_position(engine, CYCLE_MS * 3 - BUFFER_MS + 20.0)  # 目標在週期開頭，差 30ms
+    assert engine.stream.phase_ms == CYCLE_MS - 10.0
@@ -0,0 +1,47 @@
+import pytest
+
+pytest.importorskip("PySide6")
+
+from desktop_player import SubtitleRenderPlan
+from lesson_model import Segment
+
+
+def _plan(words):
+    return SubtitleRenderPlan(Segment.from_dict(0, {
+        "start_time": 0.0, "end_time": 4.0, "text_en": " ".join(w for w, _, _ in words), "text_zh": "一二三四",
+        "keywords": [], "words": [{"word": w, "start": s, "end": e} for w, s, e in words]}))
+
+
+def _covering(words, t):
+    """基準行為：所有 start <= t <= end 的字"""
+    return {i for i, (_, s, e) in enumerate(words) if s <= t <= e}
+
+
+def test_overlapping_words_are_all_highlighted():
+    words = [("one", 0.0, 1.2), ("two", 1.0, 2.0), ("three", 1.9, 3.0), ("four", 3.5, 4.0)]
+    plan = _plan(words)
+    for t in (0.5, 1.1, 1.95, 2.5, 3.2, 3.7):
+        lo, hi = plan.en_highlight(plan.highlight_state(t)[0])
+        assert set(range(lo, hi)) == _covering(words, t), t
+    assert plan.highlight_state(3.2)[0] == (0, 0)  # 字與字之間的空檔不高亮
+
+
+def test_long_word_keeps_later_words_in_range():
+    # 第一個字涵蓋整段：範圍從它一直延伸到最後一個已開始的字
+    words = [("long", 0.0, 3.0), ("a", 0.5, 0.8), ("b", 1.0, 1.5)]
+    plan = _plan(words)
+    assert plan.highlight_state(1.2)[0] == (0, 3)
+    assert plan.highlight_state(3.2)[0] == (0, 0)
+
+
+def test_next_change_visits_every_highlight_change():
+    words = [("one", 0.0, 1.2), ("two", 1.0, 2.0), ("three", 1.9, 3.0), ("four", 3.5, 4.0)]
+    plan = _plan(words)
+    t, states = 0.0, [plan.highlight_state(0.0)]
+    while t <= plan.end_time:
+        t = plan.next_change(t)
+        states.append(plan.highlight_state(t))
+    en_states = {en for en, _ in states}
+    # 逐毫秒掃過整段：每個英文高亮範圍都會被排程到
+    assert {plan.highlight_state(step / 1000.0)[0] for step in range(4001)} <= en_states
+    assert {(0, 1), (0, 2), (1, 3), (2, 3), (3, 4)} <= en_states
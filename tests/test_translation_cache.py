@@ -0,0 +1,56 @@
+import itertools
+
+import pytest
+
+import translation_cache
+from translation_cache import TranslationCache, normalize_text, EVICT_TO_RATIO
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """遞增的假時間，讓最後使用時間有先後"""
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(translation_cache.time, "time", lambda: float(next(ticks)))
+
+
+def _total_size(cache):
+    return cache.conn.execute("SELECT COALESCE(SUM(size), 0) FROM translations").fetchone()[0]
+
+
+def test_normalized_text_hits(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.db"), "model-a", 1)
+    cache.store([("Don’t  stop\tme NOW ", "別阻止我", ["stop"])])
+
+    assert normalize_text("Don’t  stop\tme NOW ") == "don't stop me now"
+    assert cache.lookup(["don't stop me now", "ＤＯＮ'Ｔ STOP ME NOW", "Don't stop me"]) == \
+        [("別阻止我", ["stop"]), ("別阻止我", ["stop"]), None]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    # 換模型或 prompt 版本時不沿用
+    assert TranslationCache(cache.path, "model-b", 1).lookup(["don't stop me now"]) == [None]
+    assert TranslationCache(cache.path, "model-a", 2).lookup(["don't stop me now"]) == [None]
+    cache.close()
+
+
+def test_skips_empty_translations(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.db"), "model-a", 1)
+    cache.store([("   ", "空白", []), ("hello", "", [])])
+    assert cache.stats()["entries"] == 0
+    cache.close()
+
+
+def test_evicts_least_recently_used_down_to_ratio(tmp_path, clock):
+    cache = TranslationCache(str(tmp_path / "cache.db"), "model-a", 1, max_mb=1500 / (1024 * 1024))
+    texts = [f"sentence number {i:02d}" for i in range(12)]
+    for text in texts[:10]:
+        cache.store([(text, "翻譯", [])])
+    assert cache.evicted == 0
+    cache.lookup([texts[0], texts[1]])  # 最早寫入的兩句剛被使用過
+
+    cache.store([(texts[10], "翻譯", []), (texts[11], "翻譯", [])])
+    assert cache.evicted > 0
+    assert _total_size(cache) <= cache.max_bytes * EVICT_TO_RATIO
+    kept = [text for text, result in zip(texts, cache.lookup(texts)) if result is not None]
+    # 淘汰最久沒用到的句子，剛查詢過與剛寫入的保留
+    assert kept == texts[:2] + texts[12 - (len(kept) - 2):]
+    cache.close()
@@ -0,0 +1,189 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+
+# --- 翻譯快取 (SQLite，所有課程共用) ---
+# 片頭、片尾與同一頻道反覆出現的句子不必每次都送給 Gemini。
+# - 鍵：正規化後的 text_en + 模型名稱 + prompt 版本 (換模型或改 prompt 時自然失效)
+# - 值：text_zh 與 keywords
+# - 以最後使用時間淘汰，資料庫內容超過 max_mb 時刪除最久沒用到的項目
+
+CACHE_FILENAME = ".translation_cache.db"
+CACHE_VERSION = 1
+DEFAULT_MAX_MB = 64
+EVICT_TO_RATIO = 0.9   # 超過上限時淘汰到上限的 90%，避免每次寫入都觸發
+
+_SPACES = re.compile(r"\s+")
+_QUOTES = str.maketrans({"‘": "'", "’": "'", "“": '"', "”": '"'})
+
+
+def normalize_text(text):
+    """正規化英文句子：全形/半形統一、彎引號、大小寫與空白差異視為同一句"""
+    text = unicodedata.normalize("NFKC", text).translate(_QUOTES)
+    return _SPACES.sub(" ", text).strip().casefold()
+
+
+def cache_key(text_en, model_name, prompt_version):
+    raw = f"{model_name}\0{prompt_version}\0{normalize_text(text_en)}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """翻譯快取 (多執行緒共用一個連線，以鎖保護)"""
+
+    def __init__(self, path, model_name, prompt_version, max_mb=DEFAULT_MAX_MB):
+        self.path = path
+        self.model_name = model_name
+        self.prompt_version = prompt_version
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+        self.conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, CACHE_VERSION):
+            self.conn.execute("DROP TABLE IF EXISTS translations")
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS translations (
+                key TEXT PRIMARY KEY,
+                text_en TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version INTEGER NOT NULL,
+                text_zh TEXT NOT NULL,
+                keywords TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used);
+            PRAGMA user_version = {CACHE_VERSION};
+        """)
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _key(self, text_en):
+        return cache_key(text_en, self.model_name, self.prompt_version)
+
+    def lookup(self, texts_en):
+        """每句的 (text_zh, keywords)，沒有快取的為 None"""
+        keys = [self._key(t) for t in texts_en]
+        found = {}
+        with self.lock:
+            unique = list(dict.fromkeys(keys))
+            for i in range(0, len(unique), 500):  # SQLite 參數數量上限
+                chunk = unique[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT key, text_zh, keywords FROM translations WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk).fetchall()
+                for key, text_zh, keywords in rows:
+                    found[key] = (text_zh, json.loads(keywords))
+            if found:
+                now = time.time()
+                self.conn.executemany("UPDATE translations SET hits = hits + 1, last_used = ? WHERE key = ?",
+                                      [(now, key) for key in found])
+                self.conn.commit()
+            results = [found.get(key) for key in keys]
+            hit_count = sum(r is not None for r in results)
+            self.hits += hit_count
+            self.misses += len(results) - hit_count
+        return results
+
+    def store(self, items):
+        """寫入 [(text_en, text_zh, keywords)]，超過容量時淘汰最久沒用到的項目"""
+        now = time.time()
+        rows = []
+        for text_en, text_zh, keywords in items:
+            if not text_en.strip() or not text_zh:
+                continue
+            normalized = normalize_text(text_en)
+            keywords_json = json.dumps(keywords or [], ensure_ascii=False)
+            size = len(normalized.encode("utf-8")) + len(text_zh.encode("utf-8")) + len(keywords_json) + 100
+            rows.append((self._key(text_en), normalized, self.model_name, self.prompt_version,
+                         text_zh, keywords_json, size, now, now))
+        if not rows:
+            return
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO translations "
+                "(key, text_en, model, prompt_version, text_zh, keywords, size, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.stored += len(rows)
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM translations").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = total - int(self.max_bytes * EVICT_TO_RATIO)
+        freed = 0
+        doomed = []
+        for key, size in self.conn.execute("SELECT key, size FROM translations ORDER BY last_used"):
+            doomed.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        self.conn.executemany("DELETE FROM translations WHERE key = ?", doomed)
+        self.evicted += len(doomed)
+
+    # --- 統計 ---
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        with self.lock:
+            count, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM translations").fetchone()
+        return {"entries": count, "size_mb": round(size / (1024 * 1024), 2), "hits": self.hits,
+                "misses": self.misses, "hit_rate": round(self.hit_rate(), 3), "stored": self.stored,
+                "evicted": self.evicted}
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"💾 翻譯快取: 命中 {s['hits']} / {s['hits'] + s['misses']} 句 ({s['hit_rate'] * 100:.0f}%)，"
+                f"共 {s['entries']} 句 ({s['size_mb']} MB)，本次淘汰 {s['evicted']} 句")
+
+    def top_entries(self, limit=20):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT text_en, text_zh, hits FROM translations WHERE hits > 0 ORDER BY hits DESC LIMIT ?",
+                (limit,)).fetchall()
+
+
+def main():
+    """python translation_cache.py [資料夾] [clear]：顯示快取統計 (或清空)"""
+    import sys
+    args = sys.argv[1:]
+    assets_dir = args.pop(0) if args and os.path.isdir(args[0]) else "./app_assets"
+    cache = TranslationCache(os.path.join(assets_dir, CACHE_FILENAME), "", 0)
+    if args and args[0] == "clear":
+        with cache.lock:
+            cache.conn.execute("DELETE FROM translations")
+            cache.conn.commit()
+        print("🗑️ 翻譯快取已清空")
+    stats = cache.stats()
+    print(f"💾 翻譯快取: {stats['entries']} 句 ({stats['size_mb']} MB)")
+    for text_en, text_zh, hits in cache.top_entries():
+        print(f"  {hits:5d} 次  {text_en[:50]:50s} {text_zh}")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()